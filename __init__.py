@@ -12,38 +12,25 @@ bl_info = {
 
 
 if "bpy" in locals():
-    # pixel_scale_islands must stay ahead of pixel_pack_islands and
-    # pixel_unwrap_centerline, which import helpers from it
-    import importlib
-    importlib.reload(pixel_move_uvs)
-    importlib.reload(pixel_scale_uvs)
-    importlib.reload(pixel_snap_uvs)
-    importlib.reload(pixel_move_islands)
-    importlib.reload(pixel_scale_islands)
-    importlib.reload(pixel_snap_islands)
-    importlib.reload(pixel_pack_islands)
-
-    importlib.reload(pixel_unwrap)
-    importlib.reload(pixel_unwrap_active_edge)
-    importlib.reload(pixel_unwrap_centerline)
-    importlib.reload(pixel_smart_follow_quads)
-else:
-    import bpy
-    from .operators import pixel_move_uvs
-    from .operators import pixel_scale_uvs
-    from .operators import pixel_snap_uvs
-    from .operators import pixel_move_islands
-    from .operators import pixel_scale_islands
-    from .operators import pixel_snap_islands
-    from .operators import pixel_pack_islands
-
-    from .operators import pixel_unwrap
-    from .operators import pixel_unwrap_active_edge
-    from .operators import pixel_unwrap_centerline
-    from .operators import pixel_smart_follow_quads
+    # Operator implementations are imported on first use, so dropping every operators module
+    # is enough for the reloaded addon, and the next operator run, to import fresh copies
+    import sys
+    for name in [name for name in sys.modules if name == f"{__name__}.operators" or name.startswith(f"{__name__}.operators.")]:
+        del sys.modules[name]
 
 import bpy
 
+from .operators import registration
+
+
+class PixelUvToolsPreferences(bpy.types.AddonPreferences):
+    bl_idname = __name__
+
+    profile: bpy.props.BoolProperty(name="Profile Pipelines", description="Time each stage of the unwrap and pack operators and report the breakdown. Also enabled by setting the PIXEL_UV_TOOLS_PROFILE environment variable", default=False)
+
+    def draw(self, context):
+        self.layout.prop(self, "profile")
+
 
 class UV_MT_pixel_uv_tools(bpy.types.Menu):
     bl_idname = "UV_MT_pixel_uv_tools"
@@ -53,33 +40,40 @@ class UV_MT_pixel_uv_tools(bpy.types.Menu):
         layout = self.layout
         layout.operator_context = "INVOKE_DEFAULT"
 
-        layout.operator(pixel_move_uvs.PixelMoveUvsOperator.bl_idname, text=pixel_move_uvs.PixelMoveUvsOperator.bl_label)
-        layout.operator(pixel_scale_uvs.PixelScaleUvsOperator.bl_idname, text=pixel_scale_uvs.PixelScaleUvsOperator.bl_label)
+        layout.operator(registration.PixelMoveUvsOperator.bl_idname, text=registration.PixelMoveUvsOperator.bl_label)
+        layout.operator(registration.PixelScaleUvsOperator.bl_idname, text=registration.PixelScaleUvsOperator.bl_label)
+        layout.separator()
+
+        layout.operator(registration.PixelSnapUvsOperator.bl_idname, text=registration.PixelSnapUvsOperator.bl_label)
+        layout.operator(registration.PixelSnapIslandsOperator.bl_idname, text=registration.PixelSnapIslandsOperator.bl_label)
+        layout.operator(registration.PixelPackIslandsOperator.bl_idname, text=registration.PixelPackIslandsOperator.bl_label)
+        layout.operator(registration.PixelFixOverlapsOperator.bl_idname, text=registration.PixelFixOverlapsOperator.bl_label)
         layout.separator()
 
-        layout.operator(pixel_snap_uvs.PixelSnapUvsOperator.bl_idname, text=pixel_snap_uvs.PixelSnapUvsOperator.bl_label)
-        layout.operator(pixel_snap_islands.PixelSnapIslandsOperator.bl_idname, text=pixel_snap_islands.PixelSnapIslandsOperator.bl_label)
-        layout.operator(pixel_pack_islands.PixelPackIslandsOperator.bl_idname, text=pixel_pack_islands.PixelPackIslandsOperator.bl_label)
+        layout.operator(registration.PixelUnwrapOperator.bl_idname, text=registration.PixelUnwrapOperator.bl_label)
+        layout.operator(registration.PixelUnwrapActiveEdgeOperator.bl_idname, text=registration.PixelUnwrapActiveEdgeOperator.bl_label)
+        layout.operator(registration.PixelUnwrapCenterlineOperator.bl_idname, text=registration.PixelUnwrapCenterlineOperator.bl_label)
+        layout.operator(registration.PixelSmartFollowQuadsOperator.bl_idname, text=registration.PixelSmartFollowQuadsOperator.bl_label)
         layout.separator()
 
-        layout.operator(pixel_unwrap.PixelUnwrapOperator.bl_idname, text=pixel_unwrap.PixelUnwrapOperator.bl_label)
-        layout.operator(pixel_unwrap_active_edge.PixelUnwrapActiveEdgeOperator.bl_idname, text=pixel_unwrap_active_edge.PixelUnwrapActiveEdgeOperator.bl_label)
-        layout.operator(pixel_unwrap_centerline.PixelUnwrapCenterlineOperator.bl_idname, text=pixel_unwrap_centerline.PixelUnwrapCenterlineOperator.bl_label)
-        layout.operator(pixel_smart_follow_quads.PixelSmartFollowQuadsOperator.bl_idname, text=pixel_smart_follow_quads.PixelSmartFollowQuadsOperator.bl_label)
+        layout.operator(registration.PixelLintOperator.bl_idname, text=registration.PixelLintOperator.bl_label)
 
 
 classes = [
-    pixel_move_uvs.PixelMoveUvsOperator,
-    pixel_scale_uvs.PixelScaleUvsOperator,
-    pixel_snap_uvs.PixelSnapUvsOperator,
-    pixel_move_islands.PixelMoveIslandsOperator,
-    pixel_scale_islands.PixelScaleIslandsOperator,
-    pixel_snap_islands.PixelSnapIslandsOperator,
-    pixel_pack_islands.PixelPackIslandsOperator,
-    pixel_unwrap.PixelUnwrapOperator,
-    pixel_unwrap_active_edge.PixelUnwrapActiveEdgeOperator,
-    pixel_unwrap_centerline.PixelUnwrapCenterlineOperator,
-    pixel_smart_follow_quads.PixelSmartFollowQuadsOperator,
+    PixelUvToolsPreferences,
+    registration.PixelMoveUvsOperator,
+    registration.PixelScaleUvsOperator,
+    registration.PixelSnapUvsOperator,
+    registration.PixelMoveIslandsOperator,
+    registration.PixelScaleIslandsOperator,
+    registration.PixelSnapIslandsOperator,
+    registration.PixelPackIslandsOperator,
+    registration.PixelLintOperator,
+    registration.PixelFixOverlapsOperator,
+    registration.PixelUnwrapOperator,
+    registration.PixelUnwrapActiveEdgeOperator,
+    registration.PixelUnwrapCenterlineOperator,
+    registration.PixelSmartFollowQuadsOperator,
     UV_MT_pixel_uv_tools,
 ]
 
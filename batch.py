@@ -0,0 +1,274 @@
+"""Run a Pixel UV Tools pipeline over many .blend files from the command line.
+
+    blender -b --python batch.py -- <directory | manifest | file.blend ...> [options]
+
+Every file is processed by its own background Blender process. Up to --jobs of them run
+at once, and a summary with timings, island counts and subpixel warnings is written as
+JSON. A manifest is a text file listing one .blend path per line, relative to the
+manifest. The script can also be started with a plain Python interpreter if --blender
+points at the Blender executable.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Pipeline name -> operator under bpy.ops.uv and the name of its texture size argument
+PIPELINES = {
+    "pixel_unwrap": "img_size",
+    "pixel_pack_islands": "resolution",
+    "pixel_snap_islands": "resolution",
+    "pixel_lint": "resolution",
+}
+
+# Pipelines that only inspect UVs. Their files are never saved
+READ_ONLY = {"pixel_lint"}
+
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def script_args(argv):
+    """Arguments after Blender's `--` separator, or all arguments outside Blender"""
+    return argv[argv.index("--") + 1:] if "--" in argv else argv[1:]
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="batch.py", description="Run a Pixel UV Tools pipeline over .blend files")
+    parser.add_argument("inputs", nargs="*", help="Directories to search for .blend files, manifests, or .blend files")
+    parser.add_argument("--pipeline", choices=sorted(PIPELINES), default="pixel_unwrap", help="Operator to run on every mesh")
+    parser.add_argument("--resolution", type=int, default=256, help="Width and height of the target texture")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Blender processes to run at once")
+    parser.add_argument("--summary", default="pixel_batch_summary.json", help="Where to write the JSON summary")
+    parser.add_argument("--blender", default=None, help="Blender executable, defaults to the running Blender")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds before a file is given up on")
+    parser.add_argument("--dry-run", action="store_true", help="Process files without saving them")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--result", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.resolution < 1:
+        parser.error("--resolution must be at least 1")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if not args.worker and not args.inputs:
+        parser.error("no input files, directories or manifests given")
+    return args
+
+
+def collect_files(inputs):
+    """Absolute .blend paths from directories (searched recursively), manifests and
+    single files, in a stable order without duplicates"""
+    files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                files.extend(os.path.join(root, n) for n in sorted(names) if n.endswith(".blend"))
+        elif path.endswith(".blend"):
+            files.append(path)
+        else:
+            base = os.path.dirname(os.path.abspath(path))
+            with open(path) as manifest:
+                for line in manifest:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        files.append(os.path.join(base, line))
+
+    seen = set()
+    unique = []
+    for f in map(os.path.abspath, files):
+        if f not in seen:
+            seen.add(f)
+            unique.append(f)
+    return unique
+
+
+def blender_executable(args):
+    if args.blender:
+        return args.blender
+    try:
+        import bpy
+        return bpy.app.binary_path
+    except ImportError:
+        return "blender"
+
+
+def run_file(blender, path, args):
+    """Process one file in a fresh background Blender and return its summary entry"""
+    handle, result_path = tempfile.mkstemp(suffix=".json")
+    os.close(handle)
+    command = [blender, "-b", "--factory-startup", "-noaudio", path, "--python", os.path.abspath(__file__), "--",
+               "--worker", "--result", result_path, "--pipeline", args.pipeline, "--resolution", str(args.resolution)]
+    if args.dry_run:
+        command.append("--dry-run")
+
+    entry = {"path": path, "ok": False}
+    start = time.perf_counter()
+    try:
+        process = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, timeout=args.timeout)
+        with open(result_path) as f:
+            text = f.read()
+        if text:
+            entry.update(json.loads(text))
+        else:
+            # Blender exited before the worker could report, e.g. on a crash or an unreadable file
+            entry["error"] = f"Blender exited with code {process.returncode}: " + process.stderr.strip()[-500:]
+    except subprocess.TimeoutExpired:
+        entry["error"] = f"Timed out after {args.timeout} seconds"
+    except OSError as e:
+        entry["error"] = f"Could not start Blender: {e}"
+    finally:
+        entry["seconds"] = time.perf_counter() - start
+        os.remove(result_path)
+    return entry
+
+
+def run_batch(args):
+    files = collect_files(args.inputs)
+    blender = blender_executable(args)
+    print(f"Pixel UV Tools: running {args.pipeline} on {len(files)} files with {args.jobs} Blender processes")
+
+    # Threads only wait on the Blender processes, which do the actual work in parallel
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        entries = []
+        for entry in pool.map(lambda path: run_file(blender, path, args), files):
+            status = "ok" if entry["ok"] else "FAILED: " + entry.get("error", "")
+            print(f"  {entry['path']} ({entry['seconds']:.2f}s) {status}")
+            entries.append(entry)
+
+    done = [e for e in entries if e["ok"]]
+    summary = {
+        "pipeline": args.pipeline,
+        "resolution": args.resolution,
+        "jobs": args.jobs,
+        "dry_run": args.dry_run,
+        "seconds": time.perf_counter() - start,
+        "files": len(entries),
+        "failed": len(entries) - len(done),
+        "islands": sum(e["islands"] for e in done),
+        "subpixel_islands": sum(e["subpixel_islands"] for e in done),
+        "offending_islands": sum(e.get("offending_islands", 0) for e in done),
+        "results": entries,
+    }
+    with open(args.summary, "w") as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"Pixel UV Tools: {len(done)} of {len(entries)} files done in {summary['seconds']:.2f}s, "
+          f"{summary['subpixel_islands']} of {summary['islands']} islands under 1 pixel. Summary: {args.summary}")
+    if args.pipeline in READ_ONLY:
+        print(f"Pixel UV Tools: {summary['offending_islands']} islands failed {args.pipeline}")
+    return 1 if summary["failed"] or summary["offending_islands"] else 0
+
+
+def load_addon():
+    """Import and register this addon from its own directory, whatever it is installed as"""
+    name = os.path.basename(ADDON_DIR)
+    addon = sys.modules.get(name)
+    if addon is None:
+        spec = importlib.util.spec_from_file_location(name, os.path.join(ADDON_DIR, "__init__.py"),
+                                                      submodule_search_locations=[ADDON_DIR])
+        addon = importlib.util.module_from_spec(spec)
+        sys.modules[name] = addon
+        spec.loader.exec_module(addon)
+        addon.register()
+    return addon
+
+
+def addon_module(addon, name):
+    """A module of the addon's operators package. Operator implementations are imported on
+    first use, so scripts that call their functions directly import them through here"""
+    return importlib.import_module(f"{addon.__name__}.operators.{name}")
+
+
+def lint_objects(addon, meshes, resolution):
+    """Pixel Lint every face of the given meshes in Object Mode, straight from their arrays.
+    Returns the summary fields for them"""
+    pixel_lint = addon_module(addon, "pixel_lint")
+    count_subpixel_islands = addon_module(addon, "pixel_scale_islands").count_subpixel_islands
+    tolerance = addon_module(addon, "registration").DEFAULT_TOLERANCE
+
+    result = {"islands": 0, "subpixel_islands": 0, "lint": []}
+    start = time.perf_counter()
+    for me in meshes:
+        entry, table, uvs = pixel_lint.lint_mesh_arrays(me, resolution, tolerance)
+        result["lint"].append(entry)
+        total, subpixel = count_subpixel_islands(None, None, resolution, table, uvs)
+        result["islands"] += total
+        result["subpixel_islands"] += subpixel
+    result["pipeline_seconds"] = time.perf_counter() - start
+    result["offending_islands"] = sum(entry["offending_islands"] for entry in result["lint"])
+    return result
+
+
+def process_open_file(pipeline, resolution):
+    """Run the pipeline on every editable mesh of the open file with all faces selected.
+    Returns the summary fields for the file."""
+    import bpy
+    addon = load_addon()
+    edit_meshes = addon_module(addon, "edit_meshes")
+    count_subpixel_islands = addon_module(addon, "pixel_scale_islands").count_subpixel_islands
+
+    context = bpy.context
+    view_layer = context.view_layer
+    objects = [ob for ob in view_layer.objects
+               if ob.type == 'MESH' and ob.library is None and ob.data.library is None
+               and ob.visible_get() and len(ob.data.polygons)]
+    result = {"objects": len(objects), "islands": 0, "subpixel_islands": 0, "pipeline_seconds": 0.0}
+    if not objects:
+        return result
+
+    if context.object and context.object.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+    if pipeline == "pixel_lint":
+        # Linting reads whole UV maps, which the mesh arrays give in bulk without building
+        # any bmesh. A mesh shared by several objects is linted once
+        result.update(lint_objects(addon, list({ob.data: None for ob in objects}), resolution))
+        return result
+
+    bpy.ops.object.select_all(action='DESELECT')
+    for ob in objects:
+        ob.select_set(True)
+    view_layer.objects.active = objects[0]
+    bpy.ops.object.mode_set(mode='EDIT')
+    bpy.ops.mesh.select_all(action='SELECT')
+
+    start = time.perf_counter()
+    getattr(bpy.ops.uv, pipeline)(**{PIPELINES[pipeline]: resolution})
+    result["pipeline_seconds"] = time.perf_counter() - start
+
+    for me, bm, uv_layer in edit_meshes.edit_bmeshes(context):
+        total, subpixel = count_subpixel_islands(bm, uv_layer, resolution)
+        result["islands"] += total
+        result["subpixel_islands"] += subpixel
+
+    bpy.ops.object.mode_set(mode='OBJECT')
+    return result
+
+
+def run_worker(args):
+    import bpy
+    try:
+        result = process_open_file(args.pipeline, args.resolution)
+        if not args.dry_run and args.pipeline not in READ_ONLY:
+            bpy.ops.wm.save_mainfile()
+        result["ok"] = True
+    except Exception as e:
+        result = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    with open(args.result, "w") as f:
+        json.dump(result, f)
+    return 0 if result["ok"] else 1
+
+
+def main(argv):
+    args = parse_args(script_args(argv))
+    return run_worker(args) if args.worker else run_batch(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
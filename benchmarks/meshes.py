@@ -0,0 +1,166 @@
+"""Procedural test meshes for the benchmark harness.
+
+Every generator takes a target face count and returns (verts, quads, uvs, seams): vertex
+positions as an (n, 3) array, quads as an (m, 4) array of vertex indices, one UV per loop
+in quad order as an (m * 4, 2) array, and seam edges as a (k, 2) array of vertex index
+pairs. Face counts are rounded to what the shape allows. Random values use a fixed seed
+so every run builds the same mesh.
+"""
+import math
+
+import numpy as np
+
+
+def grid(cols, rows):
+    """Vertices and quads of a cols x rows grid of unit quads in the XY plane.
+    Vertex (i, j) has index j * (cols + 1) + i"""
+    x, y = np.meshgrid(np.arange(cols + 1, dtype=np.float64), np.arange(rows + 1, dtype=np.float64))
+    verts = np.stack((x.ravel(), y.ravel(), np.zeros(x.size)), axis=1)
+    i, j = np.meshgrid(np.arange(cols), np.arange(rows))
+    a = (j * (cols + 1) + i).ravel()
+    quads = np.stack((a, a + 1, a + cols + 2, a + cols + 1), axis=1)
+    return verts, quads
+
+
+def grid_seams(cols, rows, every):
+    """Edges of a grid from `grid` on every `every`-th row and column line, inner lines only"""
+    seams = []
+    for j in range(every, rows, every):
+        a = j * (cols + 1) + np.arange(cols)
+        seams.append(np.stack((a, a + 1), axis=1))
+    for i in range(every, cols, every):
+        a = np.arange(rows) * (cols + 1) + i
+        seams.append(np.stack((a, a + cols + 1), axis=1))
+    return np.concatenate(seams) if seams else np.empty((0, 2), dtype=np.int64)
+
+
+def loop_uvs(vert_uvs, quads):
+    return vert_uvs[quads.ravel()]
+
+
+def fit_unit_square(points):
+    """Scale 2D points uniformly into the UV tile with a small border"""
+    low = points.min(axis=0)
+    size = max(float((points.max(axis=0) - low).max()), 1e-9)
+    return (points - low) / size * 0.9 + 0.05
+
+
+def subdivided_grid(faces):
+    """One flat square grid, a single UV island"""
+    side = max(1, round(math.sqrt(faces)))
+    verts, quads = grid(side, side)
+    return verts, quads, loop_uvs(fit_unit_square(verts[:, :2]), quads), np.empty((0, 2), dtype=np.int64)
+
+
+def scatter(faces):
+    """Many disconnected 2x2 quad islands of random size and aspect, each in its own UV cell"""
+    rng = np.random.default_rng(1)
+    count = max(1, faces // 4)
+    per_row = math.ceil(math.sqrt(count))
+    base_verts, base_quads = grid(2, 2)
+    cells = np.stack((np.arange(count) % per_row, np.arange(count) // per_row), axis=1).astype(np.float64)
+
+    scale_3d = rng.uniform(0.5, 1.5, (count, 1, 1))
+    verts = base_verts[None] * scale_3d + np.concatenate((cells * 4, np.zeros((count, 1))), axis=1)[:, None]
+    quads = base_quads[None] + 9 * np.arange(count)[:, None, None]
+
+    # Islands fill 30-90% of their cell on each axis, placed at a random spot inside it
+    cell = 1.0 / per_row
+    size = rng.uniform(0.3, 0.9, (count, 2)) * cell
+    corner = cells * cell + rng.uniform(0, 1, (count, 2)) * (cell - size)
+    vert_uvs = corner[:, None] + base_verts[None, :, :2] / 2 * size[:, None]
+
+    verts = verts.reshape(-1, 3)
+    quads = quads.reshape(-1, 4)
+    return verts, quads, loop_uvs(vert_uvs.reshape(-1, 2), quads), np.empty((0, 2), dtype=np.int64)
+
+
+def cylinders(faces):
+    """Open 16-sided tubes up to 64 rings long, each cut by a seam into one long UV strip"""
+    segments = 16
+    rows = min(64, max(1, faces // segments))
+    count = max(1, faces // (segments * rows))
+
+    angle = 2 * math.pi * np.arange(segments) / segments
+    c, r = np.meshgrid(np.arange(segments), np.arange(rows + 1))
+    ring = np.stack((0.5 * np.cos(angle[c.ravel()]), 0.5 * np.sin(angle[c.ravel()]), 0.25 * r.ravel()), axis=1)
+
+    c, r = np.meshgrid(np.arange(segments), np.arange(rows))
+    c, r = c.ravel(), r.ravel()
+    tube_quads = np.stack((r * segments + c, r * segments + (c + 1) % segments,
+                           (r + 1) * segments + (c + 1) % segments, (r + 1) * segments + c), axis=1)
+
+    # UVs follow the unwrapped column index, so the last column ends at u = 1 instead of wrapping
+    corner_c = np.stack((c, c + 1, c + 1, c), axis=1)
+    corner_r = np.stack((r, r, r + 1, r + 1), axis=1)
+    tube_uvs = np.stack((corner_c / segments * 0.25, corner_r / rows * 0.95), axis=2).reshape(-1, 2)
+    tube_seams = np.stack((np.arange(rows) * segments, np.arange(1, rows + 1) * segments), axis=1)
+
+    per_row = math.ceil(math.sqrt(count))
+    tubes = np.arange(count)
+    offsets = np.stack((tubes * 2.0, np.zeros(count), np.zeros(count)), axis=1)
+    cells = np.stack((tubes % per_row, tubes // per_row), axis=1) / per_row
+
+    stride = len(ring)
+    verts = (ring[None] + offsets[:, None]).reshape(-1, 3)
+    quads = (tube_quads[None] + stride * tubes[:, None, None]).reshape(-1, 4)
+    uvs = (tube_uvs[None] / per_row + cells[:, None]).reshape(-1, 2)
+    seams = (tube_seams[None] + stride * tubes[:, None, None]).reshape(-1, 2)
+    return verts, quads, uvs, seams
+
+
+def character(faces):
+    """A symmetric relief standing in the XZ plane with a vertex column on X = 0,
+    cut by horizontal seams into four islands that all cross the centerline"""
+    half = max(1, round(math.sqrt(faces) / 2))
+    cols, rows = 2 * half, 2 * half
+    verts, quads = grid(cols, rows)
+
+    x = (verts[:, 0] - half) / half
+    z = verts[:, 1] / rows * 2
+    y = 0.3 * np.cos(math.pi * x / 2) * (1 + 0.2 * np.sin(3 * math.pi * z))
+    verts = np.stack((x, y, z), axis=1)
+
+    seams = grid_seams(cols, rows, max(1, rows // 4))
+    seams = seams[verts[seams[:, 0], 2] == verts[seams[:, 1], 2]]
+    return verts, quads, loop_uvs(fit_unit_square(verts[:, [0, 2]]), quads), seams
+
+
+def tiles(faces):
+    """A slightly bumpy floor of quads cut by seams into 4x4 quad tiles"""
+    rng = np.random.default_rng(2)
+    side = max(1, round(math.sqrt(faces)))
+    verts, quads = grid(side, side)
+    verts[:, 2] = rng.uniform(-0.05, 0.05, len(verts))
+    return verts, quads, loop_uvs(fit_unit_square(verts[:, :2]), quads), grid_seams(side, side, 4)
+
+
+GENERATORS = {
+    "grid": subdivided_grid,
+    "scatter": scatter,
+    "cylinders": cylinders,
+    "character": character,
+    "tiles": tiles,
+}
+
+
+def build_object(name, verts, quads, uvs, seams):
+    """Link a new mesh object built from generator output to the active scene"""
+    import bpy
+    me = bpy.data.meshes.new(name)
+    me.from_pydata(verts.tolist(), [], quads.tolist())
+    me.update(calc_edges=True)
+    me.uv_layers.new(name="UVMap").data.foreach_set("uv", uvs.astype(np.float32).ravel())
+
+    if len(seams):
+        edges = np.empty(len(me.edges) * 2, dtype=np.int32)
+        me.edges.foreach_get("vertices", edges)
+        edges = np.sort(edges.reshape(-1, 2), axis=1).astype(np.int64)
+        seams = np.sort(seams, axis=1).astype(np.int64)
+        key = len(verts)
+        use_seam = np.isin(edges[:, 0] * key + edges[:, 1], seams[:, 0] * key + seams[:, 1])
+        me.edges.foreach_set("use_seam", use_seam)
+
+    ob = bpy.data.objects.new(name, me)
+    bpy.context.scene.collection.objects.link(ob)
+    return ob
@@ -0,0 +1,360 @@
+"""Time every Pixel UV Tools operator on procedural meshes of growing size.
+
+    blender -b --python benchmarks/run_benchmarks.py -- [options]
+
+Every case runs in its own background Blender process, one after another, so timings and
+peak memory are not skewed by other cases. Wall time covers only the operator call. Peak
+memory is the process peak, and memory growth is how far the operator pushed that peak
+past the mesh setup. Texel utilization is the fraction of the texture's pixels covered by
+island bounding boxes afterwards. Results are written as JSON and compared against a
+baseline; cases that got slower, used more memory or covered fewer texels than the
+threshold allows are reported as regressions and give a non-zero exit code. First,
+startup.py times importing and registering the addon in several fresh Blenders and the
+fastest is kept. Going over the startup budget, or importing NumPy or any operator
+implementation during registration, fails the run as well.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARK_DIR)
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+import batch  # noqa: E402
+from meshes import GENERATORS, build_object  # noqa: E402
+from startup import REGISTRATION_MODULES, STARTUP_BUDGET_SECONDS  # noqa: E402
+
+
+# Case name -> (operator under bpy.ops.uv, mesh it is timed on, texture size argument, extra arguments)
+CASES = {
+    "pixel_move_uvs": ("pixel_move_uvs", "grid", "resolution", {"dx": 3, "dy": -2}),
+    "pixel_scale_uvs": ("pixel_scale_uvs", "scatter", "resolution", {"per_island": True}),
+    "pixel_snap_uvs": ("pixel_snap_uvs", "grid", "resolution", {}),
+    "pixel_move_islands": ("pixel_move_islands", "scatter", "resolution", {}),
+    "pixel_scale_islands": ("pixel_scale_islands", "scatter", "resolution", {}),
+    "pixel_snap_islands": ("pixel_snap_islands", "scatter", "resolution", {}),
+    "pixel_pack_islands": ("pixel_pack_islands", "scatter", "resolution", {}),
+    "pixel_pack_islands_pixel_grid": ("pixel_pack_islands", "scatter", "resolution", {"packer": 'PIXEL_GRID'}),
+    "pixel_pack_islands_pixel_mask": ("pixel_pack_islands", "scatter", "resolution", {"packer": 'PIXEL_MASK'}),
+    "pixel_pack_islands_separate_overlaps": ("pixel_pack_islands", "scatter", "resolution", {"separate_overlaps": True}),
+    "pixel_pack_islands_per_tile": ("pixel_pack_islands", "scatter", "resolution", {"per_tile": True}),
+    "pixel_fix_overlaps": ("pixel_fix_overlaps", "scatter", "resolution", {}),
+    "pixel_lint": ("pixel_lint", "scatter", "resolution", {}),
+    "pixel_lint_batch": ("pixel_lint", "scatter", "resolution", {}),
+    "pixel_unwrap": ("pixel_unwrap", "cylinders", "img_size", {}),
+    "pixel_unwrap_active_edge": ("pixel_unwrap_active_edge", "grid", None, {}),
+    "pixel_unwrap_active_edge_batch": ("pixel_unwrap_active_edge", "grid", "img_size", {"batch": True}),
+    "pixel_unwrap_centerline": ("pixel_unwrap_centerline", "character", "img_size", {}),
+    "pixel_smart_follow_quads": ("pixel_smart_follow_quads", "tiles", "resolution", {}),
+}
+
+# Cases timed on batch.py's Object Mode path, which reads the mesh arrays instead of running the operator
+OBJECT_MODE_CASES = {"pixel_lint_batch"}
+
+SIZES = [1000, 10000, 100000, 1000000]
+
+# Differences below these are noise, whatever the relative threshold says
+MIN_SECONDS = 0.005
+MIN_MEMORY_MB = 10.0
+MIN_UTILIZATION = 0.005
+
+# Fresh Blenders registration is timed in, see startup.py for its budget
+STARTUP_RUNS = 5
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="run_benchmarks.py", description="Benchmark Pixel UV Tools operators")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=sorted(CASES), help="Cases to run")
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES, help="Face counts to time every case at")
+    parser.add_argument("--all-meshes", action="store_true", help="Time every case on every mesh, not only its own")
+    parser.add_argument("--resolution", type=int, default=1024, help="Texture size passed to the operators")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case on a fresh mesh, the fastest is kept")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the results")
+    parser.add_argument("--baseline", default=os.path.join(BENCHMARK_DIR, "baseline.json"), help="Results to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results to the baseline as well")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown or memory growth flagged as a regression")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET_SECONDS, help="Seconds importing and registering the addon may take")
+    parser.add_argument("--startup-runs", type=int, default=STARTUP_RUNS, help="Fresh Blenders to time registration in, the fastest is kept")
+    parser.add_argument("--blender", default=None, help="Blender executable, defaults to the running Blender")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds before a case is given up on")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--result", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    if args.startup_runs < 1:
+        parser.error("--startup-runs must be at least 1")
+    return args
+
+
+def case_list(args):
+    """(name, case, mesh, faces) for every run, smallest meshes first so failures show up early"""
+    runs = []
+    for faces in sorted(args.sizes):
+        for case in args.cases:
+            meshes = sorted(GENERATORS) if args.all_meshes else [CASES[case][1]]
+            for mesh in meshes:
+                runs.append((f"{case}/{mesh}/{faces}", case, mesh, faces))
+    return runs
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process, or None where the platform does not report it"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def texel_utilization(bmin, bmax, resolution):
+    """Fraction of the pixels of one UV tile covered by the island bounding boxes (bmin, bmax).
+    The tile is the one holding the center of all islands, the same one Pixel Pack Islands packs to"""
+    if not len(bmin):
+        return 0.0
+    origin = np.floor((bmin.min(axis=0) + bmax.max(axis=0)) / 2)
+    low = np.clip(np.floor((bmin - origin) * resolution + 1e-6), 0, resolution).astype(np.int64)
+    high = np.clip(np.ceil((bmax - origin) * resolution - 1e-6), 0, resolution).astype(np.int64)
+
+    # Mark every box corner in a difference array, the 2D prefix sum then counts covering boxes per pixel
+    diff = np.zeros((resolution + 1, resolution + 1), dtype=np.int64)
+    np.add.at(diff, (low[:, 1], low[:, 0]), 1)
+    np.add.at(diff, (low[:, 1], high[:, 0]), -1)
+    np.add.at(diff, (high[:, 1], low[:, 0]), -1)
+    np.add.at(diff, (high[:, 1], high[:, 0]), 1)
+    covered = diff.cumsum(axis=0).cumsum(axis=1)[:resolution, :resolution] > 0
+    return float(covered.mean())
+
+
+def run_once(case, mesh, faces, resolution):
+    """Build the mesh, time the operator on it and measure the result"""
+    import bpy
+    import bmesh
+    addon = batch.load_addon()
+    operator, _, size_arg, extra = CASES[case]
+    kwargs = dict(extra)
+    if size_arg:
+        kwargs[size_arg] = resolution
+
+    if bpy.context.object and bpy.context.object.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+    for ob in list(bpy.data.objects):
+        bpy.data.objects.remove(ob)
+    for me in list(bpy.data.meshes):
+        bpy.data.meshes.remove(me)
+
+    verts, quads, uvs, seams = GENERATORS[mesh](faces)
+    ob = build_object(mesh, verts, quads, uvs, seams)
+    ob.select_set(True)
+    bpy.context.view_layer.objects.active = ob
+    bpy.ops.object.mode_set(mode='EDIT')
+    bpy.ops.mesh.select_mode(type='FACE')
+    bpy.ops.mesh.select_all(action='SELECT')
+
+    # Operators that follow UV selection see every UV selected, as after Select All in the UV editor
+    bm = bmesh.from_edit_mesh(ob.data)
+    uv_layer = bm.loops.layers.uv.verify()
+    for f in bm.faces:
+        for l in f.loops:
+            l[uv_layer].select = True
+    if case == "pixel_unwrap_active_edge":
+        bm.edges.ensure_lookup_table()
+        bm.select_history.clear()
+        bm.select_history.add(bm.edges[len(bm.edges) // 2])
+    bmesh.update_edit_mesh(ob.data)
+
+    if case in OBJECT_MODE_CASES:
+        bpy.ops.object.mode_set(mode='OBJECT')
+        memory_before = peak_memory_mb()
+        start = time.perf_counter()
+        batch.lint_objects(addon, [ob.data], resolution)
+        seconds = time.perf_counter() - start
+        memory_after = peak_memory_mb()
+        bpy.ops.object.mode_set(mode='EDIT')
+    else:
+        memory_before = peak_memory_mb()
+        start = time.perf_counter()
+        getattr(bpy.ops.uv, operator)(**kwargs)
+        seconds = time.perf_counter() - start
+        memory_after = peak_memory_mb()
+
+    bm = bmesh.from_edit_mesh(ob.data)
+    uv_layer = bm.loops.layers.uv.verify()
+    uv_islands = batch.addon_module(addon, "uv_islands")
+    table = uv_islands.build_island_table(bm, uv_layer, False)
+    bmin, bmax = uv_islands.island_uv_bounds(table, uv_islands.read_uvs(table.loops, uv_layer))
+    result = {
+        "blender": bpy.app.version_string,
+        "faces": len(bm.faces),
+        "islands": uv_islands.island_count(table),
+        "seconds": seconds,
+        "peak_memory_mb": memory_after,
+        "memory_growth_mb": None if memory_after is None else memory_after - memory_before,
+        "texel_utilization": texel_utilization(bmin, bmax, resolution),
+    }
+    bpy.ops.object.mode_set(mode='OBJECT')
+    return result
+
+
+def run_worker(args):
+    case, mesh, faces = args.worker.split("/")
+    try:
+        runs = [run_once(case, mesh, int(faces), args.resolution) for _ in range(args.repeat)]
+        result = min(runs, key=lambda r: r["seconds"])
+        # Later runs start from the peak the first one reached, so only the first shows the growth
+        result["peak_memory_mb"] = runs[-1]["peak_memory_mb"]
+        result["memory_growth_mb"] = runs[0]["memory_growth_mb"]
+        result["ok"] = True
+    except Exception as e:
+        result = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    with open(args.result, "w") as f:
+        json.dump(result, f)
+    return 0 if result["ok"] else 1
+
+
+def check_startup(entry, budget):
+    """Problems with the startup runs as readable messages"""
+    if not entry["ok"]:
+        return [f"startup: FAILED: {entry['error']}"]
+    problems = []
+    if entry["seconds"] > budget:
+        problems.append(f"startup: registration took {entry['seconds']:.3f}s, over the {budget:.3f}s budget")
+    if entry["numpy_imported"]:
+        problems.append("startup: registration imported numpy")
+    if entry["eager_modules"]:
+        problems.append(f"startup: registration imported {', '.join(entry['eager_modules'])}")
+    return problems
+
+
+def run_blender(command, entry, timeout):
+    """Run a worker command in a background Blender and add the JSON it writes to the path
+    after --result to `entry`"""
+    handle, result_path = tempfile.mkstemp(suffix=".json")
+    os.close(handle)
+    try:
+        process = subprocess.run(command + ["--result", result_path], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                 text=True, timeout=timeout)
+        with open(result_path) as f:
+            text = f.read()
+        if text:
+            entry.update(json.loads(text))
+        else:
+            entry["error"] = f"Blender exited with code {process.returncode}: " + process.stderr.strip()[-500:]
+    except subprocess.TimeoutExpired:
+        entry["error"] = f"Timed out after {timeout} seconds"
+    except OSError as e:
+        entry["error"] = f"Could not start Blender: {e}"
+    finally:
+        os.remove(result_path)
+    return entry
+
+
+def run_startup(blender, args):
+    """Time registration in fresh Blenders running startup.py and keep the fastest run.
+    Modules imported by any run count against it"""
+    command = [blender, "-b", "--factory-startup", "-noaudio", "--python", os.path.join(BENCHMARK_DIR, "startup.py"), "--"]
+    runs = [run_blender(command, {"ok": False}, args.timeout) for _ in range(args.startup_runs)]
+    failed = [run for run in runs if not run["ok"]]
+    if failed:
+        return failed[0]
+    result = min(runs, key=lambda r: r["seconds"])
+    modules = set().union(*(run["modules"] for run in runs))
+    result["eager_modules"] = sorted(modules - REGISTRATION_MODULES)
+    result["numpy_imported"] = any(run["numpy_imported"] for run in runs)
+    result["runs"] = len(runs)
+    return result
+
+
+def run_case(blender, name, args):
+    command = [blender, "-b", "--factory-startup", "-noaudio", "--python", os.path.abspath(__file__), "--",
+               "--worker", name, "--resolution", str(args.resolution), "--repeat", str(args.repeat)]
+    return run_blender(command, {"name": name, "ok": False}, args.timeout)
+
+
+def compare(cases, baseline, threshold):
+    """Regressions of `cases` against the baseline cases as readable messages"""
+    previous = {c["name"]: c for c in baseline.get("cases", []) if c.get("ok")}
+    regressions = []
+    for case in cases:
+        base = previous.get(case["name"])
+        if base is None or not case["ok"]:
+            continue
+        if case["seconds"] > base["seconds"] * (1 + threshold) and case["seconds"] - base["seconds"] > MIN_SECONDS:
+            regressions.append(f"{case['name']}: {base['seconds']:.3f}s -> {case['seconds']:.3f}s")
+        growth, base_growth = case.get("memory_growth_mb"), base.get("memory_growth_mb")
+        if (growth is not None and base_growth is not None and growth > base_growth * (1 + threshold)
+                and growth - base_growth > MIN_MEMORY_MB):
+            regressions.append(f"{case['name']}: memory growth {base_growth:.1f}MB -> {growth:.1f}MB")
+        if case["texel_utilization"] < base["texel_utilization"] - MIN_UTILIZATION:
+            regressions.append(f"{case['name']}: texel utilization "
+                               f"{base['texel_utilization']:.3f} -> {case['texel_utilization']:.3f}")
+    return regressions
+
+
+def run_benchmarks(args):
+    blender = batch.blender_executable(args)
+
+    # Registration runs on every Blender start and every farm worker, so it has a fixed budget
+    startup = run_startup(blender, args)
+    startup_problems = check_startup(startup, args.startup_budget)
+    if startup["ok"]:
+        print(f"  startup: {startup['seconds']:.3f}s, fastest of {startup['runs']}")
+
+    cases = []
+    for name, case, mesh, faces in case_list(args):
+        entry = run_case(blender, name, args)
+        if entry["ok"]:
+            print(f"  {name}: {entry['seconds']:.3f}s, {entry['islands']} islands, "
+                  f"texel utilization {entry['texel_utilization']:.3f}")
+        else:
+            print(f"  {name}: FAILED: {entry['error']}")
+        cases.append(entry)
+
+    results = {
+        "blender": next((c["blender"] for c in cases if c["ok"]), None),
+        "platform": platform.platform(),
+        "resolution": args.resolution,
+        "repeat": args.repeat,
+        "startup": startup,
+        "cases": cases,
+    }
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(cases, json.load(f), args.threshold)
+        results["regressions"] = regressions
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failed = [c for c in cases if not c["ok"]]
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    for message in startup_problems:
+        print(f"STARTUP {message}")
+    print(f"Pixel UV Tools benchmarks: {len(cases) - len(failed)} of {len(cases)} cases done, "
+          f"{len(regressions)} regressions. Results: {args.output}")
+    return 1 if failed or regressions or startup_problems else 0
+
+
+def main(argv):
+    args = parse_args(batch.script_args(argv))
+    return run_worker(args) if args.worker else run_benchmarks(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
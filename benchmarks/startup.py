@@ -0,0 +1,53 @@
+"""Time importing and registering Pixel UV Tools in a fresh Blender.
+
+    blender -b --factory-startup --python benchmarks/startup.py -- --result startup.json
+
+run_benchmarks.py and tests/test_startup.py start this several times and check the
+fastest run. It imports nothing but batch.py before registering, so neither the timing
+nor the modules it lists include NumPy, the benchmark meshes or the benchmark runner.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import batch  # noqa: E402
+
+
+# Registration may take this long, and may import only these modules of the addon. Operator
+# implementations, and NumPy with them, are imported on first execute
+STARTUP_BUDGET_SECONDS = 0.05
+REGISTRATION_MODULES = {"operators", "operators.registration", "operators.profiling"}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="startup.py", description="Time registering Pixel UV Tools")
+    parser.add_argument("--result", required=True, help="Where to write the timing as JSON")
+    args = parser.parse_args(batch.script_args(argv))
+
+    # Blender may load NumPy for its own scripts, which registration is not to blame for
+    numpy_preloaded = "numpy" in sys.modules
+    try:
+        start = time.perf_counter()
+        addon = batch.load_addon()
+        seconds = time.perf_counter() - start
+        prefix = addon.__name__ + "."
+        result = {
+            "ok": True,
+            "seconds": seconds,
+            "modules": sorted(name[len(prefix):] for name in sys.modules if name.startswith(prefix)),
+            "numpy_loaded": "numpy" in sys.modules,
+            "numpy_imported": not numpy_preloaded and "numpy" in sys.modules,
+        }
+    except Exception as e:
+        result = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    with open(args.result, "w") as f:
+        json.dump(result, f)
+    return 0 if result["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,140 @@
+import numpy as np
+from mathutils.kdtree import KDTree
+
+
+# Distance, as a fraction of an island's radius, under which two vertex positions are the same
+POSITION_TOLERANCE = 1e-4
+
+# Most anchor pairs tried when laying one island onto another; symmetric islands have one
+# candidate pair per symmetry
+MAX_FRAMES = 256
+
+
+def frame_coords(coords, a, b):
+    """`coords` in the right-handed frame whose first axis points at `a` and whose second axis
+    lies in the plane of `a` and `b`"""
+    e1 = a / np.linalg.norm(a)
+    e2 = b - (b @ e1) * e1
+    e2 /= np.linalg.norm(e2)
+    return coords @ np.stack((e1, e2, np.cross(e1, e2)), axis=1)
+
+
+class IslandShape:
+    """The vertices and faces of one seam island, centered on their centroid. Its frame is
+    anchored on the vertex furthest from the centroid and the vertex furthest from the line
+    through it, so symmetric islands such as rivets and square panels still have one. The
+    frame is right-handed, so a mirrored copy never matches."""
+
+    def __init__(self, faces):
+        self.faces = faces
+        verts = list({l.vert: None for f in faces for l in f.loops})
+        self.slot = {v: i for i, v in enumerate(verts)}
+        co = np.array([v.co for v in verts], dtype=np.float64).reshape(-1, 3)
+        self.coords = co - co.mean(axis=0)
+        self.radii = np.linalg.norm(self.coords, axis=1)
+        self.profile = np.sort(self.radii)
+        self.tolerance = POSITION_TOLERANCE * max(float(self.profile[-1]), 1e-9)
+        self.key = (len(faces), len(verts), sum(len(f.loops) for f in faces))
+        self.tree = None
+
+        # Anchors: a on the outermost radius, b furthest from the line through a
+        a = int(np.argmax(self.radii))
+        along, across = self.line_distances(self.coords[a])
+        b = int(np.argmax(across))
+        self.anchors = (a, b) if across[b] > self.tolerance else None
+        if self.anchors:
+            self.anchor_radius = float(self.radii[a])
+            self.anchor_along, self.anchor_across = float(along[b]), float(across[b])
+
+    def line_distances(self, a):
+        """Signed position along, and distance from, the line through the centroid and `a`,
+        for every vertex"""
+        axis = a / np.linalg.norm(a)
+        along = self.coords @ axis
+        return along, np.linalg.norm(self.coords - along[:, None] * axis, axis=1)
+
+    def similar(self, other):
+        return (self.key == other.key and self.anchors is not None and other.anchors is not None
+                and np.allclose(self.profile, other.profile, rtol=0.0, atol=self.tolerance))
+
+    def match(self, other):
+        """Loop correspondence that lays `other` onto this island by a rotation and a
+        translation, as two equally long lists (loops of this island, loops of other), or
+        None if there is none"""
+        if self.tree is None:
+            a, b = self.anchors
+            self.tree = KDTree(len(self.coords))
+            for i, co in enumerate(frame_coords(self.coords, self.coords[a], self.coords[b]).tolist()):
+                self.tree.insert(co, i)
+            self.tree.balance()
+            self.face_of = {frozenset(self.slot[l.vert] for l in f.loops): f for f in self.faces}
+
+        # Every pair of vertices of `other` that could play the part of this island's anchors
+        frames = 0
+        for a in np.flatnonzero(np.abs(other.radii - self.anchor_radius) <= self.tolerance).tolist():
+            along, across = other.line_distances(other.coords[a])
+            fits = (np.abs(along - self.anchor_along) <= self.tolerance) & (np.abs(across - self.anchor_across) <= self.tolerance)
+            for b in np.flatnonzero(fits).tolist():
+                frames += 1
+                if frames > MAX_FRAMES:
+                    return None
+                mapping = self.map_verts(frame_coords(other.coords, other.coords[a], other.coords[b]))
+                if mapping is not None:
+                    loops = self.map_loops(other, mapping)
+                    if loops is not None:
+                        return loops
+        return None
+
+    def map_verts(self, coords):
+        """Index of this island's vertex at each of `coords`, or None unless every position
+        has a distinct vertex"""
+        mapping = []
+        for co in coords.tolist():
+            _, i, distance = self.tree.find(co)
+            if distance > self.tolerance:
+                return None
+            mapping.append(i)
+        return mapping if len(set(mapping)) == len(mapping) else None
+
+    def map_loops(self, other, mapping):
+        """Corresponding loops for a vertex mapping from `other` onto this island, or None if
+        the faces or seams of the two islands differ"""
+        mine, theirs = [], []
+        for f in other.faces:
+            face = self.face_of.get(frozenset(mapping[other.slot[l.vert]] for l in f.loops))
+            if face is None:
+                return None
+            by_vert = {self.slot[l.vert]: l for l in face.loops}
+            for l in f.loops:
+                match = by_vert[mapping[other.slot[l.vert]]]
+                if match.edge.seam != l.edge.seam:
+                    return None
+                mine.append(match)
+                theirs.append(l)
+        return mine, theirs
+
+
+def find_duplicate_islands(islands):
+    """Group seam islands into classes of islands that are the same 3D shape up to rotation
+    and translation, with the same faces and seams. `islands` are (faces, uv layer) pairs;
+    islands with pinned UVs are never grouped. Returns (representatives, duplicates) where
+    representatives are island indices and each duplicate is (island index, representative
+    index, representative loops, island loops) with corresponding loops in the same order."""
+    representatives, duplicates = [], []
+    classes = {}
+    for index, (faces, uv_layer) in enumerate(islands):
+        if any(l[uv_layer].pin_uv for f in faces for l in f.loops):
+            representatives.append(index)
+            continue
+
+        shape = IslandShape(faces)
+        for rep_index, rep in classes.get(shape.key, []):
+            if rep.similar(shape):
+                loops = rep.match(shape)
+                if loops is not None:
+                    duplicates.append((index, rep_index) + loops)
+                    break
+        else:
+            classes.setdefault(shape.key, []).append((index, shape))
+            representatives.append(index)
+    return representatives, duplicates
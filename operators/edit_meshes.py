@@ -0,0 +1,35 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import bmesh
+
+
+def get_edit_meshes(context):
+    """Meshes of every object in edit mode. A mesh shared by several objects is listed once"""
+    objects = getattr(context, "objects_in_mode_unique_data", None)
+    if objects is None:
+        objects = [context.edit_object]
+    return [ob.data for ob in objects if ob is not None and ob.type == 'MESH']
+
+
+def edit_bmeshes(context):
+    """(mesh, bmesh, uv layer) for every mesh in edit mode, with lookup tables ensured"""
+    result = []
+    for me in get_edit_meshes(context):
+        bm = bmesh.from_edit_mesh(me)
+        bm.faces.ensure_lookup_table()
+        bm.edges.ensure_lookup_table()
+        bm.verts.ensure_lookup_table()
+        result.append((me, bm, bm.loops.layers.uv.verify()))
+    return result
+
+
+def parallel_map(function, items):
+    """Apply `function` to every item on a thread pool and return the results in order.
+    Meant for the NumPy side of per-mesh work, whose kernels release the GIL. bmesh
+    reads and writes must stay on the calling thread."""
+    items = list(items)
+    if len(items) < 2:
+        return [function(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(len(items), os.cpu_count() or 1)) as pool:
+        return list(pool.map(function, items))
@@ -0,0 +1,53 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from .uv_islands import IslandTable, group_uv_islands
+
+
+# Island tables of the most recently used meshes, kept for the rest of the Blender session
+MAX_MESHES = 16
+
+_tables = OrderedDict()
+
+
+def mesh_state(bm, uv_layer, faces, loops):
+    """Digest of everything island detection depends on: the size of the mesh, the index and
+    size of every face in scope, and the vertex and UV of each of their loops. Only the faces
+    in scope are read, so a selected-only table never pays for a pass over the whole mesh"""
+    sizes = np.fromiter((c for f in faces for c in (f.index, len(f.loops))), dtype=np.int64, count=2 * len(faces))
+    corners = np.fromiter((c for l in loops for c in (*l[uv_layer].uv, l.vert.index)), dtype=np.float64, count=3 * len(loops))
+    digest = hashlib.blake2b(np.array((len(bm.faces), len(bm.verts)), dtype=np.int64).tobytes(), digest_size=16)
+    digest.update(sizes.tobytes())
+    digest.update(corners.tobytes())
+    return digest.digest()
+
+
+def cached_island_table(me, bm, uv_layer, only_selected):
+    """build_island_table with a session cache keyed by mesh identity and a digest of the
+    faces in scope. Redoing an operator restores the same input, so its islands are found
+    without running island detection again. The cache holds only index arrays, since the
+    BMesh and its loops are rebuilt on every undo; a stale entry is replaced on mismatch."""
+    faces = [f for f in bm.faces if f.select] if only_selected else list(bm.faces)
+    loops = [l for f in faces for l in f.loops]
+    state = mesh_state(bm, uv_layer, faces, loops)
+    key = (me.as_pointer(), uv_layer.name, only_selected)
+
+    entry = _tables.get(key)
+    if entry is not None and entry[0] == state:
+        _tables.move_to_end(key)
+        _, face_offsets, face_indices, loop_offsets, loop_indices, positions = entry
+        return IslandTable(face_offsets, face_indices, loop_offsets, loop_indices, [loops[k] for k in positions.tolist()])
+
+    table = group_uv_islands(faces, uv_layer)
+
+    # Where each table loop sits among the loops in scope, so the loop list can be rebuilt from any copy of the mesh
+    slot = {l: k for k, l in enumerate(loops)}
+    positions = np.fromiter((slot[l] for l in table.loops), dtype=np.int64, count=len(table.loops))
+
+    _tables[key] = (state, table.face_offsets, table.face_indices, table.loop_offsets, table.loop_indices, positions)
+    _tables.move_to_end(key)
+    while len(_tables) > MAX_MESHES:
+        _tables.popitem(last=False)
+    return table
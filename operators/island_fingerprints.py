@@ -0,0 +1,25 @@
+import hashlib
+
+
+# Mesh custom property holding the fingerprints of the islands Pixel Unwrap laid out last
+PROPERTY = "pixel_uv_tools_islands"
+
+
+def island_fingerprint(faces):
+    """Hash of an island's topology, seams and 3D vertex positions (rounded to 5 decimals).
+    It does not depend on face or vertex indices, so edits elsewhere in the mesh leave it
+    unchanged, and it ignores UVs, so it only changes when the island needs a new unwrap."""
+    face_keys = sorted(tuple(sorted((l.vert.co.to_tuple(5), l.edge.seam) for l in f.loops)) for f in faces)
+    return hashlib.blake2b(repr(face_keys).encode(), digest_size=16).hexdigest()
+
+
+def load_fingerprints(me, settings):
+    """Fingerprints stored on the mesh, or an empty set if they were made with other settings"""
+    state = me.get(PROPERTY)
+    if state is None or state.get("settings") != settings:
+        return set()
+    return set(state.get("fingerprints", "").split())
+
+
+def store_fingerprints(me, settings, fingerprints):
+    me[PROPERTY] = {"settings": settings, "fingerprints": " ".join(sorted(fingerprints))}
@@ -0,0 +1,60 @@
+import hashlib
+from collections import OrderedDict
+
+import bmesh
+import numpy as np
+
+from .uv_islands import read_uvs, write_uvs
+
+
+# Intermediate layouts of the most recent operator runs, kept for the rest of the Blender session
+MAX_LAYOUTS = 4
+
+_layouts = OrderedDict()
+
+
+def layout_key(operator, meshes):
+    return (operator.bl_idname, tuple(me.as_pointer() for me, bm, uv_layer in meshes))
+
+
+def layout_state(meshes, settings):
+    """Digest of everything an unwrap or pack depends on besides the texture size: the size of
+    every edit mesh, and the index, size, geometry, seams, pins and UVs of its selected faces,
+    and `settings`. Unselected faces take no part in either, so they are never read. Inputs
+    from outside the meshes, such as a target UDIM tile, belong in `settings`"""
+    digest = hashlib.blake2b(repr(settings).encode(), digest_size=16)
+    for me, bm, uv_layer in meshes:
+        faces = [f for f in bm.faces if f.select]
+        loops = [l for f in faces for l in f.loops]
+        sizes = np.fromiter((c for f in faces for c in (f.index, len(f.loops))), dtype=np.int64, count=2 * len(faces))
+        corners = np.fromiter((c for l in loops for c in (*l[uv_layer].uv, *l.vert.co, l.vert.index, l.edge.seam, l[uv_layer].pin_uv)),
+                              dtype=np.float64, count=8 * len(loops))
+        digest.update(np.array((len(bm.faces), len(bm.verts)), dtype=np.int64).tobytes())
+        digest.update(sizes.tobytes())
+        digest.update(corners.tobytes())
+    return digest.digest()
+
+
+def selected_loops(bm):
+    return [l for f in bm.faces if f.select for l in f.loops]
+
+
+def load_layout(key, state, meshes):
+    """Write back the intermediate layout stored for this exact input, if there is one.
+    Returns True if it was restored."""
+    entry = _layouts.get(key)
+    if entry is None or entry[0] != state:
+        return False
+    _layouts.move_to_end(key)
+    for (me, bm, uv_layer), uvs in zip(meshes, entry[1]):
+        write_uvs(selected_loops(bm), uv_layer, uvs)
+        bmesh.update_edit_mesh(me)
+    return True
+
+
+def store_layout(key, state, meshes):
+    """Keep the current UVs of the selected faces as the intermediate layout for input `state`"""
+    _layouts[key] = (state, [read_uvs(selected_loops(bm), uv_layer) for me, bm, uv_layer in meshes])
+    _layouts.move_to_end(key)
+    while len(_layouts) > MAX_LAYOUTS:
+        _layouts.popitem(last=False)
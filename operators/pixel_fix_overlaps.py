@@ -0,0 +1,75 @@
+import bpy
+import bmesh
+import numpy as np
+
+from . import profiling
+from .edit_meshes import edit_bmeshes
+from .island_cache import cached_island_table
+from .pixel_lint import select_islands
+from .texel_overlaps import island_texels, nudge_overlapping_islands, texel_overlaps
+from .uv_islands import concatenate_tables, per_loop, read_uvs, table_face_sizes, write_uvs
+
+
+def fix_overlaps(meshes, resolution, margin, resolve):
+    """Find islands of all (mesh, bmesh, uv layer, table, uvs) that share texels on the pixel
+    grid, and with `resolve` nudge them by whole pixels into the nearest free space.
+    Returns (uvs, overlapping, unresolved, pairs) where the first three hold one array per
+    mesh and pairs is the number of island pairs that shared texels."""
+    table = concatenate_tables([m[3] for m in meshes])
+    uvs = np.concatenate([m[4] for m in meshes]) if meshes else np.empty((0, 2))
+    face_sizes = np.concatenate([table_face_sizes(m[1], m[3]) for m in meshes] or [np.zeros(0, dtype=np.int64)])
+
+    anchors, masks, texels = island_texels(table, uvs, face_sizes, resolution)
+    pairs = texel_overlaps(texels)
+    overlapping = np.zeros(len(masks), dtype=bool)
+    overlapping[pairs.ravel()] = True
+
+    unresolved = overlapping
+    if resolve and len(pairs):
+        offsets, unresolved = nudge_overlapping_islands(anchors, masks, overlapping, resolution, margin)
+        uvs = uvs + per_loop(table, offsets) / resolution
+
+    loop_split = np.cumsum([len(m[3].loops) for m in meshes])[:-1]
+    island_split = np.cumsum([len(m[3].face_offsets) - 1 for m in meshes])[:-1]
+    return np.split(uvs, loop_split), np.split(overlapping, island_split), np.split(unresolved, island_split), len(pairs)
+
+
+def main(context, operator):
+    profile = profiling.current()
+
+    # Force face select mode for consistent behavior across selection modes
+    original_select_mode = tuple(context.tool_settings.mesh_select_mode)
+    bpy.ops.mesh.select_mode(type='FACE')
+
+    meshes = []
+    with profile.stage("find islands"):
+        for me, bm, uv_layer in edit_bmeshes(context):
+            table = cached_island_table(me, bm, uv_layer, True)
+            meshes.append((me, bm, uv_layer, table, read_uvs(table.loops, uv_layer)))
+
+    with profile.stage("fix overlaps"):
+        uvs, overlapping, unresolved, pairs = fix_overlaps(meshes, operator.resolution, operator.margin, operator.resolve)
+    found = sum(int(np.count_nonzero(o)) for o in overlapping)
+    left = sum(int(np.count_nonzero(u)) for u in unresolved)
+
+    with profile.stage("write UVs"):
+        for (me, bm, uv_layer, table, _), mesh_uvs, mesh_left in zip(meshes, uvs, unresolved):
+            if operator.resolve:
+                write_uvs(table.loops, uv_layer, mesh_uvs)
+            # Select the islands that still share texels so they can be fixed by hand
+            if left:
+                select_islands(bm, uv_layer, table, mesh_left, True)
+            bmesh.update_edit_mesh(me)
+
+    # Restore the user's original selection mode
+    context.tool_settings.mesh_select_mode = original_select_mode
+
+    if not found:
+        operator.report({'INFO'}, "No UV islands share texels")
+    elif not operator.resolve:
+        operator.report({'WARNING'}, f"{found} UV islands share texels in {pairs} pairs")
+    elif left:
+        operator.report({'WARNING'}, f"Separated {found - left} of {found} overlapping UV islands; {left} found no free space in their tile")
+    else:
+        operator.report({'INFO'}, f"Separated {found} overlapping UV islands by nudging them to free texels")
+    return {'FINISHED'}
@@ -0,0 +1,139 @@
+import json
+
+import bpy
+import bmesh
+import numpy as np
+
+from . import profiling
+from .edit_meshes import edit_bmeshes
+from .island_cache import cached_island_table
+from .registration import CHECKS, DEFAULT_CHECKS
+from .uv_islands import island_count, island_table_from_arrays, island_uv_bounds, mesh_uv_arrays, read_uvs
+
+
+def off_grid(values, resolution, offset, tolerance):
+    """True where `values` in UV space are further than `tolerance` pixels from the pixel
+    grid shifted by `offset` pixels"""
+    pixels = values * resolution - offset
+    return np.abs(pixels - np.round(pixels)) > tolerance
+
+
+def lint_islands(table, uvs, resolution, tolerance):
+    """Run every check over the islands of one table in a single batched pass.
+    `uvs` is in table loop order. Returns check name -> (islands,) bool array of offending
+    islands, and the number of loops off the pixel corners."""
+    count = island_count(table)
+    if not count:
+        return {check: np.zeros(0, dtype=bool) for check in CHECKS}, 0
+
+    pixel = 1.0 / resolution
+    bmin, bmax = island_uv_bounds(table, uvs)
+    sizes = bmax - bmin
+    flat = sizes < tolerance * pixel
+    subpixel = ~flat & (sizes < pixel - tolerance * pixel)
+
+    # Bounds are checked per axis, so a strip flat on one axis is still checked along the other
+    whole = ~flat & ~subpixel
+
+    loops_off = np.any(off_grid(uvs, resolution, 0.0, tolerance), axis=1)
+    off_per_island = np.add.reduceat(loops_off.astype(np.int64), table.loop_offsets[:-1])
+
+    result = {
+        'BOUNDS': np.any(whole & (off_grid(bmin, resolution, 0.0, tolerance) | off_grid(bmax, resolution, 0.0, tolerance)), axis=1),
+        'CORNERS': off_per_island > 0,
+        'FLAT': np.any(flat & off_grid(bmin, resolution, 0.5, tolerance), axis=1),
+        'SUBPIXEL': np.any(subpixel, axis=1),
+    }
+    return result, int(np.count_nonzero(loops_off))
+
+
+def lint_table(table, uvs, resolution, tolerance, checks):
+    """Lint the islands of one UV map. Returns the JSON-ready counts for its summary entry,
+    and a mask of the islands that fail any of `checks`"""
+    flags, loops_off = lint_islands(table, uvs, resolution, tolerance)
+    mask = np.zeros(island_count(table), dtype=bool)
+    for check in checks:
+        mask |= flags[check]
+
+    # Islands are identified by their lowest face index, which does not depend on detection order
+    first_faces = np.minimum.reduceat(table.face_indices, table.face_offsets[:-1]) if island_count(table) else table.face_indices
+    entry = {
+        "islands": island_count(table),
+        "loops": len(table.loops),
+        "off_corner_loops": loops_off,
+        "offending_islands": int(np.count_nonzero(mask)),
+        "checks": {check: {"islands": int(np.count_nonzero(failed)), "faces": first_faces[failed].tolist()}
+                   for check, failed in flags.items()},
+    }
+    return entry, mask
+
+
+def lint_meshes(meshes, resolution, tolerance, only_selected, checks=DEFAULT_CHECKS):
+    """Lint the UV map of every (mesh, bmesh, uv layer). Returns a JSON-ready list with one
+    entry per mesh, and (mesh, bmesh, uv layer, table, mask) per mesh where the mask marks
+    the islands that fail any of `checks`"""
+    results, offending = [], []
+    for me, bm, uv_layer in meshes:
+        table = cached_island_table(me, bm, uv_layer, only_selected)
+        entry, mask = lint_table(table, read_uvs(table.loops, uv_layer), resolution, tolerance, checks)
+        results.append({"mesh": me.name, "uv_map": uv_layer.name, **entry})
+        offending.append((me, bm, uv_layer, table, mask))
+    return results, offending
+
+
+def lint_mesh_arrays(me, resolution, tolerance, checks=DEFAULT_CHECKS):
+    """Lint every face of a mesh in Object Mode from its arrays, without building a bmesh.
+    Gives the same summary entry as lint_meshes, along with the island table and its UVs"""
+    loop_starts, loop_totals, loop_verts, uvs = mesh_uv_arrays(me)
+    table = island_table_from_arrays(loop_starts, loop_totals, loop_verts, uvs)
+    uvs = uvs[table.loop_indices]
+    entry, _ = lint_table(table, uvs, resolution, tolerance, checks)
+    uv_map = me.uv_layers.active.name if me.uv_layers.active is not None else None
+    return {"mesh": me.name, "uv_map": uv_map, **entry}, table, uvs
+
+
+def select_islands(bm, uv_layer, table, mask, only_selected):
+    """Select the faces and UVs of the islands in `mask` and deselect every other face in scope"""
+    scope = [f for f in bm.faces if f.select] if only_selected else bm.faces
+    for f in scope:
+        f.select_set(False)
+        for l in f.loops:
+            l[uv_layer].select = False
+    island_faces = np.split(table.face_indices, table.face_offsets[1:-1])
+    for i in np.flatnonzero(mask).tolist():
+        for f in (bm.faces[j] for j in island_faces[i].tolist()):
+            f.select_set(True)
+            for l in f.loops:
+                l[uv_layer].select = True
+
+
+def main(context, operator):
+    profile = profiling.current()
+
+    # Force face select mode for consistent behavior across selection modes
+    original_select_mode = tuple(context.tool_settings.mesh_select_mode)
+    bpy.ops.mesh.select_mode(type='FACE')
+
+    with profile.stage("lint"):
+        results, meshes = lint_meshes(edit_bmeshes(context), operator.resolution, operator.tolerance, operator.only_selected, operator.checks)
+
+    found = {check: sum(r["checks"][check]["islands"] for r in results) for check in CHECKS}
+    total = sum(r["islands"] for r in results)
+
+    with profile.stage("select offending islands"):
+        for me, bm, uv_layer, table, mask in meshes:
+            select_islands(bm, uv_layer, table, mask, operator.only_selected)
+            bmesh.update_edit_mesh(me, loop_triangles=False, destructive=False)
+
+    # Restore the user's original selection mode
+    context.tool_settings.mesh_select_mode = original_select_mode
+
+    print("pixel_uv_tools_lint " + json.dumps({"resolution": operator.resolution, "tolerance": operator.tolerance,
+                                               "checks": sorted(operator.checks), "meshes": results}))
+
+    problems = ", ".join(f"{found[check]} {CHECKS[check][0].lower()}" for check in CHECKS if check in operator.checks and found[check])
+    if problems:
+        operator.report({'WARNING'}, f"{problems} in {total} UV islands at {operator.resolution}px")
+    else:
+        operator.report({'INFO'}, f"All {total} UV islands are aligned to the {operator.resolution}px grid")
+    return {'FINISHED'}
@@ -0,0 +1,180 @@
+import numpy as np
+
+from .pixel_packer import island_footprints, place_islands
+from .uv_islands import island_count, island_uv_bounds, per_loop
+
+
+def covered_texels(table, uvs, face_sizes, resolution, anchors, footprints):
+    """Texels covered by each island as (island, x, y) arrays, in pixels from the island's
+    anchor and clipped to its (width, height) footprint. Anchors are an (islands, 2) array
+    in pixels. A texel is covered when a face overlaps it with positive area; faces with no
+    area cover every texel of their bounding box. `uvs` is in table loop order and
+    `face_sizes` gives the loop count of each table face, see table_face_sizes.
+    A texel covered by several faces of an island is listed once per face."""
+    points = uvs * resolution - per_loop(table, anchors)
+
+    # Fan-triangulate every face
+    starts = np.cumsum(face_sizes) - face_sizes
+    fans = np.maximum(face_sizes - 2, 0)
+    first = np.repeat(starts, fans)
+    second = first + 1 + np.arange(fans.sum()) - np.repeat(np.cumsum(fans) - fans, fans)
+    island = np.repeat(np.repeat(np.arange(island_count(table)), np.diff(table.face_offsets)), fans)
+    a, b, c = points[first], points[second], points[second + 1]
+
+    # Candidate texels: the bounding box of each triangle, clipped to its island's footprint
+    eps = 1e-6
+    size = footprints[island]
+    lo = np.clip(np.floor(np.minimum(np.minimum(a, b), c) + eps).astype(np.int64), 0, size - 1)
+    hi = np.clip(np.ceil(np.maximum(np.maximum(a, b), c) - eps).astype(np.int64), lo + 1, size)
+    spans = hi - lo
+    counts = spans[:, 0] * spans[:, 1]
+    tri = np.repeat(np.arange(len(counts)), counts)
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    cx = lo[tri, 0] + k % spans[tri, 0]
+    cy = lo[tri, 1] + k // spans[tri, 0]
+
+    # Separating axis test against each triangle edge: a texel overlaps the triangle when,
+    # for every edge, its corner furthest along the inward normal lies strictly inside
+    ab, ac = b - a, c - a
+    cross = ab[:, 0] * ac[:, 1] - ab[:, 1] * ac[:, 0]
+    degenerate = np.abs(cross) < eps
+    orient = np.sign(cross)
+    covered = degenerate[tri]
+    inside = np.ones(len(tri), dtype=bool)
+    for p, q in ((a, b), (b, c), (c, a)):
+        normal = np.stack((p[:, 1] - q[:, 1], q[:, 0] - p[:, 0]), axis=1) * orient[:, None]
+        n, start = normal[tri], p[tri]
+        reach = n[:, 0] * (cx - start[:, 0]) + n[:, 1] * (cy - start[:, 1]) + np.maximum(n, 0).sum(axis=1)
+        inside &= reach > eps * np.hypot(n[:, 0], n[:, 1])
+    covered |= inside
+    return island[tri][covered], cx[covered], cy[covered]
+
+
+def texel_masks(island, x, y, footprints):
+    """Boolean mask per island, rows bottom to top, from covered texels as (island, x, y)"""
+    # Scatter covered texels into one flat buffer holding every mask back to back
+    cells = footprints[:, 0] * footprints[:, 1]
+    offsets = np.cumsum(cells) - cells
+    flat = np.zeros(cells.sum(), dtype=bool)
+    flat[offsets[island] + y * footprints[island, 0] + x] = True
+    return [flat[o:o + w * h].reshape(h, w) for o, (w, h) in zip(offsets.tolist(), footprints.tolist())]
+
+
+def island_masks(table, uvs, face_sizes, resolution):
+    """Boolean texel mask of every island, rows bottom to top, sized to its whole-pixel
+    footprint with the bounding box minimum at the corner of texel (0, 0).
+    See covered_texels for the arguments and what counts as covered."""
+    bmin, bmax = island_uv_bounds(table, uvs)
+    footprints = island_footprints(bmax - bmin, resolution)
+    return texel_masks(*covered_texels(table, uvs, face_sizes, resolution, bmin * resolution, footprints), footprints)
+
+
+def turn_mask(mask, turns):
+    """Mask turned counterclockwise by a number of quarter turns, matching place_islands"""
+    for _ in range(turns % 4):
+        mask = mask[::-1].T
+    return mask
+
+
+def dilate(mask, margin):
+    """Mask grown by `margin` texels in every direction, diagonals included"""
+    if not margin:
+        return mask
+    h, w = mask.shape
+    rows = np.zeros((h, w + 2 * margin), dtype=bool)
+    for dx in range(2 * margin + 1):
+        rows[:, dx:dx + w] |= mask
+    grown = np.zeros((h + 2 * margin, w + 2 * margin), dtype=bool)
+    for dy in range(2 * margin + 1):
+        grown[dy:dy + h] |= rows
+    return grown
+
+
+def mask_runs(mask):
+    """Horizontal runs of set texels as (row, start column, end column) arrays"""
+    h, w = mask.shape
+    padded = np.zeros((h, w + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return rows, starts, ends
+
+
+def blocked_positions(prefix, runs, ny, nx):
+    """(ny, nx) bool array, True where a mask with the given runs, placed with its corner at
+    that offset, covers a set texel of the bitmap whose row prefix sums are `prefix`"""
+    blocked = np.zeros((ny, nx), dtype=bool)
+    for r, c0, c1 in zip(*(v.tolist() for v in runs)):
+        blocked |= prefix[r:r + ny, c1:c1 + nx] != prefix[r:r + ny, c0:c0 + nx]
+    return blocked
+
+
+def mask_pack(masks, width, margin, rotate):
+    """Bottom-left packing of texel masks into an occupancy bitmap `width` texels wide.
+    Every island keeps `margin` free texels to every other island, diagonals included, and
+    may sit flush against the atlas edges. For each mask and each turn tried, the overlap
+    with everything placed so far is tested at all positions at once, using row prefix sums
+    of the bitmap over the runs of the margin-grown mask. The lowest-resting position wins,
+    then the leftmost. With `rotate` all four quarter turns are tried. Masks are placed
+    largest first with the original index as the final tie break, so identical input gives
+    identical output. Returns (positions, turns, (width, height) used) where positions is an
+    (n, 2) int array of mask origins."""
+    n = len(masks)
+    positions = np.zeros((n, 2), dtype=np.int64)
+    turns = np.zeros(n, dtype=np.int64)
+    candidates = (0, 1, 2, 3) if rotate else (0,)
+
+    # The bitmap is padded by the margin on every side, and rows are added as islands stack up
+    width = max([width] + [min(m.shape) if rotate else m.shape[1] for m in masks])
+    occupied = np.zeros((2 * margin, width + 2 * margin), dtype=bool)
+    prefix = np.zeros((2 * margin, width + 2 * margin + 1), dtype=np.int32)
+    top = 0
+    used_width = 0
+
+    order = sorted(range(n), key=lambda k: (-int(masks[k].sum()), -max(masks[k].shape), k))
+    for k in order:
+        best = None
+        for turn in candidates:
+            shape = turn_mask(masks[k], turn)
+            h, w = shape.shape
+            if w > width:
+                continue
+
+            # Anything from row `top` up is free, so the search never needs to go higher
+            if len(occupied) < top + h + 2 * margin:
+                grow = top + h + 2 * margin - len(occupied)
+                occupied = np.vstack((occupied, np.zeros((grow, occupied.shape[1]), dtype=bool)))
+                prefix = np.vstack((prefix, np.zeros((grow, prefix.shape[1]), dtype=np.int32)))
+
+            blocked = blocked_positions(prefix, mask_runs(dilate(shape, margin)), top + 1, width - w + 1)
+            free_rows = np.flatnonzero(~blocked.all(axis=1))
+            y = int(free_rows[0])
+            x = int(np.argmin(blocked[y]))
+            if best is None or (y + h, x) < (best[0] + best[2].shape[0], best[1]):
+                best = (y, x, shape, turn)
+
+        y, x, shape, turn = best
+        h, w = shape.shape
+        rows = slice(y + margin, y + margin + h)
+        occupied[rows, x + margin:x + margin + w] |= shape
+        prefix[rows, 1:] = np.cumsum(occupied[rows], axis=1)
+        top = max(top, y + margin + h)
+        used_width = max(used_width, x + w)
+        positions[k] = (x, y)
+        turns[k] = turn
+
+    return positions, turns, (used_width, top - margin)
+
+
+def pack_islands_to_pixel_masks(table, uvs, resolution, margin, rotate, origin, face_sizes):
+    """Lay out pixel-sized islands by the exact texels they cover on the pixel grid of the
+    tile whose lower-left corner is `origin`, trying all four quarter turns with `rotate`.
+    Islands interlock where their bounding boxes would overlap, and every island lands on
+    the grid with no second pass. `uvs` is in table loop order and `face_sizes` gives the
+    loop count of each table face. Returns (packed uvs, True if the layout overflows the tile)."""
+    if not island_count(table):
+        return uvs, False
+    masks = island_masks(table, uvs, face_sizes, resolution)
+    positions, turns, (width, height) = mask_pack(masks, resolution, margin, rotate)
+    return place_islands(table, uvs, positions, turns, resolution, origin), width > resolution or height > resolution
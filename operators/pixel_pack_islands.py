@@ -1,99 +1,278 @@
+import functools
+import math
+
 import bpy
 import bmesh
+import numpy as np
+
+from . import profiling
+from .edit_meshes import edit_bmeshes, parallel_map
+from .island_cache import cached_island_table
+from .layout_cache import layout_key, layout_state, load_layout, store_layout
+from .pixel_move_islands import move_islands_to_pixels
+from .pixel_fix_overlaps import fix_overlaps
+from .pixel_mask_packer import pack_islands_to_pixel_masks
+from .pixel_packer import pack_islands_to_pixel_grid, pack_tile
+from .pixel_scale_islands import count_subpixel_islands, scale_islands_to_density, scale_islands_to_pixels
+from .uv_islands import (concatenate_tables, island_areas, island_count, island_subset, island_uv_bounds, read_uvs,
+                         segment_positions, table_face_sizes, write_uvs)
 
-from .pixel_scale_islands import count_subpixel_islands
 
+def parse_tile_resolutions(text):
+    """Tile number -> texture size from text such as "1001=512, 1002=128".
+    Raises ValueError on malformed pairs."""
+    resolutions = {}
+    for pair in text.replace(",", " ").split():
+        tile, _, size = pair.partition("=")
+        if not tile.isdigit() or not size.isdigit() or int(tile) < 1001 or int(size) < 1:
+            raise ValueError(f"'{pair}' is not a tile=size pair such as 1002=512")
+        resolutions[int(tile)] = int(size)
+    return resolutions
 
-class PixelPackIslandsOperator(bpy.types.Operator):
-    """Pack UV Islands so that they fit the pixel grid of a texture of specified resolution"""
-    bl_idname = "uv.pixel_pack_islands"
-    bl_label = "Pixel Pack Islands"
-    bl_options = {'REGISTER', 'UNDO'}
 
-    resolution: bpy.props.IntProperty(name="Texture Resolution", description="Resolution of target texture", default=256, min=1)
+def udim_tile_number(tile):
+    """UDIM number of the tile with lower-left corner `tile`, or None outside the UDIM range"""
+    x, y = tile
+    return 1001 + x + 10 * y if 0 <= x < 10 and y >= 0 else None
 
-    margin: bpy.props.IntProperty(name="Pixel Margin", description="Amount of pixels to use as margin around each island", default=2, min=0)
 
-    udim_source: bpy.props.EnumProperty(items=[
-        ('CLOSEST_UDIM', 'Closest UDIM', 'Pack islands to closest UDIM'),
-        ('ACTIVE_UDIM', 'Active UDIM', 'Pack islands to active UDIM image tile or UDIM grid tile where 2D cursor is located'),
-        ('ORIGINAL_AABB', 'Original bounding box', 'Pack to starting bounding box of islands')],
-        name="UDIM Source", default='CLOSEST_UDIM')
+def active_udim_tile(context):
+    """Lower-left corner of the tile Blender's packer targets with udim_source='ACTIVE_UDIM':
+    the active tile of a tiled image in the UV editor, else the tile under the 2D cursor.
+    Outside the UV editor there is neither, and the packer uses the first tile"""
+    space = context.space_data
+    image = getattr(space, "image", None)
+    if image is not None and image.source == 'TILED' and image.tiles.active is not None:
+        y, x = divmod(image.tiles.active.number - 1001, 10)
+        return (x, y)
+    cursor = getattr(space, "cursor_location", None)
+    if cursor is None:
+        return (0, 0)
+    return (math.floor(cursor[0]), math.floor(cursor[1]))
 
-    rotate: bpy.props.BoolProperty(name="Rotate", description="Rotate islands to improve layout", default=True)
 
-    scale: bpy.props.BoolProperty(name="Scale", description="Scale islands to fill unit square", default=True)
+def main(context, operator):
+    profile = profiling.current()
 
-    merge_overlap: bpy.props.BoolProperty(name="Merge Overlapping", description="Overlapping islands stick together", default=False)
+    # Force face select mode for consistent behavior across selection modes
+    original_select_mode = tuple(context.tool_settings.mesh_select_mode)
+    bpy.ops.mesh.select_mode(type='FACE')
 
-    pin: bpy.props.BoolProperty(name="Lock Pinned Islands", description="Constrain islands containing any pinned UV's", default=False)
+    margin = operator.margin / operator.resolution
 
-    pin_method: bpy.props.EnumProperty(items=[
-        ('SCALE', 'Scale', 'Pinned islands won\'t rescale'),
-        ('ROTATION', 'Rotation', 'Pinned islands won\'t rotate'),
-        ('ROTATION_SCALE', 'Rotation and Scale', 'Pinned islands will translate only'),
-        ('LOCKED', 'All', 'Pinned islands are locked in place')],
-        name="Pin Method", default='LOCKED')
+    pack_args = dict(
+        udim_source=operator.udim_source,
+        rotate_method='CARDINAL',
+        merge_overlap=operator.merge_overlap,
+        margin=margin,
+        pin=operator.pin,
+        pin_method=operator.pin_method,
+        shape_method=operator.shape_method,
+    )
 
-    shape_method: bpy.props.EnumProperty(items=[
-        ('CONCAVE', 'Exact Shape', 'Uses exact geometry'),
-        ('CONVEX', 'Boundary Shape', 'Uses convex hull'),
-        ('AABB', 'Bounding Box', 'Uses bounding boxes')],
-        name="Shape Method", default='AABB')
+    # FRACTION margins are only exact when the packer is allowed to rescale; in a
+    # fixed-scale pack they come out several times too wide and spill islands into
+    # neighboring UDIM tiles. Fixed-scale packs get the raw ADD margin instead,
+    # which is exact when nothing is rescaled
+    initial_margin_method = 'FRACTION' if operator.scale else 'ADD'
 
-    @classmethod
-    def poll(cls, context):
-        obj = context.active_object
-        return obj and obj.type == 'MESH' and obj.mode == 'EDIT'
+    # Detect islands once per edit mesh, before packing so a redo finds its input unchanged
+    # and reuses the cached islands. Packing only moves whole islands, so the same tables
+    # and their loop references stay valid for the subpixel count, scaling and snapping
+    tables = []
+    with profile.stage("find islands"):
+        for me, bm, uv_layer in edit_bmeshes(context):
+            table = cached_island_table(me, bm, uv_layer, True)
+            tables.append((me, bm, uv_layer, table))
+            profile.count("islands", island_count(table))
+            profile.count("loops", len(table.loops))
 
-    def execute(self, context):
+    if operator.per_tile:
+        result = pack_udim_tiles(operator, tables)
+        context.tool_settings.mesh_select_mode = original_select_mode
+        return result
 
-        # Force face select mode for consistent behavior across selection modes
-        original_select_mode = tuple(context.tool_settings.mesh_select_mode)
-        bpy.ops.mesh.select_mode(type='FACE')
+    # A fixed density sets island sizes from 3D area, so the only pack is the one that places
+    # the snapped islands. Otherwise the initial pack scales islands to fill the texture
+    fixed_density = operator.pixels_per_meter > 0
+    if not fixed_density:
+        # A redo that changes only the resolution starts from the layout the initial pack gave
+        # the same input last time, so only the snapping stages run again
+        edit = [m[:3] for m in tables]
+        key = layout_key(operator, edit)
+        settings = (operator.margin, operator.udim_source, operator.rotate, operator.scale, operator.merge_overlap, operator.pin, operator.pin_method, operator.shape_method)
+        if operator.udim_source == 'ACTIVE_UDIM':
+            # The packer places islands in a tile picked outside the mesh, which the layout digest does not see
+            settings += (active_udim_tile(context),)
+        with profile.stage("restore initial pack"):
+            state = layout_state(edit, settings)
+            reused = load_layout(key, state, edit)
 
-        margin = self.margin / self.resolution
+        if reused:
+            profile.count("reused layouts")
+        else:
+            # Initial pack with user settings
+            profile.call(bpy.ops.uv.pack_islands, rotate=operator.rotate, scale=operator.scale, margin_method=initial_margin_method, **pack_args)
+            store_layout(key, state, edit)
 
-        pack_args = dict(
-            udim_source=self.udim_source,
-            rotate_method='CARDINAL',
-            merge_overlap=self.merge_overlap,
-            margin=margin,
-            pin=self.pin,
-            pin_method=self.pin_method,
-            shape_method=self.shape_method,
-        )
+    meshes = [(me, bm, uv_layer, table, read_uvs(table.loops, uv_layer)) for me, bm, uv_layer, table in tables]
 
-        # FRACTION margins are only exact when the packer is allowed to rescale; in a
-        # fixed-scale pack they come out several times too wide and spill islands into
-        # neighboring UDIM tiles. Fixed-scale packs get the raw ADD margin instead,
-        # which is exact when nothing is rescaled
-        initial_margin_method = 'FRACTION' if self.scale else 'ADD'
+    if fixed_density:
+        with profile.stage("scale islands to density"):
+            density = operator.pixels_per_meter / operator.resolution
+            meshes = [(me, bm, uv_layer, table, scale_islands_to_density(table, uvs, *island_areas(bm, table, uvs), density))
+                      for me, bm, uv_layer, table, uvs in meshes]
 
-        # Initial pack with user settings
-        bpy.ops.uv.pack_islands(rotate=self.rotate, scale=self.scale, margin_method=initial_margin_method, **pack_args)
+    # Warn when the packed density is too low for pixel snapping to preserve proportions
+    total = subpixel = 0
+    with profile.stage("count subpixel islands"):
+        for me, bm, uv_layer, table, uvs in meshes:
+            mesh_total, mesh_subpixel = count_subpixel_islands(bm, uv_layer, operator.resolution, table, uvs)
+            total += mesh_total
+            subpixel += mesh_subpixel
+    if subpixel:
+        operator.report({'WARNING'}, f"{subpixel} of {total} UV islands are under 1 pixel at "
+                                 f"resolution {operator.resolution}; they keep their proportions "
+                                 f"but will render as solid strips or single-texel colors. "
+                                 f"Increase the resolution for paintable detail")
 
-        # Warn when the packed density is too low for pixel snapping to preserve proportions
-        bm = bmesh.from_edit_mesh(context.edit_object.data)
-        bm.faces.ensure_lookup_table()
-        uv_layer = bm.loops.layers.uv.verify()
-        total, subpixel = count_subpixel_islands(bm, uv_layer, self.resolution)
-        if subpixel:
-            self.report({'WARNING'}, f"{subpixel} of {total} UV islands are under 1 pixel at "
-                                     f"resolution {self.resolution}; they keep their proportions "
-                                     f"but will render as solid strips or single-texel colors. "
-                                     f"Increase the resolution for paintable detail")
+    # Snap island dimensions to pixel grid
+    with profile.stage("scale islands"):
+        scaled = parallel_map(lambda m: scale_islands_to_pixels(m[3], m[4], operator.resolution), meshes)
 
-        # Snap island dimensions to pixel grid
-        bpy.ops.uv.pixel_scale_islands(resolution=self.resolution)
+    if operator.packer in {'PIXEL_GRID', 'PIXEL_MASK'}:
+        # Place the whole-pixel footprints, or exact texel masks, of all meshes together on the
+        # grid of the tile the initial pack chose, which leaves every island snapped in one pass
+        with profile.stage("pixel grid pack" if operator.packer == 'PIXEL_GRID' else "pixel mask pack"):
+            table = concatenate_tables([m[3] for m in meshes])
+            uvs = np.concatenate(scaled) if scaled else np.empty((0, 2))
+            bmin, bmax = island_uv_bounds(table, uvs)
+            origin = np.floor((bmin.min(axis=0) + bmax.max(axis=0)) / 2) if len(bmin) else (0.0, 0.0)
+            if operator.packer == 'PIXEL_GRID':
+                uvs, overflow = pack_islands_to_pixel_grid(table, uvs, operator.resolution, operator.margin, operator.rotate, origin)
+            else:
+                face_sizes = np.concatenate([table_face_sizes(m[1], m[3]) for m in meshes] or [np.zeros(0, dtype=np.int64)])
+                uvs, overflow = pack_islands_to_pixel_masks(table, uvs, operator.resolution, operator.margin, operator.rotate, origin, face_sizes)
+        with profile.stage("write UVs"):
+            split = np.cumsum([len(m[3].loops) for m in meshes])[:-1]
+            for (me, bm, uv_layer, table, _), mesh_uvs in zip(meshes, np.split(uvs, split)):
+                write_uvs(table.loops, uv_layer, mesh_uvs)
+        if overflow:
+            operator.report({'WARNING'}, f"Snapped islands do not fit in a {operator.resolution}px texture "
+                                     f"and extend past the top of the UV tile")
+    else:
+        with profile.stage("write UVs"):
+            for (me, bm, uv_layer, table, _), uvs in zip(meshes, scaled):
+                write_uvs(table.loops, uv_layer, uvs)
 
-        # Re-pack without rotate/scale to tighten gaps after snapping
-        bpy.ops.uv.pack_islands(rotate=False, scale=False, margin_method='ADD', **pack_args)
+        # Re-pack without rotate/scale to tighten gaps after snapping. At a fixed density this
+        # is the first placement, so quarter turns are allowed; they keep whole-pixel sizes
+        profile.call(bpy.ops.uv.pack_islands, rotate=operator.rotate and fixed_density, scale=False, margin_method='ADD', **pack_args)
 
         # Snap island positions to pixel grid
-        bpy.ops.uv.pixel_move_islands(resolution=self.resolution)
+        with profile.stage("move islands"):
+            uvs = [read_uvs(m[3].loops, m[2]) for m in meshes]
+            moved = parallel_map(lambda args: move_islands_to_pixels(args[0][3], args[1], operator.resolution), zip(meshes, uvs))
 
-        # Restore the user's original selection mode
-        context.tool_settings.mesh_select_mode = original_select_mode
+        # Rounding sizes and positions can push neighbours into the same texels
+        if operator.separate_overlaps:
+            with profile.stage("separate overlaps"):
+                moved, overlapping, unresolved, pairs = fix_overlaps([m[:4] + (mesh_uvs,) for m, mesh_uvs in zip(meshes, moved)],
+                                                                     operator.resolution, operator.margin, True)
+            left = sum(int(np.count_nonzero(u)) for u in unresolved)
+            profile.count("overlapping islands", sum(int(np.count_nonzero(o)) for o in overlapping))
+            if left:
+                operator.report({'WARNING'}, f"{left} UV islands still share texels after snapping; "
+                                         f"there was no free space to move them to")
+
+        with profile.stage("write UVs"):
+            for (me, bm, uv_layer, table, _), mesh_uvs in zip(meshes, moved):
+                write_uvs(table.loops, uv_layer, mesh_uvs)
+
+        # Blender's packer moves islands that do not fit outside the tile without saying so
+        if fixed_density:
+            covered = 0.0
+            for m, uvs in zip(meshes, scaled):
+                bmin, bmax = island_uv_bounds(m[3], uvs)
+                covered += float(np.prod(bmax - bmin, axis=1).sum())
+            if covered > 1.0:
+                operator.report({'WARNING'}, f"Islands at {operator.pixels_per_meter:g} pixels per meter cover more than "
+                                         f"a {operator.resolution}px texture and extend past the UV tile")
+
+    with profile.stage("update meshes"):
+        for me, bm, uv_layer, table, _ in meshes:
+            bmesh.update_edit_mesh(me)
+
+    # Restore the user's original selection mode
+    context.tool_settings.mesh_select_mode = original_select_mode
+
+    return {'FINISHED'}
+
+
+def pack_udim_tiles(operator, tables):
+    """Pack the islands of every UDIM tile as an independent job. The array work of the
+    jobs runs in parallel, and each job only sees the islands of its own tile"""
+    profile = profiling.current()
+    try:
+        resolutions = parse_tile_resolutions(operator.tile_resolutions)
+    except ValueError as e:
+        operator.report({'ERROR'}, f"Tile Resolutions: {e}")
+        return {'CANCELLED'}
+
+    with profile.stage("read UVs"):
+        mesh_uvs = [read_uvs(mesh_table.loops, uv_layer) for me, bm, uv_layer, mesh_table in tables]
+        table = concatenate_tables([m[3] for m in tables])
+        uvs = np.concatenate(mesh_uvs) if tables else np.empty((0, 2))
+
+        # 3D areas come from the bmesh, so they are read here rather than in the jobs
+        face_sizes = None
+        if operator.packer == 'PIXEL_MASK':
+            face_sizes = np.concatenate([table_face_sizes(m[1], m[3]) for m in tables] or [np.zeros(0, dtype=np.int64)])
+
+        areas = None
+        if operator.pixels_per_meter > 0:
+            mesh_areas = [island_areas(m[1], m[3], m_uvs) for m, m_uvs in zip(tables, mesh_uvs)]
+            areas = (np.concatenate([a[0] for a in mesh_areas]), np.concatenate([a[1] for a in mesh_areas]))
+
+    # Every island belongs to the tile that holds its bounding box center
+    with profile.stage("split tiles"):
+        bmin, bmax = island_uv_bounds(table, uvs)
+        tiles, tile_of_island = np.unique(np.floor((bmin + bmax) / 2).astype(np.int64), axis=0, return_inverse=True)
+        jobs = []
+        for t, tile in enumerate(tiles.tolist()):
+            islands = np.flatnonzero(tile_of_island.ravel() == t)
+            subset, positions = island_subset(table, islands)
+            resolution = resolutions.get(udim_tile_number(tile), operator.resolution)
+            tile_areas = (areas[0][islands], areas[1][islands]) if areas else None
+            pack = None
+            if face_sizes is not None:
+                tile_face_sizes = face_sizes[segment_positions(table.face_offsets, islands)]
+                pack = functools.partial(pack_islands_to_pixel_masks, face_sizes=tile_face_sizes)
+            jobs.append((tile, resolution, subset, positions, tile_areas, pack))
+    profile.count("tiles", len(jobs))
+
+    with profile.stage("pack tiles"):
+        results = parallel_map(lambda job: pack_tile(job[2], uvs[job[3]], job[1], operator.margin, operator.rotate, job[0], operator.scale,
+                                                     operator.pixels_per_meter / job[1], job[4], job[5]), jobs)
+
+    packed = uvs.copy()
+    subpixel, overflowing = 0, []
+    for (tile, resolution, subset, positions, _, _), (tile_uvs, tile_subpixel, overflow) in zip(jobs, results):
+        packed[positions] = tile_uvs
+        subpixel += tile_subpixel
+        if overflow:
+            overflowing.append(str(udim_tile_number(tile) or tuple(tile)))
+
+    with profile.stage("write UVs"):
+        split = np.cumsum([len(m[3].loops) for m in tables])[:-1]
+        for (me, bm, uv_layer, mesh_table), mesh_uvs in zip(tables, np.split(packed, split)):
+            write_uvs(mesh_table.loops, uv_layer, mesh_uvs)
+            bmesh.update_edit_mesh(me)
 
-        return {'FINISHED'}
+    if subpixel:
+        operator.report({'WARNING'}, f"{subpixel} of {island_count(table)} UV islands are under 1 pixel on their tile's grid; "
+                                 f"they keep their proportions but will render as solid strips or single-texel colors")
+    if overflowing:
+        operator.report({'WARNING'}, f"Snapped islands do not fit in UDIM tiles {', '.join(overflowing)} "
+                                 f"and extend past the top of the tile")
+    return {'FINISHED'}
@@ -0,0 +1,186 @@
+import numpy as np
+
+from .pixel_scale_islands import scale_islands_to_density, scale_islands_to_pixels
+from .uv_islands import island_count, island_uv_bounds, per_loop
+
+
+# Times a tile's fill scale is reduced when its islands do not fit, and the factor each time
+FILL_ATTEMPTS = 12
+FILL_SHRINK = 0.95
+
+
+def island_footprints(sizes, resolution):
+    """Whole-pixel footprint of each island as an (islands, 2) int array.
+    Subpixel and zero-size axes still take one texel"""
+    pixels = np.ceil(sizes * resolution - 1e-6)
+    return np.maximum(pixels, 1).astype(np.int64)
+
+
+def skyline_fit(skyline, width, w):
+    """Lowest bottom-left position for a rectangle of width `w` on the skyline.
+    The skyline is a list of [x, y, width] segments covering the atlas width.
+    Returns (y, x, segment index) or None if the rectangle is wider than the atlas."""
+    best = None
+    for i in range(len(skyline)):
+        x = skyline[i][0]
+        if x + w > width:
+            break
+        # The rectangle rests on the highest segment it spans
+        y = 0
+        remaining = w
+        j = i
+        while remaining > 0:
+            y = max(y, skyline[j][1])
+            remaining -= skyline[j][2]
+            j += 1
+        if best is None or (y, x) < best[:2]:
+            best = (y, x, i)
+    return best
+
+
+def skyline_place(skyline, i, x, y, w, h):
+    """Raise the skyline under a rectangle placed at (x, y) starting at segment i"""
+    skyline.insert(i, [x, y + h, w])
+    j = i + 1
+    while j < len(skyline) and skyline[j][0] < x + w:
+        seg = skyline[j]
+        shrink = x + w - seg[0]
+        if shrink >= seg[2]:
+            del skyline[j]
+        else:
+            seg[0] += shrink
+            seg[2] -= shrink
+            break
+
+    # Merge neighbours at the same height so the segment count stays low
+    j = 0
+    while j < len(skyline) - 1:
+        if skyline[j][1] == skyline[j + 1][1]:
+            skyline[j][2] += skyline[j + 1][2]
+            del skyline[j + 1]
+        else:
+            j += 1
+
+
+def skyline_pack(footprints, width, margin, rotate):
+    """Bottom-left skyline packing of integer rectangles into an atlas `width` pixels wide.
+    Each rectangle is padded by `margin` on its right and top so neighbours end up exactly
+    `margin` pixels apart, and the atlas is widened by the same amount so islands can sit
+    flush against its right edge. With `rotate`, each rectangle also tries a quarter turn
+    and keeps whichever orientation rests lower. Rectangles are placed tallest first with
+    the original index as the final tie break, so identical input gives identical output.
+    Returns (positions, rotated, height) where positions is an (n, 2) int array."""
+    n = len(footprints)
+    positions = np.zeros((n, 2), dtype=np.int64)
+    rotated = np.zeros(n, dtype=bool)
+    width += margin
+    skyline = [[0, 0, width]]
+    height = 0
+
+    order = sorted(range(n), key=lambda k: (-int(footprints[k].max()), -int(footprints[k].min()), k))
+    for k in order:
+        w, h = int(footprints[k][0]), int(footprints[k][1])
+        candidates = [(w, h, False), (h, w, True)] if rotate and w != h else [(w, h, False)]
+
+        best = None
+        for cw, ch, turn in candidates:
+            fit = skyline_fit(skyline, width, cw + margin)
+            if fit is not None and (best is None or (fit[0] + ch, fit[1]) < (best[0][0] + best[2], best[0][1])):
+                best = (fit, cw, ch, turn)
+
+        if best is None:
+            # Wider than the atlas in every orientation: start a new row above everything
+            cw, ch, turn = candidates[0]
+            fit = (max(seg[1] for seg in skyline), 0, 0)
+            skyline = [[0, fit[0], width]]
+            best = (fit, cw, ch, turn)
+
+        (y, x, i), cw, ch, turn = best
+        skyline_place(skyline, i, x, y, min(cw + margin, width - x), ch + margin)
+        positions[k] = (x, y)
+        rotated[k] = turn
+        height = max(height, y + ch)
+
+    return positions, rotated, height
+
+
+def pack_islands_to_pixel_grid(table, uvs, resolution, margin, rotate, origin):
+    """Lay out pixel-sized islands on the pixel grid of the tile whose lower-left corner
+    is `origin`, using whole-pixel footprints instead of float-space packing.
+    Subpixel axes keep their minimum on a pixel corner and zero-size axes are centered
+    inside a texel, matching the pixel move rule. `uvs` is in table loop order.
+    Returns (packed uvs, True if the layout overflows the tile)."""
+    if not island_count(table):
+        return uvs, False
+
+    bmin, bmax = island_uv_bounds(table, uvs)
+    positions, rotated, height = skyline_pack(island_footprints(bmax - bmin, resolution), resolution, margin, rotate)
+    return place_islands(table, uvs, positions, rotated.astype(np.int64), resolution, origin), height > resolution
+
+
+def place_islands(table, uvs, positions, turns, resolution, origin):
+    """Turn every island counterclockwise by its number of quarter turns around its bounding
+    box center, then move the box minimum to its whole-pixel position on the grid of the
+    tile whose lower-left corner is `origin`. Zero-size axes are centered inside the slot's
+    texel. `uvs` is in table loop order; returns the placed UVs."""
+    pixel = 1.0 / resolution
+    bmin, bmax = island_uv_bounds(table, uvs)
+    sizes = bmax - bmin
+
+    # Quarter turns around the bounding box center; odd turns swap the box dimensions
+    local = uvs - per_loop(table, (bmin + bmax) / 2)
+    loop_turns = per_loop(table, turns % 4)[:, None]
+    x, y = local[:, :1], local[:, 1:]
+    local = np.select([loop_turns == 1, loop_turns == 2, loop_turns == 3],
+                      [np.hstack((-y, x)), -local, np.hstack((y, -x))], local)
+    sizes = np.where((turns % 2 == 1)[:, None], sizes[:, ::-1], sizes)
+
+    # Move each box minimum to its slot, or center zero-size axes inside the slot's texel
+    slot = np.asarray(origin, dtype=np.float64) + positions * pixel
+    target_min = np.where(sizes < 1e-9, slot + pixel / 2, slot)
+    return local + per_loop(table, target_min + sizes / 2)
+
+
+def fill_scale(sizes, resolution, margin):
+    """Uniform scale at which the islands' pixel footprints plus margins would exactly cover
+    a tile of `resolution` pixels, ignoring packing waste. `sizes` is an (islands, 2) array
+    of UV bounding box sizes. Solves sum((w*s*r + m) * (h*s*r + m)) = r*r for s."""
+    a = float(np.sum(sizes[:, 0] * sizes[:, 1])) * resolution ** 2
+    b = float(np.sum(sizes[:, 0] + sizes[:, 1])) * margin * resolution
+    c = len(sizes) * margin ** 2 - resolution ** 2
+    if a <= 0:
+        return -c / b if b > 0 and c < 0 else 1.0
+    return (-b + np.sqrt(max(b * b - 4 * a * c, 0.0))) / (2 * a)
+
+
+def pack_tile(table, uvs, resolution, margin, rotate, origin, fill, density=0.0, areas=None, pack=None):
+    """Scale, snap and pack the islands of one UDIM tile on that tile's own pixel grid,
+    whose lower-left corner is `origin`. With `density` above 0 islands are scaled to that
+    UV length per unit of 3D length, `areas` being their (UV areas, 3D areas). Otherwise
+    with `fill` they are scaled together to fill the tile, shrinking until they fit, and
+    else kept at their size. `pack` lays out the snapped islands with the arguments of
+    pack_islands_to_pixel_grid, which it defaults to. `uvs` is in table loop order.
+    Returns (packed uvs, subpixel island count, True if the layout overflows the tile)."""
+    if not island_count(table):
+        return uvs, 0, False
+
+    pack = pack or pack_islands_to_pixel_grid
+    if density > 0:
+        uvs = scale_islands_to_density(table, uvs, *areas, density)
+        fill = False
+    scale = 1.0
+    if fill:
+        bmin, bmax = island_uv_bounds(table, uvs)
+        scale = fill_scale(bmax - bmin, resolution, margin)
+
+    for attempt in range(FILL_ATTEMPTS if fill else 1):
+        # Islands are repositioned by the packer, so scaling around the UV origin is enough
+        snapped = scale_islands_to_pixels(table, uvs * scale, resolution)
+        packed, overflow = pack(table, snapped, resolution, margin, rotate, origin)
+        if not overflow:
+            break
+        scale *= FILL_SHRINK
+
+    bmin, bmax = island_uv_bounds(table, snapped)
+    subpixel = int(np.count_nonzero(np.any(bmax - bmin < 1.0 / resolution, axis=1)))
+    return packed, subpixel, overflow
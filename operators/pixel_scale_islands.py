@@ -1,155 +1,107 @@
 import bpy
 import bmesh
-from mathutils import Vector, Matrix
-
-
-def get_uv_islands(bm, uv_layer, only_selected):
-    """Returns a list of lists where each list contains the indices of the BMFaces that make up a uv island"""
-    faces = [f for f in bm.faces if f.select] if only_selected else bm.faces
-
-    uv_vert_to_faces = {}
-    for l in [l for f in faces for l in f.loops]:
-        vert = (l[uv_layer].uv.to_tuple(5), l.vert.index)
-        if vert not in uv_vert_to_faces:
-            uv_vert_to_faces[vert] = [l.face.index]
-        else:
-            uv_vert_to_faces[vert].append(l.face.index)
-
-    islands = []
-    explored = []
-    for f in faces:
-        if f.index not in explored:
-            island = [f.index]
-            frontier = [f.index]
-            while frontier:
-                current = bm.faces[frontier.pop()]
-                for l in current.loops:
-                    vert = (l[uv_layer].uv.to_tuple(5), l.vert.index)
-                    for neighbour in uv_vert_to_faces[vert]:
-                        if neighbour != current and neighbour not in island:
-                            island.append(neighbour)
-                            frontier.append(neighbour)
-            islands.append(island)
-            explored.extend(island)
-
-    return islands
-
-
-def uv_bounds_size(faces, uv_layer):
-    """Width and height of the UV bounding box of the given faces"""
-    us = [l[uv_layer].uv.x for f in faces for l in f.loops]
-    vs = [l[uv_layer].uv.y for f in faces for l in f.loops]
-    return max(us) - min(us), max(vs) - min(vs)
-
-
-def count_subpixel_islands(bm, uv_layer, resolution):
+import numpy as np
+
+from .edit_meshes import edit_bmeshes, parallel_map
+from .island_cache import cached_island_table
+from .uv_islands import (build_island_table, island_count, island_uv_bounds, island_uv_centroids,
+                         per_loop, read_uvs, write_uvs)
+
+
+def count_subpixel_islands(bm, uv_layer, resolution, table=None, uvs=None):
     """Count selected UV islands whose bounding box is under one pixel on either axis.
-    Returns (total islands, subpixel islands)."""
-    pixel = 1.0 / resolution
-    islands = get_uv_islands(bm, uv_layer, True)
-    subpixel = 0
-    for island in islands:
-        faces = [bm.faces[i] for i in island]
-        w, h = uv_bounds_size(faces, uv_layer)
-        if w < pixel or h < pixel:
-            subpixel += 1
-    return len(islands), subpixel
+    Pass an island table from build_island_table to skip island detection, and its
+    UVs from read_uvs to skip reading them. Returns (total islands, subpixel islands)."""
+    if table is None:
+        table = build_island_table(bm, uv_layer, True)
+    if uvs is None:
+        uvs = read_uvs(table.loops, uv_layer)
+    bmin, bmax = island_uv_bounds(table, uvs)
+    subpixel = np.any(bmax - bmin < 1.0 / resolution, axis=1)
+    return island_count(table), int(np.count_nonzero(subpixel))
 
 
 def pixel_scale_factor(size, pixel):
     """Factor that scales `size` to the nearest whole number of pixels, at least one.
-    A zero-size (degenerate) axis is left unscaled since no factor can give it area."""
-    if size < 1e-9:
-        return 1.0
-    target_size = max(round(size / pixel), 1) * pixel
-    return target_size / size
+    A zero-size (degenerate) axis is left unscaled since no factor can give it area.
+    Works elementwise on arrays."""
+    size = np.asarray(size, dtype=np.float64)
+    degenerate = size < 1e-9
+    target_size = np.maximum(np.round(size / pixel), 1) * pixel
+    return np.where(degenerate, 1.0, target_size / np.where(degenerate, 1.0, size))
 
 
-def scale_uv_bounds_to_pixels(bm, uv_layer, island, resolution):
-    """Scale the island so its bounding box dimensions are divisible by the pixel size.
+def island_pixel_scales(sizes, resolution):
+    """Per-axis scale factors that make each island's bounding box divisible by the pixel size.
+    `sizes` is an (islands, 2) array of bounding box widths and heights.
     Islands with a subpixel axis are scaled uniformly from their larger axis so their
     proportions survive instead of each axis being forced to a whole pixel count."""
-    faces = [bm.faces[i] for i in island]
     pixel = 1.0 / resolution
-
-    x_size, y_size = uv_bounds_size(faces, uv_layer)
-    major = max(x_size, y_size)
-    minor = min(x_size, y_size)
-
-    if minor < pixel:
-        # Subpixel island: scale uniformly from the larger axis so proportions survive.
-        # A fully subpixel island is left at its true size. If uniform scaling would
-        # push the smaller axis past one pixel it is rounded to its own whole-pixel
-        # size, since a fractional multi-pixel axis can never sit on the grid
-        factor = pixel_scale_factor(major, pixel) if major >= pixel else 1.0
-        minor_scale = factor
-        if minor * factor > pixel:
-            minor_scale = pixel_scale_factor(minor * factor, pixel) * factor
-        if x_size >= y_size:
-            x_scale, y_scale = factor, minor_scale
-        else:
-            x_scale, y_scale = minor_scale, factor
-    else:
-        x_scale = pixel_scale_factor(x_size, pixel)
-        y_scale = pixel_scale_factor(y_size, pixel)
-
-    scale = Matrix.LocRotScale(Vector((0.0, 0.0, 0.0)), None, Vector((x_scale, y_scale, 1.0)))
-
-    uvx = [l[uv_layer].uv.x for f in faces for l in f.loops]
-    uvy = [l[uv_layer].uv.y for f in faces for l in f.loops]
-    n = len(uvx)
-    center = Vector((sum(uvx) / n, sum(uvy) / n, 0.0))
-    translation = Matrix.Translation(-center)
-
-    for f in faces:
-        for l in f.loops:
-            xyz = l[uv_layer].uv.to_3d()
-            xyz = translation @ xyz
-            xyz = scale @ xyz
-            xyz = translation.inverted() @ xyz
-            l[uv_layer].uv = xyz.xy
+    x_size, y_size = sizes[:, 0], sizes[:, 1]
+    major = np.maximum(x_size, y_size)
+    minor = np.minimum(x_size, y_size)
+
+    # Subpixel island: scale uniformly from the larger axis so proportions survive.
+    # A fully subpixel island is left at its true size. If uniform scaling would
+    # push the smaller axis past one pixel it is rounded to its own whole-pixel
+    # size, since a fractional multi-pixel axis can never sit on the grid
+    factor = np.where(major >= pixel, pixel_scale_factor(major, pixel), 1.0)
+    minor_scale = np.where(minor * factor > pixel, pixel_scale_factor(minor * factor, pixel) * factor, factor)
+    x_major = x_size >= y_size
+    subpixel_scales = np.stack((np.where(x_major, factor, minor_scale),
+                                np.where(x_major, minor_scale, factor)), axis=1)
+
+    whole_scales = pixel_scale_factor(sizes, pixel)
+    return np.where((minor < pixel)[:, None], subpixel_scales, whole_scales)
+
+
+def scale_islands_to_pixels(table, uvs, resolution):
+    """Scale every island around its UV centroid so its bounding box dimensions are
+    divisible by the pixel size. `uvs` is in table loop order; returns the scaled UVs"""
+    if not island_count(table):
+        return uvs
+    bmin, bmax = island_uv_bounds(table, uvs)
+    scales = island_pixel_scales(bmax - bmin, resolution)
+    center = per_loop(table, island_uv_centroids(table, uvs))
+    return (uvs - center) * per_loop(table, scales) + center
+
+
+def texel_density(uv_areas, areas):
+    """UV length per unit of 3D length over the given islands taken together, 0 without area"""
+    total = areas.sum()
+    return float(np.sqrt(uv_areas.sum() / total)) if total > 0 else 0.0
+
+
+def scale_islands_to_density(table, uvs, uv_areas, areas, density):
+    """Scale every island uniformly around its UV centroid so its UV length per unit of 3D
+    length is `density`. Islands without UV or 3D area are left as they are.
+    `uvs` is in table loop order; returns the scaled UVs"""
+    if not island_count(table):
+        return uvs
+    flat = (uv_areas <= 0) | (areas <= 0)
+    factor = np.where(flat, 1.0, density / np.sqrt(np.where(flat, 1.0, uv_areas / np.where(flat, 1.0, areas))))
+    center = per_loop(table, island_uv_centroids(table, uvs))
+    return (uvs - center) * per_loop(table, factor)[:, None] + center
 
 
 def main(context, resolution):
-    ob = context.edit_object
-    me = ob.data
 
     # Force face select mode for consistent behavior across selection modes
     original_select_mode = tuple(context.tool_settings.mesh_select_mode)
     bpy.ops.mesh.select_mode(type='FACE')
 
-    bm = bmesh.from_edit_mesh(me)
-    bm.verts.ensure_lookup_table()
-    bm.edges.ensure_lookup_table()
-    bm.faces.ensure_lookup_table()
-    uv_layer = bm.loops.layers.uv.verify()
-
-    islands = get_uv_islands(bm, uv_layer, True)
+    # Read every edit mesh's islands and UVs, then run the array math for all meshes in parallel
+    meshes = []
+    for me, bm, uv_layer in edit_bmeshes(context):
+        table = cached_island_table(me, bm, uv_layer, True)
+        meshes.append((me, bm, uv_layer, table, read_uvs(table.loops, uv_layer)))
 
-    for island in islands:
-        scale_uv_bounds_to_pixels(bm, uv_layer, island, resolution)
+    results = parallel_map(lambda m: scale_islands_to_pixels(m[3], m[4], resolution), meshes)
 
-    bmesh.update_edit_mesh(me)
+    for (me, bm, uv_layer, table, _), uvs in zip(meshes, results):
+        write_uvs(table.loops, uv_layer, uvs)
+        bmesh.update_edit_mesh(me)
+        bm.free()
 
     # Restore the user's original selection mode
     context.tool_settings.mesh_select_mode = original_select_mode
-
-    bm.free()
-
-
-class PixelScaleIslandsOperator(bpy.types.Operator):
-    """Scale each UV island so that the width and height of its bounding box is divisible by the size of the pixels on a texture of specified size. Islands smaller than one pixel are scaled uniformly so their proportions survive"""
-    bl_idname = "uv.pixel_scale_islands"
-    bl_label = "Pixel Scale Islands"
-    bl_options = {'REGISTER', 'UNDO'}
-
-    resolution: bpy.props.IntProperty(name="Texture Resolution", default=256, min=1)
-
-    @classmethod
-    def poll(cls, context):
-        obj = context.active_object
-        return obj and obj.type == 'MESH' and obj.mode == 'EDIT'
-
-    def execute(self, context):
-        main(context, self.resolution)
-        return {'FINISHED'}
@@ -1,100 +1,73 @@
 import bpy
 import bmesh
-from math import inf
-from mathutils import Vector, Matrix
+import numpy as np
+
+from .edit_meshes import edit_bmeshes, parallel_map
+from .island_cache import cached_island_table
+from .uv_islands import (island_count, island_table_from_faces, island_uv_bounds,
+                         island_uv_centroids, per_loop, read_uvs, write_uvs)
 
 
 def pixel_scale_factor(size, pixel, delta_pixels):
     """Factor that scales `size` to the nearest whole number of pixels plus a delta, at least one.
-    A zero-size (degenerate) axis is left unscaled since no factor can give it area."""
-    if size < 1e-9:
-        return 1.0
-    target_size = max(round(size / pixel) + delta_pixels, 1) * pixel
-    return target_size / size
+    A zero-size (degenerate) axis is left unscaled since no factor can give it area.
+    Works elementwise on arrays."""
+    size = np.asarray(size, dtype=np.float64)
+    degenerate = size < 1e-9
+    target_size = np.maximum(np.round(size / pixel) + delta_pixels, 1) * pixel
+    return np.where(degenerate, 1.0, target_size / np.where(degenerate, 1.0, size))
+
 
+def scale_groups_to_pixels(table, uvs, bmin, bmax, origin, resolution, dx, dy):
+    """Scale each group of loops around its origin to pixel-aligned dimensions plus the pixel delta.
+    Bounds and origins are (groups, 2) arrays; `uvs` is in table loop order"""
+    pixel = 1.0/resolution
+    sizes = bmax - bmin
+    scales = np.stack((pixel_scale_factor(sizes[:, 0], pixel, dx),
+                       pixel_scale_factor(sizes[:, 1], pixel, dy)), axis=1)
+    origin = per_loop(table, origin)
+    return (uvs - origin) * per_loop(table, scales) + origin
 
-def main(context, resolution, dx, dy):
+
+def main(context, resolution, dx, dy, per_island):
     
     # Force face select mode for consistent behavior across selection modes
-    obj = context.object
     original_select_mode = tuple(context.tool_settings.mesh_select_mode)
     bpy.ops.mesh.select_mode(type='FACE')
 
-    # Construct and initialize the bmesh
-    bm = bmesh.from_edit_mesh(obj.data)
-    bm.faces.ensure_lookup_table()
-    bm.edges.ensure_lookup_table()
-    bm.verts.ensure_lookup_table()
-    uv_layer = bm.loops.layers.uv.verify()
+    # Group the loops of selected faces of every edit mesh either by UV island or as one
+    # group per mesh, and calculate the bounds and centroid of every group in one pass
+    meshes = []
+    for me, bm, uv_layer in edit_bmeshes(context):
+        if per_island:
+            table = cached_island_table(me, bm, uv_layer, True)
+        else:
+            faces = [f for f in bm.faces if f.select]
+            table = island_table_from_faces([faces] if faces else [])
+        uvs = read_uvs(table.loops, uv_layer)
+        bmin, bmax = island_uv_bounds(table, uvs)
+        origin = island_uv_centroids(table, uvs)
+        meshes.append((me, bm, uv_layer, table, uvs, bmin, bmax, origin))
 
-    # Gather the loops of selected faces
-    faces = [f for f in bm.faces if f.select]
-    loops = [l for f in faces for l in f.loops]
-    
-    # Calculate the bounds of the selected uvs
-    bmin = Vector((inf, inf))
-    bmax = Vector((-inf, -inf))
-    for f in [f for f in bm.faces if f.select]:
-        for l in loops:
-            uv = l[uv_layer].uv
-            bmin.x = min(bmin.x, uv.x)
-            bmin.y = min(bmin.y, uv.y)
-            bmax.x = max(bmax.x, uv.x)
-            bmax.y = max(bmax.y, uv.y)
-            
-    # Scale the selection to pixel-aligned dimensions plus the pixel delta
-    x_size = bmax.x - bmin.x
-    y_size = bmax.y - bmin.y
-    pixel = 1.0/resolution
-    x_scale = pixel_scale_factor(x_size, pixel, dx)
-    y_scale = pixel_scale_factor(y_size, pixel, dy)
-    
-    # Construct a matrix to scale the uvs
-    transformation = Matrix.LocRotScale(Vector((0.0,0.0,0.0)), None, Vector((x_scale,y_scale,1.0)))
-    
-    # Calculate the centroid of the uvs to use as the origin point of the transformation
-    sum_x = sum([l[uv_layer].uv.x for l in loops])
-    sum_y = sum([l[uv_layer].uv.y for l in loops])
-    n = len(loops)
-    origin = Vector((sum_x/n,sum_y/n,0.0)) if n > 0 else Vector((0.0,0.0,0.0))
-    
-    # Construct a matrix to translate the uvs to the origin of the transformation
-    to_origin = Matrix.Translation(-origin)
-    
-    # Apply the transformation
-    for l in [l for f in bm.faces if f.select for l in f.loops]:
-        xyz = l[uv_layer].uv.to_3d() # Only 3d vectors are compatible with 4x4 matricies in blender
-        xyz = to_origin @ xyz
-        xyz = transformation @ xyz
-        xyz = to_origin.inverted() @ xyz
-        l[uv_layer].uv = xyz.xy
-    
-    # Update the edit mesh
-    bmesh.update_edit_mesh(obj.data)
+    if not per_island:
+        # The whole selection across all edit meshes scales as one box around its centroid
+        groups = [m for m in meshes if island_count(m[3])]
+        if groups:
+            counts = np.array([len(m[3].loops) for m in groups])
+            bmin = np.min([m[5][0] for m in groups], axis=0)[None]
+            bmax = np.max([m[6][0] for m in groups], axis=0)[None]
+            origin = (np.sum([m[7][0] * n for m, n in zip(groups, counts)], axis=0) / counts.sum())[None]
+            meshes = [m[:5] + (bmin, bmax, origin) if island_count(m[3]) else m for m in meshes]
 
-    # Restore the user's original selection mode
-    context.tool_settings.mesh_select_mode = original_select_mode
+    results = parallel_map(lambda m: scale_groups_to_pixels(m[3], m[4], m[5], m[6], m[7], resolution, dx, dy)
+                           if island_count(m[3]) else m[4], meshes)
 
-    # Free the bmesh memory
-    bm.free()
+    for (me, bm, uv_layer, table, *_), uvs in zip(meshes, results):
+        write_uvs(table.loops, uv_layer, uvs)
 
+        # Update the edit mesh and free the bmesh memory
+        bmesh.update_edit_mesh(me)
+        bm.free()
 
-class PixelScaleUvsOperator(bpy.types.Operator):
-    """Scale width and height the UVs of selected faces by an amount of pixels on a texture of specified resolution"""
-    bl_idname = "uv.pixel_scale_uvs"
-    bl_label = "Pixel Scale UVs"
-    bl_options = {'REGISTER', 'UNDO'}
-    
-    resolution: bpy.props.IntProperty(name="Texture Size", description="Width and height of target texture", default=256, min=1)
-    dx: bpy.props.IntProperty(name="Delta X", description="Pixels on the x-axis", default=1)
-    dy: bpy.props.IntProperty(name="Delta Y", description="Pixels on the y-axis", default=1)
-    
-    @classmethod
-    def poll(cls, context):
-        obj = context.active_object
-        return obj and obj.type == 'MESH' and obj.mode == 'EDIT'
-
-
-    def execute(self, context):
-        main(context, self.resolution, self.dx, self.dy)
-        return {'FINISHED'}
\ No newline at end of file
+    # Restore the user's original selection mode
+    context.tool_settings.mesh_select_mode = original_select_mode
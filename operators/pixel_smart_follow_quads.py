@@ -1,156 +1,173 @@
 import bpy
 import bmesh
-import math
-from mathutils import Vector
+import numpy as np
+from collections import deque
+
+from .edit_meshes import edit_bmeshes
+from .uv_islands import group_uv_islands, island_count, read_uvs, write_uvs
+
+
+def seed_scores(faces):
+    """Score each face on how close its 3D shape is to a regular rectangle. Non-quads score -inf"""
+    scores = np.full(len(faces), -np.inf)
+    quads = [i for i, f in enumerate(faces) if len(f.loops) == 4]
+    if quads:
+        co = np.array([[l.vert.co[:] for l in faces[i].loops] for i in quads])
+        sides = np.linalg.norm(co - np.roll(co, -1, axis=1), axis=2)
+        score_a = np.maximum(sides[:, 0], sides[:, 2]) - np.abs(sides[:, 0] - sides[:, 2])
+        score_b = np.maximum(sides[:, 1], sides[:, 3]) - np.abs(sides[:, 1] - sides[:, 3])
+        scores[quads] = score_a + score_b
+    return scores
+
+
+def quad_lattice(seed, quads):
+    """Integer (i, j) lattice coordinates for the corners of every quad reachable from
+    `seed` across shared edges, walking breadth-first like Follow Active Quads.
+    The seed's loops sit at (0, 0), (1, 0), (1, 1), (0, 1). Crossing an edge mirrors
+    the far side of the current quad, so every quad covers one lattice cell.
+    Returns the reached quads in walk order and their corner coordinates in loop order."""
+    order = [seed]
+    coords = {seed: ((0, 0), (1, 0), (1, 1), (0, 1))}
+    frontier = deque(order)
+    while frontier:
+        f = frontier.popleft()
+        fc = coords[f]
+        for k, l in enumerate(f.loops):
+            for g in l.edge.link_faces:
+                if g == f or g in coords or g not in quads:
+                    continue
+
+                # Shared corners keep their coordinates, the far corners step one cell further
+                a, b = l.vert, l.link_loop_next.vert
+                ca, cb = fc[k], fc[(k + 1) % 4]
+                cp, cq = fc[(k - 1) % 4], fc[(k + 2) % 4]
+                na = (2 * ca[0] - cp[0], 2 * ca[1] - cp[1])
+                nb = (2 * cb[0] - cq[0], 2 * cb[1] - cq[1])
+
+                gverts = [gl.vert for gl in g.loops]
+                gc = []
+                for gi, v in enumerate(gverts):
+                    if v == a:
+                        gc.append(ca)
+                    elif v == b:
+                        gc.append(cb)
+                    elif gverts[gi - 1] == a or gverts[(gi + 1) % 4] == a:
+                        gc.append(na)
+                    else:
+                        gc.append(nb)
+
+                coords[g] = tuple(gc)
+                order.append(g)
+                frontier.append(g)
+
+    return order, np.array([coords[f] for f in order], dtype=np.int64)
+
+
+def lattice_line_positions(cells, lengths, seed_pixels, mode):
+    """Pixel position of every lattice line along one axis, with line 0 at 0.
+    `cells` is each quad's lower cell index on the axis and `lengths` its 3D size along
+    it, in walk order. EVEN gives every cell the seed's pixel size. LENGTH sizes each row
+    or column from the first quad the walk reached in it, LENGTH_AVERAGE from the mean of
+    all its quads. Sizes are whole pixels, at least one.
+    Returns (positions, lowest line index)."""
+    low = int(cells.min())
+    count = int(cells.max()) - low + 1
+    if mode == 'EVEN' or lengths[0] < 1e-9:
+        sizes = np.full(count, seed_pixels, dtype=np.int64)
+    else:
+        if mode == 'LENGTH':
+            first = np.full(count, -1, dtype=np.int64)
+            unique, index = np.unique(cells - low, return_index=True)
+            first[unique] = index
+            cell_lengths = lengths[first]
+        else:
+            cell_lengths = (np.bincount(cells - low, weights=lengths, minlength=count)
+                            / np.bincount(cells - low, minlength=count))
+        sizes = np.maximum(np.round(cell_lengths * seed_pixels / lengths[0]), 1).astype(np.int64)
+
+    positions = np.concatenate(([0], np.cumsum(sizes)))
+    return positions - positions[-low], low
+
+
+def layout_island(faces, best, uv_layer, mode, resolution):
+    """Lay out the quads of one island on a pixel lattice grown from the seed quad `best`.
+    The seed keeps its current UV side lengths rounded to whole pixels and every row and
+    column gets a whole-pixel size, so the island stays on the pixel grid throughout.
+    Faces the walk cannot reach keep their shape and move with the island."""
+    pixel = 1.0 / resolution
+    loops = [l for f in faces for l in f.loops]
+    uvs = read_uvs(loops, uv_layer)
 
+    # Original island centroid so we can restore the position after the layout
+    centroid = uvs.mean(axis=0)
 
-def main(context, mode, resolution):
+    # Averaged seed side lengths snapped to an integer pixel count (minimum 1 px)
+    seed_uvs = np.array([l[uv_layer].uv[:] for l in best.loops])
+    uv_sides = np.linalg.norm(seed_uvs - np.roll(seed_uvs, -1, axis=0), axis=1)
+    seed_w = max(1, round((uv_sides[0] + uv_sides[2]) * 0.5 * resolution))
+    seed_h = max(1, round((uv_sides[1] + uv_sides[3]) * 0.5 * resolution))
+
+    order, corners = quad_lattice(best, {f for f in faces if len(f.loops) == 4})
+
+    # 3D length of each quad along the lattice's i and j directions, averaged over its two edges
+    co = np.array([[l.vert.co[:] for l in f.loops] for f in order])
+    sides = np.linalg.norm(co - np.roll(co, -1, axis=1), axis=2)
+    along_i = corners[:, :, 0] != np.roll(corners[:, :, 0], -1, axis=1)
+    length_i = np.where(along_i, sides, 0.0).sum(axis=1) / 2
+    length_j = np.where(along_i, 0.0, sides).sum(axis=1) / 2
+
+    xs, low_i = lattice_line_positions(corners[:, :, 0].min(axis=1), length_i, seed_w, mode)
+    ys, low_j = lattice_line_positions(corners[:, :, 1].min(axis=1), length_j, seed_h, mode)
+
+    # The seed quad's first corner stays where rebuilding the seed in place would put it
+    anchor = seed_uvs[3]
+    laid_out = np.stack((xs[corners[:, :, 0] - low_i], ys[corners[:, :, 1] - low_j]), axis=2)
+    laid_out = anchor + laid_out.reshape(-1, 2) * pixel
+
+    face_start = dict(zip(faces, np.cumsum([0] + [len(f.loops) for f in faces]).tolist()))
+    quad_rows = [face_start[f] + k for f in order for k in range(4)]
+    uvs[quad_rows] = laid_out
+
+    # Restore the centroid, then snap the seed's anchor corner to the nearest pixel corner
+    centroid_delta = centroid - uvs.mean(axis=0)
+    shifted_anchor = anchor + centroid_delta
+    total_delta = centroid_delta + np.round(shifted_anchor * resolution) * pixel - shifted_anchor
+    write_uvs(loops, uv_layer, uvs + total_delta)
 
-    obj = context.object
-    pixel = 1.0 / resolution
+
+def main(context, mode, resolution):
 
     # Force face select mode for consistent behavior across selection modes
     original_select_mode = tuple(context.tool_settings.mesh_select_mode)
     bpy.ops.mesh.select_mode(type='FACE')
 
-    bm = bmesh.from_edit_mesh(obj.data)
-    bm.faces.ensure_lookup_table()
-    bm.edges.ensure_lookup_table()
-    bm.verts.ensure_lookup_table()
-    uv_layer = bm.loops.layers.uv.verify()
-
     # UV selection is ignored if the operator is run through the 3D viewport
     use_uv_selection = True
     if context.space_data and context.space_data.type == 'VIEW_3D':
         use_uv_selection = False
 
-    # Hide all faces that do not have their UVs selected if using UV selection
-    if use_uv_selection:
-        for face in bm.faces:
-            for loop in face.loops:
-                if not loop[uv_layer].select:
-                    face.hide = True
-
-    bpy.ops.mesh.hide(unselected=True)
-    bpy.ops.uv.select_all(action='DESELECT')
-    bpy.ops.mesh.select_all(action='DESELECT')
-
-    for face in bm.faces:
-        if not face.hide:
-            # Select the current face and expand the selection to the rest of its UV island
-            face.select = True
-            bpy.ops.mesh.select_linked(delimit={'UV'})
-            bpy.ops.uv.select_all(action='SELECT')
-
-            faces = [f for f in bm.faces if f.select]
-
-            # Score each face on how close its 3D shape is to a regular rectangle
-            scores = []
-            for f in faces:
-                score = -math.inf
-                if len(f.loops) == 4:
-                    sides = []
-                    for l in f.loops:
-                        a = l.vert.co
-                        b = l.link_loop_next.vert.co
-                        sides.append((a - b).length)
-
-                    score_a = max(sides[0], sides[2]) - abs(sides[0] - sides[2])
-                    score_b = max(sides[1], sides[3]) - abs(sides[1] - sides[3])
-                    score = score_a + score_b
-
-                scores.append(score)
-
-            best = None
-            hiscore = -math.inf
-            for i in range(len(faces)):
-                if scores[i] > hiscore:
-                    hiscore = scores[i]
-                    best = faces[i]
-
-            if best is not None:
-
-                # Original island centroid so we can restore position after Follow Active Quads
-                loops = [l for f in faces for l in f.loops]
-                n = len(loops)
-                centroid = Vector((
-                    sum(l[uv_layer].uv.x for l in loops) / n,
-                    sum(l[uv_layer].uv.y for l in loops) / n,
-                ))
-
-                # Current UV edge lengths of the seed quad
-                uv_sides = []
-                for l in best.loops:
-                    a = l[uv_layer].uv
-                    b = l.link_loop_next[uv_layer].uv
-                    uv_sides.append((a - b).length)
-
-                # Averaged side lengths snapped to an integer pixel count (minimum 1 px)
-                avg_horizontal = (uv_sides[0] + uv_sides[2]) * 0.5
-                avg_vertical   = (uv_sides[1] + uv_sides[3]) * 0.5
-                side_len_h = max(1, round(avg_horizontal * resolution)) * pixel
-                side_len_v = max(1, round(avg_vertical * resolution)) * pixel
-
-                side_a = Vector((side_len_h, 0.0))
-                side_b = Vector((0.0, side_len_v))
-
-                # Rebuild the seed quad as a pixel-sized rectangle
-                best.loops[3][uv_layer].uv = best.loops[3][uv_layer].uv + side_b
-                best.loops[2][uv_layer].uv = best.loops[3][uv_layer].uv + side_a
-                best.loops[1][uv_layer].uv = best.loops[2][uv_layer].uv - side_b
-                best.loops[0][uv_layer].uv = best.loops[1][uv_layer].uv - side_a
-
-                bm.faces.active = best
-                bpy.ops.uv.follow_active_quads(mode=mode)
-
-                # New centroid after Follow Active Quads propagated the layout
-                loops = [l for f in faces for l in f.loops]
-                n = len(loops)
-                new_centroid = Vector((
-                    sum(l[uv_layer].uv.x for l in loops) / n,
-                    sum(l[uv_layer].uv.y for l in loops) / n,
-                ))
-                centroid_delta = centroid - new_centroid
-
-                # Snap the seed quad's anchor corner to the nearest pixel corner after the centroid shift
-                anchor = best.loops[0][uv_layer].uv + centroid_delta
-                snap_delta = Vector((
-                    round(anchor.x * resolution) * pixel - anchor.x,
-                    round(anchor.y * resolution) * pixel - anchor.y,
-                ))
-
-                total_delta = centroid_delta + snap_delta
-                for l in loops:
-                    l[uv_layer].uv += total_delta
-
-            bpy.ops.mesh.hide(unselected=False)
-
-    bpy.ops.mesh.reveal()
+    for me, bm, uv_layer in edit_bmeshes(context):
+        # Work on visible selected faces, and only those with all UVs selected if using UV selection
+        faces = [f for f in bm.faces if f.select and not f.hide]
+        if use_uv_selection:
+            faces = [f for f in faces if all(l[uv_layer].select for l in f.loops)]
 
-    # Restore the user's original selection mode
-    context.tool_settings.mesh_select_mode = original_select_mode
+        table = group_uv_islands(faces, uv_layer)
+        faces = [bm.faces[i] for i in table.face_indices.tolist()]
+        scores = seed_scores(faces)
+        offsets = table.face_offsets.tolist()
 
-    bm.free()
+        for island in range(island_count(table)):
+            start, end = offsets[island], offsets[island + 1]
 
+            # Seed each island from its most regular quad. Islands without quads are left alone
+            best = start + int(np.argmax(scores[start:end]))
+            if scores[best] == -np.inf:
+                continue
+            layout_island(faces[start:end], faces[best], uv_layer, mode, resolution)
 
-class PixelSmartFollowQuadsOperator(bpy.types.Operator):
-    """Find the most regular quad in each UV island, snap it to the pixel grid, then Follow Active Quads from that seed"""
-    bl_idname = "uv.pixel_smart_follow_quads"
-    bl_label = "Pixel Smart Follow Quads"
-    bl_options = {'REGISTER', 'UNDO'}
+        bmesh.update_edit_mesh(me)
+        bm.free()
 
-    resolution: bpy.props.IntProperty(name="Texture Size", description="Width and height of target texture", default=256, min=1)
-    mode: bpy.props.EnumProperty(items=[
-        ('EVEN', 'Even', 'Space all UVs evenly'),
-        ('LENGTH', 'Length', 'Space UVs by edge length of each loop'),
-        ('LENGTH_AVERAGE', 'Length Average', 'Average space UVs edge length of each loop')],
-        name="Edge Length Mode", default='EVEN')
-
-    @classmethod
-    def poll(cls, context):
-        obj = context.active_object
-        return obj and obj.type == 'MESH' and obj.mode == 'EDIT'
-
-    def execute(self, context):
-        main(context, self.mode, self.resolution)
-        return {'FINISHED'}
+    # Restore the user's original selection mode
+    context.tool_settings.mesh_select_mode = original_select_mode
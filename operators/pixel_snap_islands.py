@@ -1,151 +1,102 @@
 import bpy
 import bmesh
-from math import inf
-from mathutils import Vector, Matrix
+import numpy as np
+
+from .edit_meshes import edit_bmeshes, parallel_map
+from .uv_islands import (get_seam_islands, island_count, island_table_from_faces, island_uv_bounds, per_loop,
+                         read_uvs, write_uvs)
 
 
 def round_to_nearest_even(number):
-    return int(number) if int(number) % 2 == 0 else int(number) + 1
+    """Truncate to an integer and bump odd results up to the next even one. Works elementwise on arrays"""
+    truncated = np.trunc(number)
+    return truncated + np.mod(truncated, 2)
 
 
 def even_pixel_scale_factor(size, pixel):
     """Factor that scales `size` to the nearest even number of pixels, at least two.
     Unlike pixel_scale_islands.pixel_scale_factor, which rounds to whole pixels, the even
     count keeps both bounds on pixel corners when the island is centered on one.
-    A zero-size (degenerate) axis is left unscaled since no factor can give it area."""
-    if size < 1e-9:
-        return 1.0
-    target_size = max(round_to_nearest_even(size / pixel), 2) * pixel
-    return target_size / size
-
-
-def get_uv_islands(bm):
-
-    islands = []
-    select_faces = [face for face in bm.faces if face.select]
-    for face in select_faces:
-        face.select = False
-
-    processed = []
-    for face in select_faces:
-        if face not in processed:
-            face.select = True
-            bpy.ops.mesh.select_linked(delimit={'SEAM'})
-            island = [face for face in select_faces if face.select]
-            islands.append(island)
-            processed.extend(island)
-            for face in island:
-                face.select = False
-
-    for face in bm.faces:
-        face.select = face in select_faces
+    A zero-size (degenerate) axis is left unscaled since no factor can give it area.
+    Works elementwise on arrays."""
+    size = np.asarray(size, dtype=np.float64)
+    degenerate = size < 1e-9
+    target_size = np.maximum(round_to_nearest_even(size / pixel), 2) * pixel
+    return np.where(degenerate, 1.0, target_size / np.where(degenerate, 1.0, size))
 
-    return islands
-
-
-def snap_uv_island_to_pixels(island_faces, uv_layer, resolution):
-
-    island_loops = [loop for face in island_faces for loop in face.loops]
-
-    bmin = Vector((inf, inf))
-    bmax = Vector((-inf, -inf))
-    for loop in island_loops:
-        uv = loop[uv_layer].uv
-        bmin.x = min(bmin.x, uv.x)
-        bmin.y = min(bmin.y, uv.y)
-        bmax.x = max(bmax.x, uv.x)
-        bmax.y = max(bmax.y, uv.y)
-    bcenter = (bmin + bmax) / 2
 
-    x_size = bmax.x - bmin.x
-    y_size = bmax.y - bmin.y
+def island_even_pixel_scales(sizes, resolution):
+    """Per-axis scale factors that round each island's bounding box to an even pixel count.
+    `sizes` is an (islands, 2) array of bounding box widths and heights."""
     pixel = 1.0 / resolution
-
-    if min(x_size, y_size) < pixel:
-        # Scale uniformly from the larger axis so subpixel proportions survive instead
-        # of the smaller axis being inflated to the two-pixel floor. If uniform scaling
-        # would push the smaller axis past one pixel it is rounded to its own whole-pixel
-        # size, since a fractional multi-pixel axis can never sit on the grid
-        major = max(x_size, y_size)
-        minor = min(x_size, y_size)
-        factor = even_pixel_scale_factor(major, pixel) if major >= pixel else 1.0
-        minor_scale = factor
-        if minor * factor > pixel:
-            minor_scale = max(round(minor * factor / pixel), 1) * pixel / minor
-        if x_size >= y_size:
-            x_scale, y_scale = factor, minor_scale
-        else:
-            x_scale, y_scale = minor_scale, factor
-    else:
-        x_scale = even_pixel_scale_factor(x_size, pixel)
-        y_scale = even_pixel_scale_factor(y_size, pixel)
-
-    def snap_center(value, size):
-        # Axes with an even pixel count center on a pixel corner, which lands both
-        # bounds on corners. Any other size (subpixel or an odd whole-pixel count)
-        # moves its minimum bound to a pixel corner instead, so subpixel axes stay
-        # inside a single texel row or column and odd axes stay on the grid. Zero
-        # axes center inside a texel, since a line exactly on a pixel boundary
-        # samples ambiguously
-        if size < 1e-9:
-            return (round(value * resolution - 0.5) + 0.5) * pixel
-        half_pixels = size * resolution / 2
-        if abs(half_pixels - round(half_pixels)) < 1e-6:
-            return round(value * resolution) * pixel
-        corner = round((value - size / 2) * resolution) * pixel
-        return corner + size / 2
-
-    target = Vector((snap_center(bcenter.x, x_size * x_scale),
-                     snap_center(bcenter.y, y_size * y_scale)))
-
-    transformation = Matrix.LocRotScale((target - bcenter).to_3d(), None, Vector((x_scale, y_scale, 1.0)))
-    to_origin = Matrix.Translation(-bcenter.to_3d())
-    for loop in island_loops:
-        xyz = loop[uv_layer].uv.to_3d()
-        xyz = to_origin @ xyz
-        xyz = transformation @ xyz
-        xyz = to_origin.inverted() @ xyz
-        loop[uv_layer].uv = xyz.xy
+    x_size, y_size = sizes[:, 0], sizes[:, 1]
+    major = np.maximum(x_size, y_size)
+    minor = np.minimum(x_size, y_size)
+
+    # Scale uniformly from the larger axis so subpixel proportions survive instead
+    # of the smaller axis being inflated to the two-pixel floor. If uniform scaling
+    # would push the smaller axis past one pixel it is rounded to its own whole-pixel
+    # size, since a fractional multi-pixel axis can never sit on the grid
+    factor = np.where(major >= pixel, even_pixel_scale_factor(major, pixel), 1.0)
+    safe_minor = np.where(minor < 1e-9, 1.0, minor)
+    minor_scale = np.where(minor * factor > pixel,
+                           np.maximum(np.round(minor * factor / pixel), 1) * pixel / safe_minor, factor)
+    x_major = x_size >= y_size
+    subpixel_scales = np.stack((np.where(x_major, factor, minor_scale),
+                                np.where(x_major, minor_scale, factor)), axis=1)
+
+    whole_scales = even_pixel_scale_factor(sizes, pixel)
+    return np.where((minor < pixel)[:, None], subpixel_scales, whole_scales)
+
+
+def snap_centers(value, size, resolution):
+    """Snapped bounding box centers for the given centers and scaled sizes (same-shape arrays).
+    Axes with an even pixel count center on a pixel corner, which lands both
+    bounds on corners. Any other size (subpixel or an odd whole-pixel count)
+    moves its minimum bound to a pixel corner instead, so subpixel axes stay
+    inside a single texel row or column and odd axes stay on the grid. Zero
+    axes center inside a texel, since a line exactly on a pixel boundary
+    samples ambiguously."""
+    pixel = 1.0 / resolution
+    half_pixels = size * resolution / 2
+    even = np.abs(half_pixels - np.round(half_pixels)) < 1e-6
+    centered = (np.round(value * resolution - 0.5) + 0.5) * pixel
+    cornered = np.round((value - size / 2) * resolution) * pixel + size / 2
+    on_corner = np.round(value * resolution) * pixel
+    return np.where(size < 1e-9, centered, np.where(even, on_corner, cornered))
+
+
+def snap_islands_to_pixels(table, uvs, resolution):
+    """Scale every island to an even pixel count and center it on the pixel grid.
+    `uvs` is in table loop order; returns the snapped UVs"""
+    if not island_count(table):
+        return uvs
+    bmin, bmax = island_uv_bounds(table, uvs)
+    bcenter = (bmin + bmax) / 2
+    sizes = bmax - bmin
+    scales = island_even_pixel_scales(sizes, resolution)
+    target = snap_centers(bcenter, sizes * scales, resolution)
+    return (uvs - per_loop(table, bcenter)) * per_loop(table, scales) + per_loop(table, target)
 
 
 def main(context, resolution):
 
-    obj = context.object
-
     # Force face select mode for consistent behavior across selection modes
     original_select_mode = tuple(context.tool_settings.mesh_select_mode)
     bpy.ops.mesh.select_mode(type='FACE')
 
-    bm = bmesh.from_edit_mesh(obj.data)
-    bm.faces.ensure_lookup_table()
-    bm.edges.ensure_lookup_table()
-    bm.verts.ensure_lookup_table()
-    uv_layer = bm.loops.layers.uv.verify()
+    # Read every edit mesh's islands and UVs, then run the array math for all meshes in parallel
+    meshes = []
+    for me, bm, uv_layer in edit_bmeshes(context):
+        table = island_table_from_faces(get_seam_islands(bm))
+        meshes.append((me, bm, uv_layer, table, read_uvs(table.loops, uv_layer)))
 
-    for island in get_uv_islands(bm):
-        snap_uv_island_to_pixels(island, uv_layer, resolution)
+    results = parallel_map(lambda m: snap_islands_to_pixels(m[3], m[4], resolution), meshes)
 
-    bmesh.update_edit_mesh(obj.data)
+    for (me, bm, uv_layer, table, _), uvs in zip(meshes, results):
+        write_uvs(table.loops, uv_layer, uvs)
+        bmesh.update_edit_mesh(me)
+        bm.free()
 
     # Restore the user's original selection mode
     context.tool_settings.mesh_select_mode = original_select_mode
-
-    bm.free()
-
-
-class PixelSnapIslandsOperator(bpy.types.Operator):
-    """Snap UV islands to pixel boundaries"""
-    bl_idname = "uv.pixel_snap_islands"
-    bl_label = "Pixel Snap Islands"
-    bl_options = {'REGISTER', 'UNDO'}
-
-    resolution: bpy.props.IntProperty(name="Resolution", description="Width and height of target texture", default=256, min=1)
-
-    @classmethod
-    def poll(cls, context):
-        obj = context.active_object
-        return obj and obj.type == 'MESH' and obj.mode == 'EDIT'
-
-    def execute(self, context):
-        main(context, self.resolution)
-        return {'FINISHED'}
@@ -1,57 +1,48 @@
 import bpy
 import bmesh
-from mathutils import Vector, Matrix
+import numpy as np
+
+from .edit_meshes import edit_bmeshes, parallel_map
+from .uv_islands import read_uvs, write_uvs
+
+
+def snap_uvs_to_pixels(uvs, resolution):
+    """Snap UVs to the nearest pixel corner in one vectorized pass.
+    Returns (snapped uvs, rows of the loops whose stored value changes). UVs are
+    stored as 32-bit floats, so loops count as moved only if that value changes"""
+    pixel = 1.0 / resolution
+    snapped = np.round(uvs / pixel) * pixel
+    moved = np.flatnonzero(np.any(snapped.astype(np.float32) != uvs.astype(np.float32), axis=1))
+    return snapped, moved
 
 
 def main(context, resolution):
     
     # Force face select mode for consistent behavior across selection modes
-    obj = context.object
     original_select_mode = tuple(context.tool_settings.mesh_select_mode)
     bpy.ops.mesh.select_mode(type='FACE')
 
-    # Construct and initialize the bmesh
-    bm = bmesh.from_edit_mesh(obj.data)
-    bm.faces.ensure_lookup_table()
-    bm.edges.ensure_lookup_table()
-    bm.verts.ensure_lookup_table()
-    uv_layer = bm.loops.layers.uv.verify()
+    # Gather the loops of selected faces of every edit mesh
+    meshes = []
+    for me, bm, uv_layer in edit_bmeshes(context):
+        loops = [l for f in bm.faces if f.select for l in f.loops]
+        meshes.append((me, bm, uv_layer, loops, read_uvs(loops, uv_layer)))
 
-    # Gather the loops of selected faces
-    faces = [f for f in bm.faces if f.select]
-    loops = [l for f in faces for l in f.loops]
-    
-    # Move the uvs
-    pixel = 1.0 / resolution
-    for i in range(len(loops)):
-        uv = loops[i][uv_layer].uv
-        px = round(uv.x / (1.0/resolution)) * (1.0 / resolution)
-        py = round(uv.y / (1.0/resolution)) * (1.0 / resolution)
-        loops[i][uv_layer].uv = Vector((px, py))
-    
-    # Update the edit mesh
-    bmesh.update_edit_mesh(obj.data)
+    # Snap the uvs of all meshes in parallel, then write back only the loops that moved
+    results = parallel_map(lambda m: snap_uvs_to_pixels(m[4], resolution), meshes)
 
-    # Restore the user's original selection mode
-    context.tool_settings.mesh_select_mode = original_select_mode
+    moved_count = 0
+    total = 0
+    for (me, bm, uv_layer, loops, _), (snapped, moved) in zip(meshes, results):
+        write_uvs([loops[i] for i in moved.tolist()], uv_layer, snapped[moved])
+        moved_count += len(moved)
+        total += len(loops)
 
-    # Free the bmesh memory
-    bm.free()    
+        # Update the edit mesh and free the bmesh memory
+        bmesh.update_edit_mesh(me)
+        bm.free()
 
+    # Restore the user's original selection mode
+    context.tool_settings.mesh_select_mode = original_select_mode
 
-class PixelSnapUvsOperator(bpy.types.Operator):
-    """Snap the UVs of selected faces to nearest pixel on a texture of specified resolution"""
-    bl_idname = "uv.pixel_snap_uvs"
-    bl_label = "Pixel Snap UVs"
-    bl_options = {'REGISTER', 'UNDO'}
-    
-    resolution: bpy.props.IntProperty(name="Texture Size", description="Width and height of target texture", default=256, min=1)
-    
-    @classmethod
-    def poll(cls, context):
-        obj = context.active_object
-        return obj and obj.type == 'MESH' and obj.mode == 'EDIT'
-
-    def execute(self, context):
-        main(context, self.resolution)
-        return {'FINISHED'}
\ No newline at end of file
+    return moved_count, total
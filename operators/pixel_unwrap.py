@@ -1,33 +1,229 @@
 import bpy
+import bmesh
+import numpy as np
 
+from . import profiling
+from .duplicate_islands import find_duplicate_islands
+from .edit_meshes import edit_bmeshes
+from .island_fingerprints import island_fingerprint, load_fingerprints, store_fingerprints
+from .layout_cache import layout_key, layout_state, load_layout, store_layout
+from .pixel_scale_islands import scale_islands_to_density, texel_density
+from .uv_islands import get_seam_islands, island_areas, island_table_from_faces, read_uvs, write_uvs
 
-class PixelUnwrapOperator(bpy.types.Operator):
-    """Unwrap the selected faces with Blender's angle based unwrap, then pack and snap the result to the pixel grid"""
-    bl_idname = "uv.pixel_unwrap"
-    bl_label = "Pixel Unwrap"
-    bl_options = {'REGISTER', 'UNDO'}
 
-    img_size: bpy.props.IntProperty(name="Texture Size", description="Width and height of target texture", default=256, min=1)
-    margin: bpy.props.IntProperty(name="Packing Margin", description="Margin around UV Islands in pixels", default=2, min=0)
-    shape_method: bpy.props.EnumProperty(items=[
-        ('CONCAVE', 'Exact Shape', 'Uses exact geometry'),
-        ('CONVEX', 'Boundary Shape', 'Uses convex hull'),
-        ('AABB', 'Bounding Box', 'Uses bounding boxes')
-    ], name="Shape Method", default='AABB')
+UNWRAP_ARGS = dict(method='ANGLE_BASED', fill_holes=True, correct_aspect=True, use_subsurf_data=False, margin_method='SCALED', margin=0.0)
 
-    @classmethod
-    def poll(cls, context):
-        obj = context.active_object
-        return obj and obj.type == 'MESH' and obj.mode == 'EDIT'
 
-    def execute(self, context):
+def find_changed_islands(context, settings):
+    """Split the selected seam islands of every edit mesh into changed and unchanged ones by
+    comparing their fingerprints with those stored on the mesh. Returns
+    (me, bm, uv_layer, changed, unchanged, fingerprints to store) per mesh, where changed
+    islands are lists of their selected faces and unchanged islands lists of all their faces."""
+    meshes = []
+    for me, bm, uv_layer in edit_bmeshes(context):
+        stored = load_fingerprints(me, settings)
+        changed, unchanged, keep = [], [], set()
+        for faces in get_seam_islands(bm, only_selected=False):
+            fingerprint = island_fingerprint(faces)
+            selected = [f for f in faces if f.select]
+            if fingerprint in stored:
+                # Unselected islands keep their entry so a later run can still skip them
+                keep.add(fingerprint)
+                if selected:
+                    unchanged.append(faces)
+            elif selected:
+                changed.append(selected)
+                # Only a fully unwrapped island has a layout worth keeping next time
+                if len(selected) == len(faces):
+                    keep.add(fingerprint)
+        meshes.append((me, bm, uv_layer, changed, unchanged, keep))
+    return meshes
+
+
+def match_texel_density(meshes, density=0.0):
+    """Scale the freshly unwrapped changed islands to `density`, or without one to the texel
+    density of the unchanged ones. Returns False if there is no density to scale to."""
+    uv_areas, areas, changed = [], [], []
+    for me, bm, uv_layer, changed_islands, unchanged_islands, keep in meshes:
+        table = island_table_from_faces(unchanged_islands)
+        mesh_uv_areas, mesh_areas = island_areas(bm, table, read_uvs(table.loops, uv_layer))
+        uv_areas.append(mesh_uv_areas)
+        areas.append(mesh_areas)
+
+        table = island_table_from_faces(changed_islands)
+        uvs = read_uvs(table.loops, uv_layer)
+        changed.append((bm, uv_layer, table, uvs) + island_areas(bm, table, uvs))
+
+    if density <= 0:
+        density = texel_density(np.concatenate(uv_areas), np.concatenate(areas))
+    if density <= 0:
+        return False
+    for bm, uv_layer, table, uvs, mesh_uv_areas, mesh_areas in changed:
+        write_uvs(table.loops, uv_layer, scale_islands_to_density(table, uvs, mesh_uv_areas, mesh_areas, density))
+    return True
+
+
+def main(context, operator):
+    if operator.only_changed:
+        return unwrap_changed(context, operator)
+    if operator.stack_duplicates:
+        return unwrap_stacked(context, operator)
+
+    unwrap_all(context, operator)
+    return {'FINISHED'}
+
+
+def unwrap_all(context, operator):
+    profile = profiling.current()
+
+    # A redo that changes only the texture size starts from the unwrapped and averaged
+    # layout of the same input last time. Pixel Pack Islands then reuses its initial pack too
+    meshes = edit_bmeshes(context)
+    key = layout_key(operator, meshes)
+    with profile.stage("restore unwrap"):
+        state = layout_state(meshes, (operator.pixels_per_meter > 0,))
+        reused = load_layout(key, state, meshes)
+
+    if reused:
+        profile.count("reused layouts")
+    else:
         # Blender's unwrap respects seams, selection, and pinned UVs
-        bpy.ops.uv.unwrap(method='ANGLE_BASED', fill_holes=True, correct_aspect=True, use_subsurf_data=False, margin_method='SCALED', margin=0.0)
+        profile.call(bpy.ops.uv.unwrap, **UNWRAP_ARGS)
+
+        # Equalize island density before packing so pixel scaling treats all islands alike.
+        # A fixed density sets every island's scale from its 3D area in the pack instead
+        if operator.pixels_per_meter <= 0:
+            profile.call(bpy.ops.uv.average_islands_scale, scale_uv=False, shear=False)
+        store_layout(key, state, meshes)
+
+    # Pack, snap island sizes and positions to the pixel grid
+    profile.call(bpy.ops.uv.pixel_pack_islands, resolution=operator.img_size, margin=operator.margin, shape_method=operator.shape_method,
+                 pixels_per_meter=operator.pixels_per_meter)
+
+
+def unwrap_changed(context, operator):
+    profile = profiling.current()
+    settings = f"{operator.img_size} {operator.margin} {operator.shape_method}"
+    if operator.pixels_per_meter > 0:
+        settings += f" {operator.pixels_per_meter:g}"
+
+    # Force face select mode for consistent behavior across selection modes
+    original_select_mode = tuple(context.tool_settings.mesh_select_mode)
+    bpy.ops.mesh.select_mode(type='FACE')
+
+    with profile.stage("find changed islands"):
+        meshes = find_changed_islands(context, settings)
+    changed = sum(len(m[3]) for m in meshes)
+    unchanged = sum(len(m[4]) for m in meshes)
+
+    if changed and not unchanged:
+        # Nothing to keep, so this is a regular unwrap
+        unwrap_all(context, operator)
+    elif changed:
+        # Unchanged islands are kept whole, including faces the user did not select, so their
+        # face selection is restored once the pack is done
+        selection = [(f, f.select) for m in meshes for faces in m[4] for f in faces]
+
+        # Unwrap the changed islands on their own
+        with profile.stage("select changed islands"):
+            for me, bm, uv_layer, changed_islands, unchanged_islands, keep in meshes:
+                for faces in unchanged_islands:
+                    for f in faces:
+                        f.select_set(False)
+                for faces in changed_islands:
+                    for f in faces:
+                        f.select_set(True)
+                bmesh.update_edit_mesh(me)
+        profile.call(bpy.ops.uv.unwrap, **UNWRAP_ARGS)
+
+        # Give them the fixed density or that of the kept layout, since scaling is off in the pack below
+        with profile.stage("match texel density"):
+            matched = match_texel_density(meshes, operator.pixels_per_meter / operator.img_size)
+        if not matched:
+            profile.call(bpy.ops.uv.average_islands_scale, scale_uv=False, shear=False)
+
+        # Pin the unchanged islands so the pack only places changed islands in the free space around them
+        pins = []
+        with profile.stage("lock unchanged islands"):
+            for me, bm, uv_layer, changed_islands, unchanged_islands, keep in meshes:
+                for faces in unchanged_islands:
+                    for f in faces:
+                        f.select_set(True)
+                        for l in f.loops:
+                            pins.append((l, uv_layer, l[uv_layer].pin_uv, l[uv_layer].select))
+                            l[uv_layer].pin_uv = True
+                            l[uv_layer].select = True
+                bmesh.update_edit_mesh(me)
+
+        profile.call(bpy.ops.uv.pixel_pack_islands, resolution=operator.img_size, margin=operator.margin, shape_method=operator.shape_method,
+                     scale=False, pin=True, pin_method='LOCKED', packer='BLENDER')
+
+        for l, uv_layer, pin, select in pins:
+            l[uv_layer].pin_uv = pin
+            l[uv_layer].select = select
+        for f, select in selection:
+            f.select_set(select)
+        for me, bm, uv_layer, changed_islands, unchanged_islands, keep in meshes:
+            bm.select_flush_mode()
+
+    for me, bm, uv_layer, changed_islands, unchanged_islands, keep in meshes:
+        store_fingerprints(me, settings, keep)
+        bmesh.update_edit_mesh(me)
+
+    # Restore the user's original selection mode
+    context.tool_settings.mesh_select_mode = original_select_mode
+
+    operator.report({'INFO'}, f"Unwrapped {changed} changed islands, kept {unchanged} unchanged islands in place")
+    return {'FINISHED'}
+
+
+def unwrap_stacked(context, operator):
+    profile = profiling.current()
+
+    # Force face select mode for consistent behavior across selection modes
+    original_select_mode = tuple(context.tool_settings.mesh_select_mode)
+    bpy.ops.mesh.select_mode(type='FACE')
+
+    meshes = edit_bmeshes(context)
+    with profile.stage("find duplicate islands"):
+        islands = [(faces, uv_layer, m) for m, (me, bm, uv_layer) in enumerate(meshes) for faces in get_seam_islands(bm)]
+        representatives, duplicates = find_duplicate_islands([i[:2] for i in islands])
+    profile.count("duplicate islands", len(duplicates))
+
+    # Unwrap and pack the representatives only
+    if duplicates:
+        for index, *_ in duplicates:
+            for f in islands[index][0]:
+                f.select_set(False)
+        for index in representatives:
+            for f in islands[index][0]:
+                f.select_set(True)
+        for me, bm, uv_layer in meshes:
+            bmesh.update_edit_mesh(me)
+    unwrap_all(context, operator)
+
+    with profile.stage("stack duplicates"):
+        # One bulk copy per pair of meshes, since a duplicate's representative may be in another object
+        copies = {}
+        for index, rep_index, rep_loops, loops in duplicates:
+            copy = copies.setdefault((islands[rep_index][2], islands[index][2]), ([], []))
+            copy[0].extend(rep_loops)
+            copy[1].extend(loops)
+        for (source, target), (rep_loops, loops) in copies.items():
+            write_uvs(loops, meshes[target][2], read_uvs(rep_loops, meshes[source][2]))
 
-        # Equalize island density before packing so pixel scaling treats all islands alike
-        bpy.ops.uv.average_islands_scale(scale_uv=False, shear=False)
+        for index, *_ in duplicates:
+            faces, uv_layer, _ = islands[index]
+            for f in faces:
+                f.select_set(True)
+                for l in f.loops:
+                    l[uv_layer].select = True
+        for me, bm, uv_layer in meshes:
+            bmesh.update_edit_mesh(me)
 
-        # Pack, snap island sizes and positions to the pixel grid
-        bpy.ops.uv.pixel_pack_islands(resolution=self.img_size, margin=self.margin, shape_method=self.shape_method)
+    # Restore the user's original selection mode
+    context.tool_settings.mesh_select_mode = original_select_mode
 
-        return {'FINISHED'}
+    if duplicates:
+        operator.report({'INFO'}, f"Stacked {len(duplicates)} duplicate islands onto {len({d[1] for d in duplicates})} unique islands")
+    return {'FINISHED'}
@@ -1,72 +1,144 @@
 import bpy
 import bmesh
-from mathutils import Vector
 
+from .edit_meshes import edit_bmeshes
+from .uv_islands import get_seam_islands
+
+
+def faces_linked_to_edge(edge):
+    """Visible faces reachable from `edge` through non-seam edges, like select_linked(delimit={'SEAM'})"""
+    linked = {f for f in edge.link_faces if not f.hide}
+    frontier = list(linked)
+    while frontier:
+        face = frontier.pop()
+        for e in face.edges:
+            if e.seam:
+                continue
+            for other in e.link_faces:
+                if other not in linked and not other.hide:
+                    linked.add(other)
+                    frontier.append(other)
+    return linked
+
+
+def pin_edge(edge, faces, uv_layer):
+    """Pin `edge` along the U axis using its 3D length and unpin the rest of `faces`.
+    Every loop of `faces` is UV selected, so the unwrap needs no Select All over the mesh"""
+    vert_to_uv = {edge.verts[0]: (0.0, 0.0), edge.verts[1]: (edge.calc_length(), 0.0)}
+    for face in faces:
+        for loop in face.loops:
+            loop[uv_layer].select = True
+            loop[uv_layer].pin_uv = loop.vert in vert_to_uv
+            if loop.vert in vert_to_uv:
+                loop[uv_layer].uv = vert_to_uv[loop.vert]
 
-def main(context):
-
-    obj = context.object
-
-    # Force face select mode for consistent behavior across selection modes
-    original_select_mode = tuple(context.tool_settings.mesh_select_mode)
-    bpy.ops.mesh.select_mode(type='FACE')
 
-    bm = bmesh.from_edit_mesh(obj.data)
-    bm.faces.ensure_lookup_table()
-    bm.edges.ensure_lookup_table()
-    bm.verts.ensure_lookup_table()
+def pin_active_edge(bm, uv_layer):
+    """Pin the active edge along the U axis using its 3D length.
+    Returns the faces to unwrap, or None if the active element is not an edge"""
     bm.select_history.validate()
-
-    uv_layer = bm.loops.layers.uv.verify()
     active_edge = bm.select_history.active
-    select_faces = [face for face in bm.faces if face.select]
-
     if not isinstance(active_edge, bmesh.types.BMEdge):
-        print("Error, active element is not an edge.")
-        return
+        return None
 
+    select_faces = [face for face in bm.faces if face.select]
     if len(select_faces) == 0:
-        bpy.ops.mesh.select_linked(delimit={'SEAM'})
-        select_faces = [face for face in bm.faces if face.select]
+        linked = faces_linked_to_edge(active_edge)
+        select_faces = [face for face in bm.faces if face in linked]
+        for face in select_faces:
+            face.select_set(True)
 
-    for face in select_faces:
-        for loop in face.loops:
-            loop[uv_layer].pin_uv = False
+    pin_edge(active_edge, select_faces, uv_layer)
+    return select_faces
 
-    vert_to_uv = {}
-    vert_to_uv[active_edge.verts[0]] = (0.0, 0.0)
-    vert_to_uv[active_edge.verts[1]] = (active_edge.calc_length(), 0.0)
 
-    for face in select_faces:
-        for loop in face.loops:
-            if loop.vert in vert_to_uv:
-                loop[uv_layer].uv = vert_to_uv[loop.vert]
-                loop[uv_layer].pin_uv = True
+def boundary_edges(faces):
+    """Edges of an island's faces that are seams or border fewer or more than two of its faces"""
+    inside = set(faces)
+    edges = {e for f in faces for e in f.edges}
+    return [e for e in edges if e.seam or sum(f in inside for f in e.link_faces) != 2]
 
-    bpy.ops.uv.select_all(action='SELECT')
-    bpy.ops.uv.unwrap(method='ANGLE_BASED', fill_holes=True, correct_aspect=True, use_subsurf_data=False, margin_method='SCALED', margin=0.0)
 
-    for face in select_faces:
-        for loop in face.loops:
-            loop[uv_layer].pin_uv = False
+def island_baseline(faces, chosen, active):
+    """Baseline edge of an island: the active edge if it is one of the island's `chosen`
+    edges, else the longest chosen edge of the island, else its longest boundary edge.
+    Ties go to the lowest edge index so the result does not depend on set order."""
+    edges = {e for f in faces for e in f.edges} & chosen
+    if active in edges:
+        return active
+    candidates = edges or boundary_edges(faces)
+    return min(candidates, key=lambda e: (-e.calc_length(), e.index), default=None)
 
-    # Restore the user's original selection mode
-    context.tool_settings.mesh_select_mode = original_select_mode
 
-    bm.free()
+def pin_island_baselines(bm, uv_layer, chosen):
+    """Pin a baseline edge along the U axis in every selected seam island, see island_baseline.
+    Without selected faces the islands are those reachable from the `chosen` edges.
+    Returns the faces to unwrap and the number of islands pinned."""
+    select_faces = [face for face in bm.faces if face.select]
+    if len(select_faces) == 0:
+        linked = set()
+        for edge in chosen:
+            linked |= faces_linked_to_edge(edge)
+        select_faces = [face for face in bm.faces if face in linked]
+        for face in select_faces:
+            face.select_set(True)
+
+    bm.select_history.validate()
+    active = bm.select_history.active
+    islands = 0
+    for faces in get_seam_islands(bm, select_faces):
+        baseline = island_baseline(faces, chosen, active)
+        if baseline is not None:
+            pin_edge(baseline, faces, uv_layer)
+            islands += 1
+    return select_faces, islands
 
 
-class PixelUnwrapActiveEdgeOperator(bpy.types.Operator):
-    """Unwrap the active edge first then unwrap the selected faces."""
-    bl_idname = "uv.pixel_unwrap_active_edge"
-    bl_label = "Pixel Unwrap (Active Edge)"
-    bl_options = {'REGISTER', 'UNDO'}
+def main(context, batch=False, resolution=256):
 
-    @classmethod
-    def poll(cls, context):
-        obj = context.active_object
-        return obj and obj.type == 'MESH' and obj.mode == 'EDIT'
+    # Edges picked in vertex or edge select mode are baselines in batch mode. In face select
+    # mode every edge of a selected face is selected, so none of them was picked
+    original_select_mode = tuple(context.tool_settings.mesh_select_mode)
+    chosen = []
+    if batch and any(original_select_mode[:2]):
+        chosen = [[e.index for e in bm.edges if e.select] for me, bm, uv_layer in edit_bmeshes(context)]
+
+    # Force face select mode for consistent behavior across selection modes
+    bpy.ops.mesh.select_mode(type='FACE')
+
+    # Pin the active edge, or in batch mode every island's baseline, of every edit mesh,
+    # then unwrap them all in one call
+    pinned = []
+    islands = 0
+    for i, (me, bm, uv_layer) in enumerate(edit_bmeshes(context)):
+        if batch:
+            edges = {bm.edges[j] for j in chosen[i]} if chosen else set()
+            select_faces, count = pin_island_baselines(bm, uv_layer, edges)
+            islands += count
+            if count:
+                pinned.append((me, bm, uv_layer, select_faces))
+        else:
+            select_faces = pin_active_edge(bm, uv_layer)
+            if select_faces is not None:
+                islands += 1
+                pinned.append((me, bm, uv_layer, select_faces))
+
+    if pinned:
+        for me, bm, uv_layer, select_faces in pinned:
+            bmesh.update_edit_mesh(me)
+        bpy.ops.uv.unwrap(method='ANGLE_BASED', fill_holes=True, correct_aspect=True, use_subsurf_data=False, margin_method='SCALED', margin=0.0)
+
+    for me, bm, uv_layer, select_faces in pinned:
+        for face in select_faces:
+            for loop in face.loops:
+                loop[uv_layer].pin_uv = False
+        bmesh.update_edit_mesh(me)
+
+    # One pixel snap for the whole batch
+    if batch and pinned:
+        bpy.ops.uv.pixel_snap_islands(resolution=resolution)
+
+    # Restore the user's original selection mode
+    context.tool_settings.mesh_select_mode = original_select_mode
 
-    def execute(self, context):
-        main(context)
-        return {'FINISHED'}
+    return islands
@@ -1,8 +1,15 @@
 import bpy
 import bmesh
+import numpy as np
 from mathutils import Vector
 
+from . import profiling
+from .edit_meshes import edit_bmeshes
+from .island_cache import cached_island_table
 from .pixel_scale_islands import count_subpixel_islands
+from .pixel_snap_islands import snap_islands_to_pixels
+from .uv_islands import (get_seam_islands, island_count, island_table_from_faces, per_loop,
+                         read_uvs, write_uvs)
 
 
 def place_and_pin_centerline_uvs(faces, uv_layer):
@@ -64,40 +71,30 @@ def place_and_pin_centerline_uvs(faces, uv_layer):
                 loop[uv_layer].pin_uv = True
 
 
-def snap_uv_island_centerline_to_pixels(faces, uv_layer, img_size, centerline_adjustment):
+def snap_centerlines_to_pixels(table, uvs, img_size, centerline_adjustment):
+    """Translate each island so the UV of its first centerline vert lands on the pixel grid.
+    Islands without a centerline vert have nothing to align, so they are left where the
+    pixel snap placed them. `uvs` is in table loop order; returns the moved UVs"""
+    pixel = 1.0 / img_size
+    on_centerline = np.fromiter((abs(l.vert.co.x) < 1e-5 for l in table.loops), dtype=bool, count=len(table.loops))
 
-    # Get loops of faces in the input set
-    loops = [l for f in faces for l in f.loops]
+    # First centerline loop of every island that has one
+    rows = np.flatnonzero(on_centerline)
+    islands = np.searchsorted(table.loop_offsets, rows, side='right') - 1
+    islands, first = np.unique(islands, return_index=True)
+    anchors = uvs[rows[first]]
 
-    # Find the UV position of the first centerline vert. Islands without one have no
-    # centerline to align, so they are left where the pixel snap placed them
-    uv = None
-    for l in loops:
-        if abs(l.vert.co.x) < 1e-5:
-            uv = l[uv_layer].uv
-            break
-    if uv is None:
-        return
-
-    # Calculate the offset needed to snap the centerline to the pixel grid
-    dx = (round(uv.x / (1.0 / img_size)) * (1.0 / img_size)) - uv.x
-    dy = (round(uv.y / (1.0 / img_size)) * (1.0 / img_size)) - uv.y
-
-    # Optionally shift by half a pixel so the centerline lands on pixel centers instead of edges
+    # Offset that snaps each centerline to the pixel grid, optionally shifted by half a
+    # pixel so the centerline lands on pixel centers instead of edges
+    offsets = np.zeros((island_count(table), 2))
+    offsets[islands] = np.round(anchors / pixel) * pixel - anchors
     if centerline_adjustment == 'CENTER':
-        dx += (1.0 / img_size) / 2.0
-        dy += (1.0 / img_size) / 2.0
+        offsets[islands] += pixel / 2.0
 
-    # Translate the entire island
-    for l in loops:
-        l[uv_layer].uv.x += dx
-        l[uv_layer].uv.y += dy
+    return uvs + per_loop(table, offsets)
 
 
 def main(context, operator):
-    
-    # Get object
-    obj = context.object
 
     # Get operator parameter data
     img_size     = operator.img_size
@@ -105,148 +102,84 @@ def main(context, operator):
     shape_method = operator.shape_method
     adjustment   = operator.centerline_adjustment
 
+    profile = profiling.current()
+
     # Save the user's selection mode and force face mode for consistent behavior
     original_select_mode = tuple(context.tool_settings.mesh_select_mode)
     bpy.ops.mesh.select_mode(type='FACE')
 
-    # Prepare bmesh data
-    bm = bmesh.from_edit_mesh(obj.data)
-    bm.faces.ensure_lookup_table()
-    bm.edges.ensure_lookup_table()
-    bm.verts.ensure_lookup_table()
-    uv_layer = bm.loops.layers.uv.verify()
-
-    # Capture the user's face selection and hidden state as indices so they survive bpy.ops calls
-    selected_indices = {f.index for f in bm.faces if f.select}
-    hidden_indices   = {f.index for f in bm.faces if f.hide}
+    # Pin every seam-delimited island's centerline in every edit mesh up front so the
+    # unwrapper builds around them. Islands only link through selected faces, matching
+    # what the unwrap treats as one chart
+    any_selected = False
+    with profile.stage("pin centerlines"):
+        for me, bm, uv_layer in edit_bmeshes(context):
+            selected = [f for f in bm.faces if f.select and not f.hide]
+            any_selected = any_selected or bool(selected)
+            for faces in get_seam_islands(bm, selected):
+                place_and_pin_centerline_uvs(faces, uv_layer)
 
     # Early exit if no faces are selected
-    if not selected_indices:
-        bm.free()
+    if not any_selected:
+        context.tool_settings.mesh_select_mode = original_select_mode
         return
 
-    # Hide all unselected faces to prevent them being processed
-    bpy.ops.mesh.hide(unselected=True)
-
-    # Process each seam-delimited island individually
-    processed = True
-    while processed:
-        processed = False
-        bm.faces.ensure_lookup_table()
-        for face in bm.faces:
-            if not face.hide:
-                processed = True
-
-                # Select all faces that belong to the same island using seam edges as a delimiter
-                bpy.ops.mesh.select_all(action='DESELECT')
-                face.select = True
-                bpy.ops.mesh.select_linked(delimit={'SEAM'})
-
-                # Pin centerline UVs so the unwrapper builds around them
-                faces = [f for f in bm.faces if f.select]
-                place_and_pin_centerline_uvs(faces, uv_layer)
+    # Unwrap all islands in one call
+    profile.call(bpy.ops.uv.unwrap, method='ANGLE_BASED', fill_holes=True, correct_aspect=True, use_subsurf_data=False, margin_method='SCALED', margin=0.0)
 
-                # Perform the UV unwrap
-                bpy.ops.uv.unwrap(method='ANGLE_BASED', fill_holes=True, correct_aspect=True, use_subsurf_data=False, margin_method='SCALED', margin=0.0)
+    # Clear the pins left over from the unwrap phase
+    with profile.stage("clear pins"):
+        for me, bm, uv_layer in edit_bmeshes(context):
+            for f in bm.faces:
+                if f.select and not f.hide:
+                    for l in f.loops:
+                        l[uv_layer].pin_uv = False
 
-                # Hide the processed island so it is not visited again
-                bpy.ops.mesh.hide(unselected=False)
-                break
+    # Scale, pack, and snap island bounds to the pixel grid
+    profile.call(bpy.ops.uv.average_islands_scale, scale_uv=False, shear=False)
 
-    # Clear all pins left over from the unwrap phase
-    bpy.ops.mesh.reveal()
-    bpy.ops.mesh.select_all(action='SELECT')
-    bpy.ops.uv.select_all(action='SELECT')
-    bpy.ops.uv.pin(clear=True, invert=False)
-
-    # Restore the user's original hidden faces by selecting them then hiding them
-    bpy.ops.mesh.select_all(action='DESELECT')
-    bm.faces.ensure_lookup_table()
-    for f in bm.faces:
-        f.select = f.index in hidden_indices
-    bpy.ops.mesh.hide(unselected=False)
-    bpy.ops.mesh.select_all(action='DESELECT')
-
-    # Restore the user's original face selection
-    bm.faces.ensure_lookup_table()
-    for f in bm.faces:
-        f.select = f.index in selected_indices
+    # Find the islands before packing, which only moves them, so a redo that changes only
+    # the texture size or margin sees the same UVs and reuses the cached islands
+    meshes = []
+    with profile.stage("find islands"):
+        for me, bm, uv_layer in edit_bmeshes(context):
+            table = cached_island_table(me, bm, uv_layer, True)
+            seam_table = island_table_from_faces(get_seam_islands(bm))
+            meshes.append((me, bm, uv_layer, table, seam_table))
+            profile.count("islands", island_count(table))
+            profile.count("loops", len(table.loops))
 
-    # Scale, pack, and snap island bounds to the pixel grid
-    bpy.ops.uv.average_islands_scale(scale_uv=False, shear=False)
-    bpy.ops.uv.pack_islands(udim_source='CLOSEST_UDIM', rotate=True, rotate_method='CARDINAL', scale=True, merge_overlap=False, margin_method='FRACTION', margin=margin / img_size, pin=False, pin_method='LOCKED', shape_method=shape_method)
+    profile.call(bpy.ops.uv.pack_islands, udim_source='CLOSEST_UDIM', rotate=True, rotate_method='CARDINAL', scale=True, merge_overlap=False, margin_method='FRACTION', margin=margin / img_size, pin=False, pin_method='LOCKED', shape_method=shape_method)
 
     # Warn when the packed density is too low for pixel snapping to preserve proportions
-    bm = bmesh.from_edit_mesh(obj.data)
-    bm.faces.ensure_lookup_table()
-    uv_layer = bm.loops.layers.uv.verify()
-    total, subpixel = count_subpixel_islands(bm, uv_layer, img_size)
+    total = subpixel = 0
+    with profile.stage("count subpixel islands"):
+        for me, bm, uv_layer, table, seam_table in meshes:
+            mesh_total, mesh_subpixel = count_subpixel_islands(bm, uv_layer, img_size, table)
+            total += mesh_total
+            subpixel += mesh_subpixel
     if subpixel:
         operator.report({'WARNING'}, f"{subpixel} of {total} UV islands are under 1 pixel at "
                                      f"Texture Size {img_size}; they keep their proportions "
                                      f"but will render as solid strips or single-texel colors. "
                                      f"Increase Texture Size for paintable detail")
 
-    bpy.ops.uv.pixel_snap_islands(resolution=img_size)
+    for me, bm, uv_layer, table, seam_table in meshes:
+        # Snap island sizes and positions to the pixel grid
+        with profile.stage("snap islands"):
+            uvs = snap_islands_to_pixels(seam_table, read_uvs(seam_table.loops, uv_layer), img_size)
+            write_uvs(seam_table.loops, uv_layer, uvs)
 
-    # Snap centerlines to pixel boundaries as the final step so pixel_snap_islands cannot undo the alignment
-    bpy.ops.mesh.hide(unselected=True)
-    bpy.ops.mesh.select_all(action='DESELECT')
-    bm = bmesh.from_edit_mesh(obj.data)
-    bm.faces.ensure_lookup_table()
-    uv_layer = bm.loops.layers.uv.verify()
+        # Snap centerlines to pixel boundaries as the final step so the island snap cannot undo the alignment
+        with profile.stage("snap centerlines"):
+            uvs = snap_centerlines_to_pixels(table, read_uvs(table.loops, uv_layer), img_size, adjustment)
+            write_uvs(table.loops, uv_layer, uvs)
 
-    for face in bm.faces:
-        if not face.hide:
-            face.select = True
-            bpy.ops.mesh.select_linked(delimit={'UV'})
+        with profile.stage("update meshes"):
+            bmesh.update_edit_mesh(me)
 
-            faces = [f for f in bm.faces if f.select]
-            snap_uv_island_centerline_to_pixels(faces, uv_layer, img_size, adjustment)
-
-            bpy.ops.mesh.hide(unselected=False)
-
-    # Restore hidden faces and selection to leave the mesh as the user had it
-    bpy.ops.mesh.reveal()
-    bpy.ops.mesh.select_all(action='DESELECT')
-    bm.faces.ensure_lookup_table()
-    for f in bm.faces:
-        f.select = f.index in hidden_indices
-    bpy.ops.mesh.hide(unselected=False)
-    bpy.ops.mesh.select_all(action='DESELECT')
-    for f in bm.faces:
-        f.select = f.index in selected_indices
+        # Free bmesh memory
+        bm.free()
 
     # Restore the user's original selection mode
     context.tool_settings.mesh_select_mode = original_select_mode
-
-    # Free bmesh memory
-    bm.free()
-
-
-class PixelUnwrapCenterlineOperator(bpy.types.Operator):
-    """Unwrap the selected faces while prioritizing the vertices at the x-centerline"""
-    bl_idname = "uv.pixel_unwrap_centerline"
-    bl_label = "Pixel Unwrap (Centerline)"
-    bl_options = {'REGISTER', 'UNDO'}
-
-    img_size: bpy.props.IntProperty(name="Texture Size", description="Width and height of target texture", default=256, min=1)
-    margin: bpy.props.IntProperty(name="Packing Margin", description="Margin around UV Islands in pixels", default=2, min=0)
-    shape_method: bpy.props.EnumProperty(items=[
-        ('CONCAVE', 'Exact Shape', 'Uses exact geometry'),
-        ('CONVEX', 'Boundary Shape', 'Uses convex hull'),
-        ('AABB', 'Bounding Box', 'Uses bounding boxes')
-    ], name="Shape Method", default='AABB')
-    centerline_adjustment: bpy.props.EnumProperty(items=[
-        ('CORNER', 'Pixel Corner', 'Adjust to pixel corner'),
-        ('CENTER', 'Pixel Center', 'Adjust to pixel center')
-    ], name="Centerline Adjustment", default='CORNER')
-
-    @classmethod
-    def poll(cls, context):
-        obj = context.active_object
-        return obj and obj.type == 'MESH' and obj.mode == 'EDIT'
-
-    def execute(self, context):
-        main(context, self)
-        return {'FINISHED'}
@@ -0,0 +1,117 @@
+import contextlib
+import functools
+import json
+import os
+import time
+
+
+# Set to anything but "" or "0" to profile every pipeline operator, e.g. on a render farm
+ENV_VAR = "PIXEL_UV_TOOLS_PROFILE"
+
+ADDON = __package__.rpartition(".")[0]
+
+_active = None
+
+
+class Profile:
+    """Stage timings and counters of one top-level operator run.
+    Stages nest, so a stage opened inside another is recorded as "outer > inner". A stage
+    entered several times, for example once per mesh, adds up its time and entries."""
+
+    def __init__(self, operator):
+        self.operator = operator
+        self.stages = {}
+        self.counts = {}
+        self.path = []
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        self.path.append(name)
+        totals = self.stages.setdefault(" > ".join(self.path), [0.0, 0])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            totals[0] += time.perf_counter() - start
+            totals[1] += 1
+            self.path.pop()
+
+    def count(self, key, n=1):
+        self.counts[key] = self.counts.get(key, 0) + n
+
+    def call(self, operator, **kwargs):
+        """Run a bpy.ops operator as its own stage"""
+        self.count("operator calls")
+        with self.stage(operator.idname_py()):
+            return operator(**kwargs)
+
+    def as_dict(self):
+        return {
+            "operator": self.operator,
+            "seconds": self.seconds,
+            "stages": [{"stage": name, "seconds": seconds, "calls": calls}
+                       for name, (seconds, calls) in self.stages.items()],
+            "counts": self.counts,
+        }
+
+    def summary(self):
+        lines = [f"{self.operator} took {self.seconds:.3f}s"]
+        lines += [f"  {name}: {seconds:.3f}s" + (f" ({calls} calls)" if calls > 1 else "")
+                  for name, (seconds, calls) in self.stages.items()]
+        lines += [f"  {key}: {n}" for key, n in self.counts.items()]
+        return "\n".join(lines)
+
+
+class NullProfile:
+    """Stands in for Profile when profiling is off, so instrumented code pays no bookkeeping"""
+    _stage = contextlib.nullcontext()
+
+    def stage(self, name):
+        return self._stage
+
+    def count(self, key, n=1):
+        pass
+
+    def call(self, operator, **kwargs):
+        return operator(**kwargs)
+
+
+NULL_PROFILE = NullProfile()
+
+
+def enabled(context):
+    """Profiling is on through the environment variable or the addon preference"""
+    if os.environ.get(ENV_VAR, "0") not in ("", "0"):
+        return True
+    addon = context.preferences.addons.get(ADDON)
+    return bool(addon and addon.preferences and addon.preferences.profile)
+
+
+def current():
+    """Profile of the operator being run, or NULL_PROFILE when profiling is off"""
+    return _active or NULL_PROFILE
+
+
+def profiled(execute):
+    """Profile an operator's execute when profiling is on. The breakdown is reported as an
+    INFO report and printed as one line of JSON. Operators run from a profiled operator
+    record their stages into the outer profile instead of starting their own."""
+    @functools.wraps(execute)
+    def wrapper(self, context):
+        global _active
+        if _active is not None or not enabled(context):
+            return execute(self, context)
+
+        _active = profile = Profile(self.bl_idname)
+        try:
+            result = execute(self, context)
+        finally:
+            _active = None
+        profile.seconds = time.perf_counter() - profile.start
+
+        self.report({'INFO'}, profile.summary())
+        print("pixel_uv_tools_profile " + json.dumps(profile.as_dict()))
+        return result
+    return wrapper
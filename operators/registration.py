@@ -0,0 +1,357 @@
+import importlib
+
+import bpy
+
+from . import profiling
+
+
+# Operator classes as Blender registers them: ids, labels, properties and poll. Each operator
+# imports its implementation module on first use, so registering the addon stays cheap and
+# NumPy and the packing engines load only when an operator first runs
+
+# Pixel Lint check name -> (label, description), in report order
+CHECKS = {
+    'BOUNDS': ("Unaligned Bounds", "Islands whose bounding box does not start and end on pixel corners along an axis at least one pixel long"),
+    'CORNERS': ("Off-Corner UVs", "Islands with UVs that are not on a pixel corner. Only Pixel Snap UVs puts every UV on a corner"),
+    'FLAT': ("Uncentered Flat Islands", "Islands collapsed to zero width or height that are not centered in a texel"),
+    'SUBPIXEL': ("Subpixel Islands", "Islands under one pixel on an axis, which render as solid strips or single texels"),
+}
+
+DEFAULT_CHECKS = {'BOUNDS', 'FLAT', 'SUBPIXEL'}
+
+DEFAULT_TOLERANCE = 0.01
+
+
+def implementation(name):
+    """The implementation module of an operator, imported on first use"""
+    return importlib.import_module(f"{__package__}.{name}")
+
+
+class PixelMoveUvsOperator(bpy.types.Operator):
+    """Translate the UVs of selected faces using pixels. Invoke without dx/dy to enter interactive mode in the UV editor."""
+    bl_idname = "uv.pixel_move_uvs"
+    bl_label = "Pixel Move UVs"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    resolution: bpy.props.IntProperty(name="Texture Size", description="Width and height of target texture", default=256, min=1)
+    dx: bpy.props.IntProperty(name="Delta X", default=0)
+    dy: bpy.props.IntProperty(name="Delta Y", default=0)
+
+    @classmethod
+    def poll(cls, context):
+        ob = context.active_object
+        return ob and ob.type == 'MESH' and ob.mode == 'EDIT'
+
+    def execute(self, context):
+        implementation("pixel_move_uvs").main(context, self.resolution, self.dx, self.dy)
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        return implementation("pixel_move_uvs").invoke(context, self, event)
+
+    def modal(self, context, event):
+        return implementation("pixel_move_uvs").modal(context, self, event)
+
+
+class PixelScaleUvsOperator(bpy.types.Operator):
+    """Scale width and height the UVs of selected faces by an amount of pixels on a texture of specified resolution"""
+    bl_idname = "uv.pixel_scale_uvs"
+    bl_label = "Pixel Scale UVs"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    resolution: bpy.props.IntProperty(name="Texture Size", description="Width and height of target texture", default=256, min=1)
+    dx: bpy.props.IntProperty(name="Delta X", description="Pixels on the x-axis", default=1)
+    dy: bpy.props.IntProperty(name="Delta Y", description="Pixels on the y-axis", default=1)
+    per_island: bpy.props.BoolProperty(name="Per Island", description="Scale each selected UV island around its own centroid instead of the whole selection as one box", default=False)
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj and obj.type == 'MESH' and obj.mode == 'EDIT'
+
+    def execute(self, context):
+        implementation("pixel_scale_uvs").main(context, self.resolution, self.dx, self.dy, self.per_island)
+        return {'FINISHED'}
+
+
+class PixelSnapUvsOperator(bpy.types.Operator):
+    """Snap the UVs of selected faces to nearest pixel on a texture of specified resolution"""
+    bl_idname = "uv.pixel_snap_uvs"
+    bl_label = "Pixel Snap UVs"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    resolution: bpy.props.IntProperty(name="Texture Size", description="Width and height of target texture", default=256, min=1)
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj and obj.type == 'MESH' and obj.mode == 'EDIT'
+
+    def execute(self, context):
+        moved, total = implementation("pixel_snap_uvs").main(context, self.resolution)
+        self.report({'INFO'}, f"Snapped {moved} of {total} UVs to the pixel grid")
+        return {'FINISHED'}
+
+
+class PixelMoveIslandsOperator(bpy.types.Operator):
+    """Moves each UV island so that its minimum bounding box corner snaps to the nearest pixel corner"""
+    bl_idname = "uv.pixel_move_islands"
+    bl_label = "Pixel Move Islands"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    resolution: bpy.props.IntProperty(name="Texture Resolution", default=256, min=1)
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj and obj.type == 'MESH' and obj.mode == 'EDIT'
+
+    def execute(self, context):
+        implementation("pixel_move_islands").main(context, self.resolution)
+        return {'FINISHED'}
+
+
+class PixelScaleIslandsOperator(bpy.types.Operator):
+    """Scale each UV island so that the width and height of its bounding box is divisible by the size of the pixels on a texture of specified size. Islands smaller than one pixel are scaled uniformly so their proportions survive"""
+    bl_idname = "uv.pixel_scale_islands"
+    bl_label = "Pixel Scale Islands"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    resolution: bpy.props.IntProperty(name="Texture Resolution", default=256, min=1)
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj and obj.type == 'MESH' and obj.mode == 'EDIT'
+
+    def execute(self, context):
+        implementation("pixel_scale_islands").main(context, self.resolution)
+        return {'FINISHED'}
+
+
+class PixelSnapIslandsOperator(bpy.types.Operator):
+    """Snap UV islands to pixel boundaries"""
+    bl_idname = "uv.pixel_snap_islands"
+    bl_label = "Pixel Snap Islands"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    resolution: bpy.props.IntProperty(name="Resolution", description="Width and height of target texture", default=256, min=1)
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj and obj.type == 'MESH' and obj.mode == 'EDIT'
+
+    def execute(self, context):
+        implementation("pixel_snap_islands").main(context, self.resolution)
+        return {'FINISHED'}
+
+
+class PixelPackIslandsOperator(bpy.types.Operator):
+    """Pack UV Islands so that they fit the pixel grid of a texture of specified resolution"""
+    bl_idname = "uv.pixel_pack_islands"
+    bl_label = "Pixel Pack Islands"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    resolution: bpy.props.IntProperty(name="Texture Resolution", description="Resolution of target texture", default=256, min=1)
+
+    margin: bpy.props.IntProperty(name="Pixel Margin", description="Amount of pixels to use as margin around each island", default=2, min=0)
+
+    udim_source: bpy.props.EnumProperty(items=[
+        ('CLOSEST_UDIM', 'Closest UDIM', 'Pack islands to closest UDIM'),
+        ('ACTIVE_UDIM', 'Active UDIM', 'Pack islands to active UDIM image tile or UDIM grid tile where 2D cursor is located'),
+        ('ORIGINAL_AABB', 'Original bounding box', 'Pack to starting bounding box of islands')],
+        name="UDIM Source", default='CLOSEST_UDIM')
+
+    rotate: bpy.props.BoolProperty(name="Rotate", description="Rotate islands to improve layout", default=True)
+
+    scale: bpy.props.BoolProperty(name="Scale", description="Scale islands to fill unit square", default=True)
+
+    merge_overlap: bpy.props.BoolProperty(name="Merge Overlapping", description="Overlapping islands stick together", default=False)
+
+    pin: bpy.props.BoolProperty(name="Lock Pinned Islands", description="Constrain islands containing any pinned UV's", default=False)
+
+    pin_method: bpy.props.EnumProperty(items=[
+        ('SCALE', 'Scale', 'Pinned islands won\'t rescale'),
+        ('ROTATION', 'Rotation', 'Pinned islands won\'t rotate'),
+        ('ROTATION_SCALE', 'Rotation and Scale', 'Pinned islands will translate only'),
+        ('LOCKED', 'All', 'Pinned islands are locked in place')],
+        name="Pin Method", default='LOCKED')
+
+    shape_method: bpy.props.EnumProperty(items=[
+        ('CONCAVE', 'Exact Shape', 'Uses exact geometry'),
+        ('CONVEX', 'Boundary Shape', 'Uses convex hull'),
+        ('AABB', 'Bounding Box', 'Uses bounding boxes')],
+        name="Shape Method", default='AABB')
+
+    packer: bpy.props.EnumProperty(items=[
+        ('BLENDER', 'Blender', 'Re-pack with Blender\'s packer after snapping island sizes, then snap positions'),
+        ('PIXEL_GRID', 'Pixel Grid', 'Lay out the snapped islands in whole pixels in one deterministic pass. Ignores Lock Pinned Islands and Shape Method'),
+        ('PIXEL_MASK', 'Pixel Mask', 'Lay out the snapped islands by the exact texels they cover, so shapes interlock, trying all four quarter turns when rotating. Slower than Pixel Grid on large textures. Ignores Lock Pinned Islands and Shape Method')],
+        name="Packer", description="Packer used after island sizes are snapped to the pixel grid", default='BLENDER')
+
+    separate_overlaps: bpy.props.BoolProperty(name="Separate Overlaps", description="After snapping with Blender's packer, find islands that share texels and nudge them by whole pixels into the nearest free space", default=False)
+
+    per_tile: bpy.props.BoolProperty(name="Pack Per UDIM Tile", description="Scale, snap and pack the islands of each UDIM tile on their own, on that tile's pixel grid. Islands stay in the tile that holds their center. Uses the Pixel Mask packer if selected, else Pixel Grid, and ignores UDIM Source, Merge Overlapping, Lock Pinned Islands and Shape Method", default=False)
+
+    tile_resolutions: bpy.props.StringProperty(name="Tile Resolutions", description="Texture sizes of individual tiles when packing per UDIM tile, as tile=size pairs such as 1002=512 1003=128. Other tiles use Texture Resolution", default="")
+
+    pixels_per_meter: bpy.props.FloatProperty(name="Pixels per Meter", description="Scale every island to this many pixels per meter of its 3D surface and place it in a single fixed-scale pack, so density stays the same however many islands there are. 0 scales islands to fill the texture", default=0.0, min=0.0)
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj and obj.type == 'MESH' and obj.mode == 'EDIT'
+
+    @profiling.profiled
+    def execute(self, context):
+        return implementation("pixel_pack_islands").main(context, self)
+
+
+class PixelLintOperator(bpy.types.Operator):
+    """Check that UV islands are aligned to the pixel grid of a texture of specified size, report the islands that are not and select them. UVs are not changed"""
+    bl_idname = "uv.pixel_lint"
+    bl_label = "Pixel Lint"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    resolution: bpy.props.IntProperty(name="Texture Size", description="Width and height of target texture", default=256, min=1)
+    checks: bpy.props.EnumProperty(items=[(check, label, description) for check, (label, description) in CHECKS.items()],
+                                   name="Checks", description="Checks whose offending islands are reported and selected",
+                                   options={'ENUM_FLAG'}, default=DEFAULT_CHECKS)
+    only_selected: bpy.props.BoolProperty(name="Only Selected", description="Check the selected faces only instead of the whole mesh", default=True)
+    tolerance: bpy.props.FloatProperty(name="Tolerance", description="Distance from the pixel grid in pixels that still counts as aligned", default=DEFAULT_TOLERANCE, min=0.0, max=0.5)
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj and obj.type == 'MESH' and obj.mode == 'EDIT'
+
+    @profiling.profiled
+    def execute(self, context):
+        return implementation("pixel_lint").main(context, self)
+
+
+class PixelFixOverlapsOperator(bpy.types.Operator):
+    """Find selected UV islands that share texels on the pixel grid of a texture of specified size, and nudge them by whole pixels into the nearest free space"""
+    bl_idname = "uv.pixel_fix_overlaps"
+    bl_label = "Pixel Fix Overlaps"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    resolution: bpy.props.IntProperty(name="Texture Size", description="Width and height of target texture", default=256, min=1)
+    margin: bpy.props.IntProperty(name="Pixel Margin", description="Free pixels to keep around nudged islands", default=0, min=0)
+    resolve: bpy.props.BoolProperty(name="Nudge Islands", description="Move overlapping islands into free space. When off, overlapping islands are only reported and selected", default=True)
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj and obj.type == 'MESH' and obj.mode == 'EDIT'
+
+    @profiling.profiled
+    def execute(self, context):
+        return implementation("pixel_fix_overlaps").main(context, self)
+
+
+class PixelUnwrapOperator(bpy.types.Operator):
+    """Unwrap the selected faces with Blender's angle based unwrap, then pack and snap the result to the pixel grid"""
+    bl_idname = "uv.pixel_unwrap"
+    bl_label = "Pixel Unwrap"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    img_size: bpy.props.IntProperty(name="Texture Size", description="Width and height of target texture", default=256, min=1)
+    margin: bpy.props.IntProperty(name="Packing Margin", description="Margin around UV Islands in pixels", default=2, min=0)
+    shape_method: bpy.props.EnumProperty(items=[
+        ('CONCAVE', 'Exact Shape', 'Uses exact geometry'),
+        ('CONVEX', 'Boundary Shape', 'Uses convex hull'),
+        ('AABB', 'Bounding Box', 'Uses bounding boxes')
+    ], name="Shape Method", default='AABB')
+    pixels_per_meter: bpy.props.FloatProperty(name="Pixels per Meter", description="Give every island this many pixels per meter of its 3D surface instead of scaling the layout to fill the texture. 0 fills the texture", default=0.0, min=0.0)
+    only_changed: bpy.props.BoolProperty(name="Only Changed Islands", description="Keep the layout of selected islands whose geometry and seams are unchanged since the last Pixel Unwrap with these settings, and unwrap and place only the others around them", default=False)
+    stack_duplicates: bpy.props.BoolProperty(name="Stack Duplicates", description="Unwrap and pack one island per set of islands with the same 3D shape, faces and seams, and stack the others on its texels. Mirrored copies and islands with pinned UVs are unwrapped on their own. Ignored with Only Changed Islands", default=False)
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj and obj.type == 'MESH' and obj.mode == 'EDIT'
+
+    @profiling.profiled
+    def execute(self, context):
+        return implementation("pixel_unwrap").main(context, self)
+
+
+class PixelUnwrapActiveEdgeOperator(bpy.types.Operator):
+    """Unwrap the active edge first then unwrap the selected faces."""
+    bl_idname = "uv.pixel_unwrap_active_edge"
+    bl_label = "Pixel Unwrap (Active Edge)"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    batch: bpy.props.BoolProperty(name="Batch", description="Give every selected seam island its own baseline, a selected edge of the island or else its longest boundary edge, unwrap them all at once and snap them to the pixel grid", default=False)
+    img_size: bpy.props.IntProperty(name="Texture Size", description="Width and height of target texture, used to snap islands in batch mode", default=256, min=1)
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj and obj.type == 'MESH' and obj.mode == 'EDIT'
+
+    def execute(self, context):
+        islands = implementation("pixel_unwrap_active_edge").main(context, self.batch, self.img_size)
+        if not islands:
+            if self.batch:
+                self.report({'WARNING'}, "No selected faces or edges")
+            else:
+                self.report({'WARNING'}, "Active element is not an edge")
+            return {'CANCELLED'}
+        if self.batch:
+            self.report({'INFO'}, f"Unwrapped {islands} islands from their baselines")
+        return {'FINISHED'}
+
+
+class PixelUnwrapCenterlineOperator(bpy.types.Operator):
+    """Unwrap the selected faces while prioritizing the vertices at the x-centerline"""
+    bl_idname = "uv.pixel_unwrap_centerline"
+    bl_label = "Pixel Unwrap (Centerline)"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    img_size: bpy.props.IntProperty(name="Texture Size", description="Width and height of target texture", default=256, min=1)
+    margin: bpy.props.IntProperty(name="Packing Margin", description="Margin around UV Islands in pixels", default=2, min=0)
+    shape_method: bpy.props.EnumProperty(items=[
+        ('CONCAVE', 'Exact Shape', 'Uses exact geometry'),
+        ('CONVEX', 'Boundary Shape', 'Uses convex hull'),
+        ('AABB', 'Bounding Box', 'Uses bounding boxes')
+    ], name="Shape Method", default='AABB')
+    centerline_adjustment: bpy.props.EnumProperty(items=[
+        ('CORNER', 'Pixel Corner', 'Adjust to pixel corner'),
+        ('CENTER', 'Pixel Center', 'Adjust to pixel center')
+    ], name="Centerline Adjustment", default='CORNER')
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj and obj.type == 'MESH' and obj.mode == 'EDIT'
+
+    @profiling.profiled
+    def execute(self, context):
+        implementation("pixel_unwrap_centerline").main(context, self)
+        return {'FINISHED'}
+
+
+class PixelSmartFollowQuadsOperator(bpy.types.Operator):
+    """Find the most regular quad in each UV island, snap it to the pixel grid, then lay out the island's quads on a pixel lattice grown from that seed"""
+    bl_idname = "uv.pixel_smart_follow_quads"
+    bl_label = "Pixel Smart Follow Quads"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    resolution: bpy.props.IntProperty(name="Texture Size", description="Width and height of target texture", default=256, min=1)
+    mode: bpy.props.EnumProperty(items=[
+        ('EVEN', 'Even', 'Space all UVs evenly'),
+        ('LENGTH', 'Length', 'Space UVs by edge length of each loop'),
+        ('LENGTH_AVERAGE', 'Length Average', 'Average space UVs edge length of each loop')],
+        name="Edge Length Mode", default='EVEN')
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj and obj.type == 'MESH' and obj.mode == 'EDIT'
+
+    def execute(self, context):
+        implementation("pixel_smart_follow_quads").main(context, self.mode, self.resolution)
+        return {'FINISHED'}
@@ -0,0 +1,113 @@
+import numpy as np
+
+from .pixel_mask_packer import blocked_positions, covered_texels, dilate, mask_runs, texel_masks
+from .uv_islands import island_uv_bounds
+
+
+def island_texels(table, uvs, face_sizes, resolution):
+    """Where every island sits on the pixel grid: (anchors, masks, texels) where anchors is an
+    (islands, 2) int array with the lower-left texel of each island, masks hold the texels each
+    island covers from its anchor, and texels are the covered texels as (island, x, y) arrays
+    in absolute pixels. See covered_texels for the arguments."""
+    bmin, bmax = island_uv_bounds(table, uvs)
+    anchors = np.floor(bmin * resolution + 1e-6).astype(np.int64)
+    footprints = np.maximum(np.ceil(bmax * resolution - 1e-6).astype(np.int64) - anchors, 1)
+    island, x, y = covered_texels(table, uvs, face_sizes, resolution, anchors, footprints)
+    return anchors, texel_masks(island, x, y, footprints), (island, x + anchors[island, 0], y + anchors[island, 1])
+
+
+def texel_overlaps(texels):
+    """Pairs of islands that cover a common texel, as a sorted (pairs, 2) int array of island
+    indices with the lower index first. `texels` are (island, x, y) arrays from island_texels"""
+    island, x, y = texels
+    if not len(island):
+        return np.zeros((0, 2), dtype=np.int64)
+
+    # One row per distinct (texel, island), sorted by texel, so texels shared by several
+    # islands are runs of equal keys
+    x = x - x.min()
+    y = y - y.min()
+    islands = int(island.max()) + 1
+    rows = np.unique((y * (int(x.max()) + 1) + x) * islands + island)
+    key, owner = np.divmod(rows, islands)
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    counts = np.diff(np.r_[starts, len(rows)])
+
+    # Texels shared by two islands give one pair directly; the rare larger groups are expanded
+    two = starts[counts == 2]
+    pairs = [owner[np.stack((two, two + 1), axis=1)]]
+    for start, count in zip(starts[counts > 2].tolist(), counts[counts > 2].tolist()):
+        group = owner[start:start + count]
+        i, j = np.triu_indices(count, 1)
+        pairs.append(np.stack((group[i], group[j]), axis=1))
+    return np.unique(np.concatenate(pairs), axis=0)
+
+
+def nudge_overlapping_islands(anchors, masks, overlapping, resolution, margin):
+    """Whole-pixel offsets that move overlapping islands into the nearest free space of the UV
+    tile that holds their center, keeping `margin` free texels to other islands. Islands that
+    do not overlap stay where they are, then overlapping islands are placed largest first:
+    each stays put if its texels are still free and otherwise takes the closest free position.
+    Returns (offsets, unresolved) where offsets is an (islands, 2) int array in pixels and
+    unresolved marks islands with no free position in their tile."""
+    n = len(masks)
+    offsets = np.zeros((n, 2), dtype=np.int64)
+    unresolved = np.zeros(n, dtype=bool)
+    sizes = np.array([m.shape[::-1] for m in masks], dtype=np.int64).reshape(-1, 2)
+    tiles = np.floor((anchors + sizes / 2) / resolution).astype(np.int64) * resolution
+
+    # One occupancy bitmap per tile, padded by the margin so islands may sit flush with its edges
+    bitmaps = {}
+
+    def bitmap(tile):
+        if tile not in bitmaps:
+            bitmaps[tile] = np.zeros((resolution + 2 * margin, resolution + 2 * margin), dtype=bool)
+        return bitmaps[tile]
+
+    def occupy(k, corner):
+        # Texels outside the island's tile are not tracked
+        tile = tuple(tiles[k].tolist())
+        x, y = corner[0] - tile[0], corner[1] - tile[1]
+        h, w = masks[k].shape
+        x0, y0, x1, y1 = max(x, 0), max(y, 0), min(x + w, resolution), min(y + h, resolution)
+        if x0 < x1 and y0 < y1:
+            bitmap(tile)[y0 + margin:y1 + margin, x0 + margin:x1 + margin] |= masks[k][y0 - y:y1 - y, x0 - x:x1 - x]
+
+    for k in np.flatnonzero(~overlapping).tolist():
+        occupy(k, anchors[k])
+
+    order = sorted(np.flatnonzero(overlapping).tolist(), key=lambda k: (-int(masks[k].sum()), k))
+    for k in order:
+        tile = tuple(tiles[k].tolist())
+        occupied = bitmap(tile)
+        h, w = masks[k].shape
+        runs = mask_runs(dilate(masks[k], margin))
+        x, y = anchors[k, 0] - tile[0], anchors[k, 1] - tile[1]
+        if w > resolution or h > resolution:
+            unresolved[k] = True
+            occupy(k, anchors[k])
+            continue
+
+        # Search a window around the island, doubling it until a free position turns up
+        # or the window covers the whole tile
+        cx, cy = min(max(x, 0), resolution - w), min(max(y, 0), resolution - h)
+        reach = max(h, w, 1)
+        while True:
+            x0, x1 = max(cx - reach, 0), min(cx + reach, resolution - w)
+            y0, y1 = max(cy - reach, 0), min(cy + reach, resolution - h)
+            window = occupied[y0:y1 + h + 2 * margin, x0:x1 + w + 2 * margin]
+            prefix = np.zeros((len(window), window.shape[1] + 1), dtype=np.int32)
+            np.cumsum(window, axis=1, out=prefix[:, 1:])
+            free_y, free_x = np.nonzero(~blocked_positions(prefix, runs, y1 - y0 + 1, x1 - x0 + 1))
+            if len(free_y):
+                dx, dy = free_x + x0 - x, free_y + y0 - y
+                best = np.lexsort((dx, dy, dx * dx + dy * dy))[0]
+                offsets[k] = (dx[best], dy[best])
+                break
+            if x0 == 0 and y0 == 0 and x1 == resolution - w and y1 == resolution - h:
+                unresolved[k] = True
+                break
+            reach *= 2
+        occupy(k, anchors[k] + offsets[k])
+
+    return offsets, unresolved
@@ -0,0 +1,336 @@
+from collections import namedtuple
+
+import numpy as np
+
+
+IslandTable = namedtuple("IslandTable", ["face_offsets", "face_indices", "loop_offsets", "loop_indices", "loops"])
+IslandTable.__doc__ = """Compact CSR layout of UV islands.
+Island i owns face_indices[face_offsets[i]:face_offsets[i + 1]] and the loops
+loop_indices[loop_offsets[i]:loop_offsets[i + 1]]. `loops` holds the BMLoops in the
+same order as loop_indices, since bmesh has no lookup table for loops. Tables built from
+mesh arrays have no BMLoops and hold the loop indices instead."""
+
+
+def find_root(parent, i):
+    """Union-find root of `i` with path halving"""
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def build_island_table(bm, uv_layer, only_selected):
+    """Group faces into UV islands with a union-find over shared UV vertices.
+    Two faces belong to the same island when they share a vertex with the same UV
+    coordinate (rounded to 5 decimals). Runs in time linear in the number of loops."""
+    faces = [f for f in bm.faces if f.select] if only_selected else list(bm.faces)
+    return group_uv_islands(faces, uv_layer)
+
+
+def group_uv_islands(faces, uv_layer):
+    """Island table of the UV islands formed by the given faces, see build_island_table"""
+    # Union every face with the first face seen at each (uv, vertex) key
+    parent = list(range(len(faces)))
+    first_face = {}
+    for i, f in enumerate(faces):
+        for l in f.loops:
+            other = first_face.setdefault((l[uv_layer].uv.to_tuple(5), l.vert.index), i)
+            if other != i:
+                a = find_root(parent, i)
+                b = find_root(parent, other)
+                if a != b:
+                    parent[a] = b
+
+    # Bucket faces by root, numbering islands in order of their first face
+    island_of_root = {}
+    members = []
+    for i in range(len(faces)):
+        root = find_root(parent, i)
+        island = island_of_root.get(root)
+        if island is None:
+            island = island_of_root[root] = len(members)
+            members.append([])
+        members[island].append(faces[i])
+
+    return island_table_from_faces(members)
+
+
+def mesh_uv_arrays(me):
+    """Loop starts and totals of every polygon, the vertex of every loop and the active UV
+    map as an (n, 2) float64 array, read in bulk with foreach_get. Only valid in Object
+    Mode, where the mesh data is not replaced by an edit bmesh. A mesh without a UV map
+    has every UV at the origin, as a new one would."""
+    polygons, loops = me.polygons, me.loops
+    loop_starts = np.empty(len(polygons), dtype=np.int32)
+    loop_totals = np.empty(len(polygons), dtype=np.int32)
+    loop_verts = np.empty(len(loops), dtype=np.int32)
+    uvs = np.zeros(2 * len(loops), dtype=np.float32)
+    polygons.foreach_get("loop_start", loop_starts)
+    polygons.foreach_get("loop_total", loop_totals)
+    loops.foreach_get("vertex_index", loop_verts)
+    if me.uv_layers.active is not None:
+        me.uv_layers.active.data.foreach_get("uv", uvs)
+    return loop_starts, loop_totals, loop_verts, uvs.reshape(-1, 2).astype(np.float64)
+
+
+def row_ids(columns):
+    """Dense id of every row of the given equally long integer columns, equal rows sharing
+    one, and the number of distinct rows. Rows whose ranges fit in 63 bits are packed into a
+    single key, which sorts several times faster than the columns do"""
+    if not len(columns[0]):
+        return np.zeros(0, dtype=np.int64), 0
+    columns = [c - c.min() for c in columns]
+    widths = [int(c.max()).bit_length() for c in columns]
+    if sum(widths) <= 63:
+        key = columns[0]
+        for c, width in zip(columns[1:], widths[1:]):
+            key = (key << width) | c
+        order = np.argsort(key)
+        new_row = np.concatenate(([True], np.diff(key[order]) != 0))
+    else:
+        order = np.lexsort(columns[::-1])
+        new_row = np.concatenate(([True], np.any(np.diff(np.stack(columns, axis=1)[order], axis=0) != 0, axis=1)))
+    ids = np.empty(len(order), dtype=np.int64)
+    ids[order] = np.cumsum(new_row) - 1
+    return ids, int(np.count_nonzero(new_row))
+
+
+def island_table_from_arrays(loop_starts, loop_totals, loop_verts, uvs):
+    """Island table of every face of a mesh from the arrays of mesh_uv_arrays, with the
+    same islands in the same order as build_island_table. Faces and their (uv, vertex) keys
+    are nodes of one graph with an edge per loop, and its connected components are found
+    by hooking roots onto smaller roots and shortcutting until nothing changes. The root of
+    every component ends up as its lowest face, which numbers islands by their first face."""
+    loop_starts = np.asarray(loop_starts, dtype=np.int64)
+    loop_totals = np.asarray(loop_totals, dtype=np.int64)
+    face_count = len(loop_starts)
+    total = int(loop_totals.sum())
+    ramp = np.arange(total) - np.repeat(np.cumsum(loop_totals) - loop_totals, loop_totals)
+    loop_faces = np.empty(total, dtype=np.int64)
+    loop_faces[np.repeat(loop_starts, loop_totals) + ramp] = np.repeat(np.arange(face_count), loop_totals)
+
+    # One node per distinct (uv rounded to 5 decimals, vertex) key, numbered after the faces
+    columns = [np.asarray(loop_verts, dtype=np.int64)]
+    columns.extend(np.rint(uvs * 1e5).astype(np.int64).T)
+    keys, key_count = row_ids(columns)
+    key_nodes = face_count + keys
+
+    parent = np.arange(face_count + key_count)
+    while True:
+        a, b = parent[loop_faces], parent[key_nodes]
+        linked = a != b
+        if not linked.any():
+            break
+        np.minimum.at(parent, np.maximum(a, b)[linked], np.minimum(a, b)[linked])
+        while True:
+            shortcut = parent[parent]
+            if np.array_equal(shortcut, parent):
+                break
+            parent = shortcut
+
+    _, island_of_face = np.unique(parent[:face_count], return_inverse=True)
+    face_indices = np.argsort(island_of_face, kind='stable')
+    face_offsets = np.concatenate(([0], np.cumsum(np.bincount(island_of_face))))
+    counts = loop_totals[face_indices]
+    loop_ends = np.cumsum(counts)
+    loop_indices = np.repeat(loop_starts[face_indices] - (loop_ends - counts), counts) + np.arange(total)
+    return IslandTable(
+        face_offsets=face_offsets.astype(np.int64),
+        face_indices=face_indices.astype(np.int64),
+        loop_offsets=np.concatenate(([0], loop_ends[face_offsets[1:] - 1])).astype(np.int64),
+        loop_indices=loop_indices,
+        loops=loop_indices,
+    )
+
+
+def get_seam_islands(bm, faces=None, only_selected=True):
+    """Selected faces grouped into seam-delimited islands, as lists of BMFaces.
+    Faces connect across non-seam edges through any of `faces`, all visible faces by
+    default, which gives the same islands as select_linked(delimit={'SEAM'}) in one
+    linear pass without touching the selection. Islands and their faces follow the
+    order of `faces`. Pass only_selected=False to get every island of `faces` whole."""
+    if faces is None:
+        faces = [f for f in bm.faces if not f.hide]
+    slot = {f: i for i, f in enumerate(faces)}
+
+    parent = list(range(len(faces)))
+    for e in bm.edges:
+        if e.seam:
+            continue
+        linked = [slot[f] for f in e.link_faces if f in slot]
+        for other in linked[1:]:
+            a = find_root(parent, linked[0])
+            b = find_root(parent, other)
+            if a != b:
+                parent[a] = b
+
+    island_of_root = {}
+    islands = []
+    for i, f in enumerate(faces):
+        if only_selected and not f.select:
+            continue
+        root = find_root(parent, i)
+        island = island_of_root.get(root)
+        if island is None:
+            island = island_of_root[root] = len(islands)
+            islands.append([])
+        islands[island].append(f)
+
+    return islands
+
+
+def island_count(table):
+    """Number of islands in the table"""
+    return len(table.face_offsets) - 1
+
+
+def island_face_lists(table):
+    """Face indices of each island as a list of lists"""
+    offsets = table.face_offsets.tolist()
+    indices = table.face_indices.tolist()
+    return [indices[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+
+def get_uv_islands(bm, uv_layer, only_selected):
+    """Returns a list of lists where each list contains the indices of the BMFaces that make up a uv island"""
+    return island_face_lists(build_island_table(bm, uv_layer, only_selected))
+
+
+def island_table_from_faces(face_lists):
+    """Build an island table from islands given as lists of BMFaces"""
+    face_offsets = [0]
+    face_indices = []
+    loop_offsets = [0]
+    loops = []
+    for island_faces in face_lists:
+        for f in island_faces:
+            face_indices.append(f.index)
+            loops.extend(f.loops)
+        face_offsets.append(len(face_indices))
+        loop_offsets.append(len(loops))
+
+    return IslandTable(
+        face_offsets=np.array(face_offsets, dtype=np.int64),
+        face_indices=np.array(face_indices, dtype=np.int64),
+        loop_offsets=np.array(loop_offsets, dtype=np.int64),
+        loop_indices=np.array([l.index for l in loops], dtype=np.int64),
+        loops=loops,
+    )
+
+
+def read_uvs(loops, uv_layer):
+    """UVs of the given loops as an (n, 2) float64 array.
+    bmesh has no foreach_get, so this is one flat pass over the loops"""
+    n = len(loops)
+    flat = np.fromiter((c for l in loops for c in l[uv_layer].uv), dtype=np.float64, count=2 * n)
+    return flat.reshape(n, 2)
+
+
+def write_uvs(loops, uv_layer, uvs):
+    """Write an (n, 2) UV array back to the given loops"""
+    for l, uv in zip(loops, uvs.tolist()):
+        l[uv_layer].uv = uv
+
+
+def uv_refs(loops, uv_layer):
+    """UV data of the given loops, resolved once so repeated writes skip the layer lookup"""
+    return [l[uv_layer] for l in loops]
+
+
+def write_uv_refs(refs, uvs):
+    """Write an (n, 2) UV array to UV data from uv_refs"""
+    for ref, uv in zip(refs, uvs.tolist()):
+        ref.uv = uv
+
+
+def island_uv_bounds(table, uvs):
+    """Per-island UV bounding boxes as two (islands, 2) arrays (min, max).
+    `uvs` must be in table loop order"""
+    starts = table.loop_offsets[:-1]
+    if not len(starts):
+        return np.empty((0, 2)), np.empty((0, 2))
+    return np.minimum.reduceat(uvs, starts, axis=0), np.maximum.reduceat(uvs, starts, axis=0)
+
+
+def island_uv_centroids(table, uvs):
+    """Per-island mean UV as an (islands, 2) array. `uvs` must be in table loop order"""
+    starts = table.loop_offsets[:-1]
+    if not len(starts):
+        return np.empty((0, 2))
+    counts = np.diff(table.loop_offsets)
+    return np.add.reduceat(uvs, starts, axis=0) / counts[:, None]
+
+
+def table_face_sizes(bm, table):
+    """Loop count of every table face, in table order. Each face's loops are consecutive in
+    the table, so these split table loops into faces"""
+    faces = bm.faces
+    return np.fromiter((len(faces[i].loops) for i in table.face_indices.tolist()), dtype=np.int64, count=len(table.face_indices))
+
+
+def island_areas(bm, table, uvs):
+    """Per-island UV area and 3D surface area as two (islands,) arrays.
+    `uvs` must be in table loop order, with each face's loops consecutive"""
+    if not island_count(table):
+        return np.empty(0), np.empty(0)
+    faces = [bm.faces[i] for i in table.face_indices.tolist()]
+    sizes = table_face_sizes(bm, table)
+    starts = np.cumsum(sizes) - sizes
+
+    # Shoelace formula per face, with each face's last loop wrapping to its first
+    following = np.arange(1, len(uvs) + 1)
+    following[starts + sizes - 1] = starts
+    cross = uvs[:, 0] * uvs[following, 1] - uvs[following, 0] * uvs[:, 1]
+    face_uv_areas = np.abs(np.add.reduceat(cross, starts)) / 2
+    face_areas = np.fromiter((f.calc_area() for f in faces), dtype=np.float64, count=len(faces))
+
+    island_starts = table.face_offsets[:-1]
+    return np.add.reduceat(face_uv_areas, island_starts), np.add.reduceat(face_areas, island_starts)
+
+
+def per_loop(table, values):
+    """Repeat per-island rows so there is one row per loop in table order"""
+    return np.repeat(values, np.diff(table.loop_offsets), axis=0)
+
+
+def concatenate_tables(tables):
+    """Join island tables, for example from several meshes, into one with the islands in order.
+    Face and loop indices keep referring to their own mesh"""
+    face_offsets = [np.zeros(1, dtype=np.int64)]
+    loop_offsets = [np.zeros(1, dtype=np.int64)]
+    loops = []
+    for table in tables:
+        face_offsets.append(table.face_offsets[1:] + face_offsets[-1][-1])
+        loop_offsets.append(table.loop_offsets[1:] + loop_offsets[-1][-1])
+        loops.extend(table.loops)
+
+    return IslandTable(
+        face_offsets=np.concatenate(face_offsets),
+        face_indices=np.concatenate([t.face_indices for t in tables] or [np.zeros(0, dtype=np.int64)]),
+        loop_offsets=np.concatenate(loop_offsets),
+        loop_indices=np.concatenate([t.loop_indices for t in tables] or [np.zeros(0, dtype=np.int64)]),
+        loops=loops,
+    )
+
+
+def segment_positions(offsets, segments):
+    """Positions of the rows of the given CSR segments, concatenated in `segments` order"""
+    counts = np.diff(offsets)[segments]
+    starts = offsets[:-1][segments]
+    return np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+
+
+def island_subset(table, islands):
+    """Island table of the given islands, in the given order, and the positions of their
+    loops in `table`, so per-loop arrays can be gathered with `uvs[positions]`"""
+    islands = np.asarray(islands, dtype=np.int64)
+    faces = segment_positions(table.face_offsets, islands)
+    positions = segment_positions(table.loop_offsets, islands)
+    subset = IslandTable(
+        face_offsets=np.concatenate(([0], np.cumsum(np.diff(table.face_offsets)[islands]))),
+        face_indices=table.face_indices[faces],
+        loop_offsets=np.concatenate(([0], np.cumsum(np.diff(table.loop_offsets)[islands]))),
+        loop_indices=table.loop_indices[positions],
+        loops=[table.loops[k] for k in positions.tolist()],
+    )
+    return subset, positions
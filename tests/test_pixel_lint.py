@@ -0,0 +1,57 @@
+"""Checks of Pixel Lint's batched island checks.
+
+    blender -b --factory-startup --python tests/test_pixel_lint.py
+
+The operators need Blender's Python modules, so outside Blender the tests are skipped.
+"""
+import os
+import sys
+import unittest
+
+try:
+    import bpy  # noqa: F401
+except ImportError:
+    raise unittest.SkipTest("Pixel Lint needs Blender's bpy module")
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import batch  # noqa: E402
+
+addon = batch.load_addon()
+pixel_lint = batch.addon_module(addon, "pixel_lint")
+registration = batch.addon_module(addon, "registration")
+uv_islands = batch.addon_module(addon, "uv_islands")
+
+RESOLUTION = 256
+
+
+def lint_quad(x, y):
+    """Failed checks of one island made of a single quad spanning `x` and `y`, in pixels"""
+    uvs = np.array([(x[0], y[0]), (x[1], y[0]), (x[1], y[1]), (x[0], y[1])]) / RESOLUTION
+    table = uv_islands.IslandTable(np.array([0, 1]), np.array([0]), np.array([0, 4]), np.arange(4), [None] * 4)
+    flags, _ = pixel_lint.lint_islands(table, uvs, RESOLUTION, registration.DEFAULT_TOLERANCE)
+    return {check for check, failed in flags.items() if failed[0]}
+
+
+class LintIslandsTest(unittest.TestCase):
+    def test_aligned_island_passes(self):
+        self.assertEqual(lint_quad((2.0, 12.0), (3.0, 7.0)), set())
+
+    def test_misaligned_island_fails_bounds(self):
+        self.assertIn('BOUNDS', lint_quad((2.0, 12.3), (3.0, 7.0)))
+
+    def test_flat_strip_misaligned_along_its_length_fails_bounds(self):
+        # Flat on y and centered in a texel, so only its length along x can be off the grid
+        self.assertEqual(lint_quad((2.0, 12.3), (5.5, 5.5)) & registration.DEFAULT_CHECKS, {'BOUNDS'})
+
+    def test_flat_strip_aligned_along_its_length_passes(self):
+        self.assertEqual(lint_quad((2.0, 12.0), (5.5, 5.5)) & registration.DEFAULT_CHECKS, set())
+
+    def test_uncentered_flat_strip_fails_flat(self):
+        self.assertEqual(lint_quad((2.0, 12.0), (5.0, 5.0)) & registration.DEFAULT_CHECKS, {'FLAT'})
+
+
+if __name__ == "__main__":
+    unittest.main(argv=[sys.argv[0]])
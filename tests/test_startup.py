@@ -0,0 +1,62 @@
+"""Checks that registering Pixel UV Tools stays cheap.
+
+    blender -b --factory-startup --python tests/test_startup.py
+
+Each run registers the addon with benchmarks/startup.py in a fresh background Blender, as
+Blender startup and farm workers do. Outside Blender the tests are skipped.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+try:
+    import bpy
+except ImportError:
+    raise unittest.SkipTest("Registering the addon needs Blender's bpy module")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import startup  # noqa: E402
+
+# Fresh Blenders to register in, the fastest is held to the budget
+RUNS = 3
+
+
+def register_in_fresh_blender():
+    """Result of one startup.py run in a new background Blender"""
+    handle, result_path = tempfile.mkstemp(suffix=".json")
+    os.close(handle)
+    try:
+        subprocess.run([bpy.app.binary_path, "-b", "--factory-startup", "-noaudio", "--python", os.path.abspath(startup.__file__),
+                        "--", "--result", result_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        with open(result_path) as f:
+            return json.load(f)
+    finally:
+        os.remove(result_path)
+
+
+class StartupTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.runs = [register_in_fresh_blender() for _ in range(RUNS)]
+        for run in cls.runs:
+            if not run["ok"]:
+                raise AssertionError(f"registration failed: {run['error']}")
+
+    def test_registration_within_budget(self):
+        self.assertLessEqual(min(run["seconds"] for run in self.runs), startup.STARTUP_BUDGET_SECONDS)
+
+    def test_registration_does_not_load_numpy(self):
+        for run in self.runs:
+            self.assertFalse(run["numpy_loaded"])
+
+    def test_registration_does_not_import_operator_implementations(self):
+        for run in self.runs:
+            self.assertEqual(set(run["modules"]) - startup.REGISTRATION_MODULES, set())
+
+
+if __name__ == "__main__":
+    unittest.main(argv=[sys.argv[0]])